@@ -0,0 +1,112 @@
+"""Microbenchmark: market-basket pair counts, peak memory and time.
+
+Compares :mod:`customer_segmentation.basket` (sparse invoice x StockCode
+matrix, min-support pruning, blocked ``X.T @ X``) with the usual pandas
+approach - a self-merge of the distinct (InvoiceNo, StockCode) lines on
+InvoiceNo followed by a groupby over the pairs - on the same frequent
+products, then times the per-segment tables. Each variant runs in a fresh
+interpreter so one variant's freed pages do not hide the next one's peak.
+
+Usage::
+
+    python -m benchmarks.bench_basket benchmarks/data/retail_3000000_s0.parquet --min-support 0.005
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+
+VARIANTS = ['sparse', 'self-merge']
+
+
+def self_merge_pairs(df_clean, min_support):
+    """Pair counts from a pandas self-join on InvoiceNo."""
+    import numpy as np
+
+    lines = df_clean[['InvoiceNo', 'StockCode']].astype({'StockCode': str}).drop_duplicates()
+    n_invoices = lines['InvoiceNo'].nunique()
+    min_count = max(int(np.ceil(min_support * n_invoices - 1e-9)), 2)
+    item_count = lines['StockCode'].value_counts()
+    lines = lines[lines['StockCode'].isin(item_count.index[item_count >= min_count])]
+    pairs = lines.merge(lines, on='InvoiceNo', suffixes=('_A', '_B'))
+    pairs = pairs[pairs['StockCode_A'] < pairs['StockCode_B']]
+    counts = pairs.groupby(['StockCode_A', 'StockCode_B'], observed=True).size()
+    return counts[counts >= min_count]
+
+
+def measure(source, variant, min_support):
+    from customer_segmentation.aggregates import FusedAggregates
+    from customer_segmentation.basket import Baskets
+    from customer_segmentation.ingest import load_transactions
+    from customer_segmentation.instrument import MemorySampler
+    from customer_segmentation.pipeline import (analysis_date_for, clean_transactions, score_rfm,
+                                                segment_rfm)
+
+    df_clean, _ = clean_transactions(load_transactions(source, cache_dir='/tmp/bench_basket_cache',
+                                                       verbose=False), release=True)
+    result = {'variant': variant, 'lines': len(df_clean)}
+    if variant == 'sparse':
+        fa = FusedAggregates(df_clean)
+        analysis_date = analysis_date_for(df_clean)
+        del df_clean
+        gc.collect()
+        with MemorySampler(interval=0.001) as memory:
+            start = time.perf_counter()
+            baskets = Baskets(fa)
+            result['matrix_s'] = round(time.perf_counter() - start, 3)
+            pairs = baskets.pairs(min_support)
+            seconds = time.perf_counter() - start
+        matrix = baskets.matrix
+        result.update(invoices=matrix.shape[0], products=matrix.shape[1], nnz=matrix.nnz,
+                      matrix_mb=round(baskets.nbytes / 2**20, 1))
+
+        segments = segment_rfm(score_rfm(fa.rfm(analysis_date)))
+        start = time.perf_counter()
+        tables = baskets.segment_pairs(segments, min_support)
+        result['segments'] = len(tables)
+        result['segments_s'] = round(time.perf_counter() - start, 3)
+    else:
+        gc.collect()
+        with MemorySampler(interval=0.001) as memory:
+            start = time.perf_counter()
+            pairs = self_merge_pairs(df_clean, min_support)
+            seconds = time.perf_counter() - start
+    result.update(pairs=len(pairs), seconds=round(seconds, 3),
+                  peak_delta_mb=round(memory.peak - memory.start, 1))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Peak memory of the basket pair counts')
+    parser.add_argument('source')
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(measure(args.source, args.variant, args.min_support)))
+        return
+
+    results = []
+    for variant in VARIANTS:
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_basket', args.source,
+                              '--min-support', str(args.min_support), '--variant', variant],
+                             check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.splitlines()[-1]))
+
+    sparse_run = results[0]
+    print(f'🛒 {sparse_run["lines"]:,} lines -> {sparse_run["invoices"]:,} invoices x '
+          f'{sparse_run["products"]:,} products, {sparse_run["nnz"]:,} non-zeros '
+          f'({sparse_run["matrix_mb"]} MB CSR, built in {sparse_run["matrix_s"]:.3f}s), '
+          f'min support {args.min_support:g}')
+    for r in results:
+        print(f'   {r["variant"]:<11} {r["seconds"]:7.3f}s   peak +{r["peak_delta_mb"]:7.1f} MB   '
+              f'{r["pairs"]:,} pairs')
+    print(f'   per-segment tables ({sparse_run["segments"]} segments): '
+          f'{sparse_run["segments_s"]:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Microbenchmark: Section 2 cleaning, peak memory and time.
+
+Compares the original three-copy cleaning (``dropna().copy()`` plus two
+boolean-index copies, ``astype(str).str.startswith('C')``, float64
+TotalAmount, Period YearMonth, raw frame kept alive) with
+``clean_transactions`` with and without ``release=True``. Each variant runs
+in a fresh interpreter so one variant's freed pages do not hide the next
+one's peak.
+
+Usage::
+
+    python -m benchmarks.bench_clean benchmarks/data/retail_3000000_s0.parquet
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+
+VARIANTS = ['original', 'combined', 'combined+release']
+
+
+def original_clean(df):
+    """Section 2 as the script first wrote it."""
+    df_clean = df.dropna(subset=['CustomerID']).copy()
+    df_clean = df_clean[~df_clean['InvoiceNo'].astype(str).str.startswith('C')]
+    df_clean = df_clean[(df_clean['Quantity'] > 0) & (df_clean['UnitPrice'] > 0)]
+    df_clean['TotalAmount'] = df_clean['Quantity'] * df_clean['UnitPrice']
+    df_clean['CustomerID'] = df_clean['CustomerID'].astype(int)
+    df_clean['YearMonth'] = df_clean['InvoiceDate'].dt.to_period('M')
+    return df_clean
+
+
+def measure(source, variant):
+    from customer_segmentation.ingest import load_transactions
+    from customer_segmentation.instrument import MemorySampler
+    from customer_segmentation.pipeline import clean_transactions
+
+    df = load_transactions(source, cache_dir='/tmp/bench_clean_cache', verbose=False)
+    raw_mb = df.memory_usage(deep=True).sum() / 2**20
+    gc.collect()
+    with MemorySampler(interval=0.001) as memory:
+        start = time.perf_counter()
+        if variant == 'original':
+            df_clean = original_clean(df)
+        else:
+            df_clean, _ = clean_transactions(df, release=variant.endswith('release'))
+        seconds = time.perf_counter() - start
+    return {'variant': variant, 'rows': len(df_clean), 'seconds': round(seconds, 3),
+            'raw_mb': round(raw_mb, 1),
+            'clean_mb': round(df_clean.memory_usage(deep=True).sum() / 2**20, 1),
+            'peak_delta_mb': round(memory.peak - memory.start, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Peak memory of the Section 2 cleaning')
+    parser.add_argument('source')
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(measure(args.source, args.variant)))
+        return
+
+    # Warm the ingest cache once so every variant starts from the same load
+    subprocess.run([sys.executable, '-m', 'benchmarks.bench_clean', args.source,
+                    '--variant', 'combined'], check=True, stdout=subprocess.DEVNULL)
+    results = []
+    for variant in VARIANTS:
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_clean', args.source,
+                              '--variant', variant], check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.splitlines()[-1]))
+
+    base = results[0]
+    print(f'🧹 Cleaning {base["raw_mb"]:.0f} MB of raw transactions -> {base["rows"]:,} rows')
+    for r in results:
+        print(f'   {r["variant"]:<18} {r["seconds"]:6.3f}s   peak +{r["peak_delta_mb"]:7.1f} MB '
+              f'({base["peak_delta_mb"] / max(r["peak_delta_mb"], 0.1):4.1f}x less)   '
+              f'clean table {r["clean_mb"]:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
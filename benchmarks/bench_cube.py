@@ -0,0 +1,99 @@
+"""Microbenchmark: the Section 3 cube - build, size and roll-up latency.
+
+Builds the (month, country, product, segment) cube from a transactions file
+(segments from the rule table), saves and re-opens it, then times roll-ups
+over several dimension subsets and slices against the equivalent pandas
+groupby over ``df_clean``, and reports how far the HyperLogLog order /
+customer counts are from the exact ones (99th percentile relative error
+over the groups).
+
+Usage::
+
+    python -m benchmarks.bench_cube benchmarks/data/retail_3000000_s0.parquet
+"""
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from customer_segmentation.aggregates import FusedAggregates
+from customer_segmentation.cube import LABEL_COLUMNS, Cube
+from customer_segmentation.ingest import load_transactions
+from customer_segmentation.pipeline import (analysis_date_for, clean_transactions, score_rfm,
+                                            segment_rfm)
+
+QUERIES = [
+    ((), None),
+    (('month',), None),
+    (('country',), None),
+    (('product',), None),
+    (('country', 'month'), None),
+    (('segment', 'country'), None),
+    (('product', 'segment'), None),
+    (('month',), {'segment': ['Champions']}),
+    (('country',), {'segment': ['Champions', 'Loyal Customers']}),
+]
+
+
+def exact(df, by, where):
+    for dimension, labels in (where or {}).items():
+        df = df[df[LABEL_COLUMNS[dimension][0]].isin(labels)]
+    columns = [LABEL_COLUMNS[dimension][0] for dimension in by]
+    grouped = df.groupby(columns, observed=True) if columns else df.assign(_=0).groupby('_')
+    return grouped.agg(revenue=('TotalAmount', 'sum'), orders=('InvoiceNo', 'nunique'),
+                       customers=('CustomerID', 'nunique'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Section 3 cube')
+    parser.add_argument('source')
+    parser.add_argument('--path', default='/tmp/bench_cube')
+    args = parser.parse_args(argv)
+
+    df_clean, _ = clean_transactions(load_transactions(args.source, verbose=False))
+    aggregates = FusedAggregates(df_clean)
+    rfm = segment_rfm(score_rfm(aggregates.rfm(analysis_date_for(df_clean))))
+    print(f'🧊 {len(df_clean):,} transactions, {len(rfm):,} customers')
+
+    start = time.perf_counter()
+    cube = Cube.build(aggregates, rfm)
+    build = time.perf_counter() - start
+    shutil.rmtree(args.path, ignore_errors=True)
+    cube.save(args.path)
+    disk = sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(args.path) for name in names)
+    print(f'   build {build:.2f}s, {len(cube.meta["cuboids"])} cuboids, finest {len(cube):,} cells, '
+          f'{disk / 2**20:.1f} MB on disk')
+
+    start = time.perf_counter()
+    cube = Cube.open(args.path)
+    cube.eda_tables()
+    print(f'   open + Section 3 tables: {(time.perf_counter() - start) * 1e3:.1f}ms\n')
+
+    frame = df_clean.assign(YearMonth=np.asarray(aggregates.month_labels)[aggregates.month])
+    frame['YearMonth'] = frame['YearMonth'].map(lambda code: f'{code // 12:04d}-{code % 12 + 1:02d}')
+    frame = frame.merge(rfm[['CustomerID', 'Segment']], on='CustomerID')
+    frame['StockCode'] = frame['StockCode'].astype(str)
+    print(f'   {"query":<64} {"groups":>7} {"cube":>9} {"groupby":>9}  p99 orders err  p99 customers err')
+    for by, where in QUERIES:
+        start = time.perf_counter()
+        table = cube.rollup(by, where)
+        cube_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        reference = exact(frame, by, where)
+        pandas_ms = (time.perf_counter() - start) * 1e3
+        columns = [LABEL_COLUMNS[dimension][0] for dimension in by]
+        if columns:
+            table = table.set_index(columns).loc[reference.index]
+        # p99 rather than max: a 4-order group whose invoices share a register reads 3
+        errors = [np.percentile(np.abs(table[name].to_numpy() / reference[name].to_numpy() - 1), 99)
+                  for name in ('orders', 'customers')]
+        label = f'by {", ".join(by) or "-"}' + (f' where {where}' if where else '')
+        print(f'   {label:<64} {len(reference):>7,} {cube_ms:7.1f}ms {pandas_ms:7.1f}ms'
+              f'  {errors[0]:14.2%}  {errors[1]:17.2%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Microbenchmark: mini-batch k-means segmentation on millions of customers.
+
+Builds a synthetic RFM table (skewed recency, geometric frequency, lognormal
+spend that grows with frequency), then times the k sweep, the fit, the
+full assignment pass and single-customer assignment. With scikit-learn
+installed the same features are also fitted with its ``MiniBatchKMeans``
+and full-batch ``KMeans`` as a quality reference (inertia on all customers).
+
+Usage::
+
+    python -m benchmarks.bench_kmeans --customers 2000000 --k 6 --jobs 1 4
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.clustering import ClusterModel, MiniBatchKMeans, rfm_features
+from customer_segmentation.pipeline import score_rfm
+
+
+def make_rfm(n_customers, seed=0):
+    rng = np.random.default_rng(seed)
+    frequency = rng.geometric(0.35, n_customers)
+    return pd.DataFrame({
+        'CustomerID': np.arange(n_customers) + 12346,
+        'Recency': np.minimum(rng.exponential(90, n_customers).astype(np.int64) + 1, 373),
+        'Frequency': frequency,
+        'Monetary': np.round(rng.lognormal(5.0, 1.0, n_customers) * frequency ** 0.8, 2),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the k-means segmentation')
+    parser.add_argument('--customers', type=int, default=2_000_000)
+    parser.add_argument('--k', type=int, default=None, help='Clusters (default: sweep)')
+    parser.add_argument('--jobs', type=int, nargs='*', default=[1],
+                        help='Thread counts for the assignment pass')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rfm = score_rfm(make_rfm(args.customers, args.seed))
+    print(f'🧪 {len(rfm):,} customers')
+
+    start = time.perf_counter()
+    model, assigned = ClusterModel.fit(rfm, k=args.k, seed=args.seed)
+    total = time.perf_counter() - start
+    stats = model.stats
+    if 'sweep' in stats:
+        print(f'\n   k sweep on a shared sample: {stats["sweep_s"]:.2f}s')
+        print(stats['sweep'].to_string(index=False))
+    print(f'\n   fit (k={model.k})        {stats["fit_s"]:7.2f}s   '
+          f'{len(rfm) / stats["fit_s"]:>12,.0f} customers/s   ({stats["n_iter"]} batches)')
+    X = (rfm_features(rfm) - model.mean) / model.std
+    kmeans = MiniBatchKMeans(k=model.k)
+    kmeans.centers = model.centers
+    for jobs in args.jobs:
+        start = time.perf_counter()
+        model.predict(rfm, jobs=jobs)
+        seconds = time.perf_counter() - start
+        print(f'   predict (jobs={jobs})    {seconds:7.2f}s   {len(rfm) / seconds:>12,.0f} customers/s')
+    start = time.perf_counter()
+    for _ in range(1000):
+        model.assign([30], [3], [500.0])
+    print(f'   assign one customer  {(time.perf_counter() - start) * 1e3:7.3f}us   (O(k), no refit)')
+    print(f'   end to end           {total:7.2f}s')
+    print('\n' + model.centroids().to_string(index=False))
+
+    inertia = kmeans.inertia(X)
+    print(f'\n   inertia: this model {inertia:,.0f}')
+    try:
+        from sklearn.cluster import KMeans
+        from sklearn.cluster import MiniBatchKMeans as SkMiniBatchKMeans
+    except ImportError:
+        return
+    for name, estimator in (('sklearn MiniBatchKMeans', SkMiniBatchKMeans(model.k, batch_size=4096,
+                                                                          n_init=3, random_state=0)),
+                            ('sklearn KMeans', KMeans(model.k, n_init=1, random_state=0))):
+        start = time.perf_counter()
+        estimator.fit(X)
+        seconds = time.perf_counter() - start
+        print(f'   inertia: {name:<24} {kmeans_inertia(X, estimator.cluster_centers_):,.0f} '
+              f'(fit {seconds:.2f}s)')
+
+
+def kmeans_inertia(X, centers):
+    kmeans = MiniBatchKMeans(k=len(centers))
+    kmeans.centers = np.asarray(centers, dtype=np.float64)
+    return kmeans.inertia(X)
+
+
+if __name__ == '__main__':
+    main()
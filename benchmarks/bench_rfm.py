@@ -0,0 +1,106 @@
+"""Microbenchmark: Section 4 RFM with the original lambda vs ``compute_rfm``.
+
+The synthetic Online Retail generator tops out at a few hundred thousand
+customers for sane row counts, so this builds a cleaned-transaction frame
+directly with many customers and few lines each - the shape where the
+per-group Python lambda hurts most.
+
+Usage::
+
+    python -m benchmarks.bench_rfm --customers 1200000
+    python -m benchmarks.bench_rfm --customers 1200000 --jobs 8 16 32
+
+Parallel efficiency is the speedup over ``compute_rfm`` divided by the
+cores in use. On a single core it shows the sharding overhead alone: with
+1.2M customers (7.2M lines), compute_rfm takes 2.9s, and parallel_rfm with
+2 / 4 / 8 / 16 shards takes 4.1 / 4.3 / 4.7 / 5.9s, against 4.1 / 4.3 /
+5.8 / 8.9s when every worker hashed and filtered the whole table.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.parallel import parallel_rfm
+from customer_segmentation.pipeline import compute_rfm
+
+
+def lambda_rfm(df_clean, analysis_date):
+    """The original Section 4 builder (one Python call per customer)."""
+    rfm = df_clean.groupby('CustomerID').agg({
+        'InvoiceDate': lambda x: (analysis_date - x.max()).days,
+        'InvoiceNo': 'nunique',
+        'TotalAmount': 'sum'
+    }).reset_index()
+    rfm.columns = ['CustomerID', 'Recency', 'Frequency', 'Monetary']
+    return rfm
+
+
+def make_transactions(n_customers, invoices_per_customer=2, lines_per_invoice=3, seed=0):
+    rng = np.random.default_rng(seed)
+    n_invoices = n_customers * invoices_per_customer
+    invoice_customer = rng.permutation(np.repeat(np.arange(n_customers), invoices_per_customer))
+    invoice_date = (pd.Timestamp('2010-12-01')
+                    + pd.to_timedelta(rng.integers(0, 373 * 1440, n_invoices), unit='min')).to_numpy()
+    lines = rng.integers(1, 2 * lines_per_invoice, n_invoices)
+    invoice = np.repeat(np.arange(n_invoices), lines)
+    return pd.DataFrame({
+        'InvoiceNo': (536365 + invoice).astype(str),
+        'InvoiceDate': invoice_date[invoice],
+        'CustomerID': 12346 + invoice_customer[invoice],
+        'TotalAmount': np.round(rng.lognormal(2.0, 1.0, len(invoice)), 2),
+    })
+
+
+def best_of(repeat, func, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times), value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the RFM builder variants')
+    parser.add_argument('--customers', type=int, default=1_200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, nargs='*', default=[],
+                        help='Also time parallel_rfm with these process counts')
+    args = parser.parse_args(argv)
+
+    df_clean = make_transactions(args.customers, seed=args.seed)
+    analysis_date = df_clean['InvoiceDate'].max() + pd.Timedelta(days=1)
+    invoices = df_clean.groupby('InvoiceNo', as_index=False).agg(
+        CustomerID=('CustomerID', 'first'), InvoiceDate=('InvoiceDate', 'max'),
+        TotalAmount=('TotalAmount', 'sum'))
+    print(f'🧪 {len(df_clean):,} lines, {len(invoices):,} invoices, {args.customers:,} customers')
+
+    lambda_s, expected = best_of(1, lambda_rfm, df_clean, analysis_date)
+    native_s, native = best_of(args.repeat, compute_rfm, df_clean, analysis_date)
+    invoice_s, from_invoices = best_of(args.repeat, compute_rfm, None, analysis_date, invoices=invoices)
+
+    for name, rfm in (('compute_rfm', native), ('compute_rfm(invoices)', from_invoices)):
+        pd.testing.assert_frame_equal(rfm[['CustomerID', 'Recency', 'Frequency']],
+                                      expected[['CustomerID', 'Recency', 'Frequency']],
+                                      check_dtype=False)
+        np.testing.assert_allclose(rfm['Monetary'], expected['Monetary'], rtol=1e-9)
+        print(f'   ✓ {name} matches the lambda builder')
+
+    print(f'\n   {"lambda":<24} {lambda_s:8.3f}s')
+    print(f'   {"compute_rfm":<24} {native_s:8.3f}s   {lambda_s / native_s:6.1f}x')
+    print(f'   {"compute_rfm(invoices)":<24} {invoice_s:8.3f}s   {lambda_s / invoice_s:6.1f}x')
+    for jobs in args.jobs:
+        parallel_s, sharded = best_of(args.repeat, parallel_rfm, df_clean, analysis_date, jobs=jobs)
+        pd.testing.assert_frame_equal(sharded, native)
+        name = f'parallel_rfm(jobs={jobs})'
+        speedup = native_s / parallel_s
+        print(f'   {name:<24} {parallel_s:8.3f}s   {speedup:6.1f}x vs compute_rfm, '
+              f'{speedup / min(jobs, os.cpu_count() or 1):.0%} parallel efficiency')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Load test for the local scoring service.
+
+Opens ``--connections`` keep-alive connections to a running service and
+sends a mix of lookup, what-if scoring and ingest requests for
+``--seconds``, then prints client-side throughput and the service's own
+p50/p99 latencies from ``/metrics``.
+
+Usage::
+
+    python -m customer_segmentation.service --port 8765 &
+    python -m benchmarks.bench_service --port 8765 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from customer_segmentation.profiles import ProfileStore
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def make_requests(customer_ids, seed):
+    rng = np.random.default_rng(seed)
+    invoice = 900_000 + seed * 1_000_000
+    while True:
+        kind = rng.random()
+        if kind < 0.5:
+            yield 'GET', f'/customers/{rng.choice(customer_ids)}', None
+        elif kind < 0.7:
+            yield 'POST', '/lookup', {'customer_ids': rng.choice(customer_ids, 20).tolist()}
+        elif kind < 0.9:
+            yield 'POST', '/score', {'recency': int(rng.integers(1, 400)),
+                                     'frequency': int(rng.integers(1, 50)),
+                                     'monetary': float(rng.lognormal(6, 1.5))}
+        else:
+            invoice += 1
+            yield 'POST', '/transactions', {'customer_id': int(rng.choice(customer_ids)),
+                                            'invoice_no': str(invoice),
+                                            'invoice_date': '2011-12-09T12:00:00',
+                                            'amount': round(float(rng.lognormal(3, 1)), 2)}
+
+
+async def worker(host, port, customer_ids, seed, deadline, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    for method, path, payload in make_requests(customer_ids, seed):
+        if time.perf_counter() >= deadline:
+            break
+        status, _ = await request(reader, writer, method, path, payload)
+        counts[status] = counts.get(status, 0) + 1
+    writer.close()
+
+
+async def run(args, customer_ids):
+    counts = {}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(worker(args.host, args.port, customer_ids, seed, deadline, counts)
+                           for seed in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, metrics = await request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    return counts, elapsed, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the scoring service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profiles', default='outputs/profiles')
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args(argv)
+
+    customer_ids = np.asarray(ProfileStore.open(args.profiles).ids)
+    counts, elapsed, metrics = asyncio.run(run(args, customer_ids))
+    total = sum(counts.values())
+    print(f'✓ {total:,} requests in {elapsed:.1f}s = {total / elapsed:,.0f} req/s '
+          f'over {args.connections} connections (status codes: {counts})')
+    for endpoint, stats in metrics['endpoints'].items():
+        print(f"   {endpoint:<13} {stats['requests']:>8,}   p50 {stats['p50_ms']:.3f} ms   "
+              f"p99 {stats['p99_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Import and cold-start time of the CLI, each measured in a fresh interpreter.
+
+Usage::
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --run rfm report --cwd /path/with/data
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(cmd, repeat, cwd=None):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')])))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure CLI import and cold-start time')
+    parser.add_argument('--imports', nargs='*', default=['customer_segmentation.cli'],
+                        help='Modules to import in a fresh interpreter')
+    parser.add_argument('--run', nargs='*', default=['rfm --help'],
+                        help='CLI argument strings to run end to end')
+    parser.add_argument('--cwd', default=None, help='Working directory (with data/) for --run')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    baseline = time_command([sys.executable, '-c', 'pass'], args.repeat)
+    print(f'   {"python -c pass":<40} {baseline:7.3f}s')
+    for module in args.imports:
+        seconds = time_command([sys.executable, '-c', f'import {module}'], args.repeat)
+        print(f'   {"import " + module:<40} {seconds:7.3f}s   (+{seconds - baseline:.3f}s)')
+    for run in args.run:
+        seconds = time_command([sys.executable, '-m', 'customer_segmentation', *run.split()],
+                               args.repeat, cwd=args.cwd)
+        print(f'   {"customer_segmentation " + run:<40} {seconds:7.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Per-stage benchmark of the segmentation pipeline on synthetic data.
+
+Times load, clean, EDA aggregates, RFM, scoring, segmentation, charts and
+export separately at each requested size, samples peak RSS per stage and
+writes everything to JSON so runs can be compared across commits.
+
+Usage::
+
+    python -m benchmarks.run_benchmarks --rows 10000 100000 1000000
+    python -m benchmarks.run_benchmarks --rows 100000 --compare benchmarks/results/<old>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic_data import write_transactions
+from customer_segmentation.aggregates import FusedAggregates
+from customer_segmentation.charts import render_charts
+from customer_segmentation.export import ExportStats, write_report, write_table
+from customer_segmentation.ingest import load_transactions
+from customer_segmentation.instrument import MemorySampler
+from customer_segmentation.pipeline import (analysis_date_for, clean_transactions, compute_rfm,
+                                            eda_tables, score_rfm, segment_rfm, segment_tables)
+
+DATA_DIR = os.path.join('benchmarks', 'data')
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+
+def timed(results, name, func, *args, **kwargs):
+    with MemorySampler() as mem:
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    results[name] = {
+        'seconds': round(seconds, 4),
+        'peak_rss_mb': round(mem.peak, 1),
+        'peak_delta_mb': round(mem.peak - mem.start, 1),
+    }
+    print(f'   {name:<14} {seconds:8.3f}s   peak RSS {mem.peak:8.1f} MB')
+    return value
+
+
+def run_pipeline(path, work_dir, charts=True):
+    stages = {}
+    cache_dir = os.path.join(work_dir, 'cache')
+    timed(stages, 'load_cold', load_transactions, path, cache_dir=cache_dir, verbose=False)
+    df = timed(stages, 'load_warm', load_transactions, path, cache_dir=cache_dir, verbose=False)
+    df_clean, _ = timed(stages, 'clean', clean_transactions, df)
+    del df
+    analysis_date = analysis_date_for(df_clean)
+    # Reference pandas groupbys vs the fused engine the script uses
+    timed(stages, 'eda_pandas', eda_tables, df_clean)
+    timed(stages, 'rfm_pandas', compute_rfm, df_clean, analysis_date)
+    aggregates = timed(stages, 'factorize', FusedAggregates, df_clean)
+    eda = timed(stages, 'eda', aggregates.eda_tables)
+    rfm = timed(stages, 'rfm', aggregates.rfm, analysis_date)
+    rfm = timed(stages, 'scoring', score_rfm, rfm)
+    rfm = timed(stages, 'segmentation', segment_rfm, rfm)
+    segment_counts, segment_analysis = timed(stages, 'segment_tables', segment_tables, rfm)
+    if charts:
+        timed(stages, 'charts', render_charts, {
+            'segment_counts': segment_counts,
+            'segment_analysis': segment_analysis,
+            'rfm': rfm,
+            'monthly_revenue': eda['monthly_revenue'],
+            'country_revenue': eda['country_revenue'],
+        }, out_dir=os.path.join(work_dir, 'charts'), verbose=False)
+
+    def export():
+        stats = ExportStats()
+        write_report(os.path.join(work_dir, 'report.xlsx'), {
+            'RFM_Analysis': rfm,
+            'Segment_Summary': segment_analysis,
+            'Segment_Distribution': segment_counts,
+            'Country_Analysis': eda['country_revenue'],
+            'Monthly_Trend': eda['monthly_revenue'],
+        }, index_sheets=('Country_Analysis',), stats=stats)
+        write_table(rfm, os.path.join(work_dir, 'rfm.parquet'), stats=stats)
+        write_table(rfm, os.path.join(work_dir, 'rfm.csv'), stats=stats)
+
+    timed(stages, 'export', export)
+    return stages, {'clean_rows': len(df_clean), 'customers': len(rfm)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    old = {(run['rows'], stage): v['seconds']
+           for run in baseline['runs'] for stage, v in run['stages'].items()}
+    rows = []
+    for run in current['runs']:
+        for stage, v in run['stages'].items():
+            if (run['rows'], stage) in old:
+                before = old[(run['rows'], stage)]
+                rows.append({'rows': run['rows'], 'stage': stage, 'before_s': before,
+                             'after_s': v['seconds'],
+                             'ratio': round(v['seconds'] / max(before, 1e-9), 2)})
+    print(f"\n📊 Compared with {baseline_path} ({baseline.get('git_commit')}):")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the segmentation pipeline')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-charts', action='store_true')
+    parser.add_argument('--out', default=None, help='Results JSON path')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to compare with')
+    args = parser.parse_args(argv)
+
+    results = {
+        'git_commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'runs': [],
+    }
+    for n_rows in args.rows:
+        path = os.path.join(DATA_DIR, f'retail_{n_rows}_s{args.seed}.parquet')
+        if not os.path.exists(path):
+            print(f'\n🧪 Generating {n_rows:,} synthetic rows -> {path}')
+            write_transactions(n_rows, path, seed=args.seed)
+        print(f'\n⏱ Pipeline on {n_rows:,} rows')
+        with tempfile.TemporaryDirectory() as work_dir:
+            stages, sizes = run_pipeline(path, work_dir, charts=not args.no_charts)
+        results['runs'].append({'rows': n_rows, **sizes, 'stages': stages})
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{results['git_commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(f'\n✓ Results saved: {out}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Seeded synthetic transactions with the Online Retail (``data/or.xlsx``) schema.
+
+Shape follows the real dataset: ~21 lines per invoice, ~2% cancelled
+invoices (``C`` prefix, negative quantities), ~25% of invoices without a
+CustomerID, power-law customer and product popularity, and a UK-dominated
+country mix. Rows are generated in chunks, so 50M-row Parquet files can be
+written with bounded memory.
+
+Usage::
+
+    python -m benchmarks.synthetic_data 1000000 benchmarks/data/retail_1m.parquet
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity', 'InvoiceDate',
+           'UnitPrice', 'CustomerID', 'Country']
+
+OTHER_COUNTRIES = [
+    'Germany', 'France', 'EIRE', 'Spain', 'Netherlands', 'Belgium', 'Switzerland',
+    'Portugal', 'Australia', 'Norway', 'Italy', 'Channel Islands', 'Finland', 'Cyprus',
+    'Sweden', 'Austria', 'Denmark', 'Japan', 'Poland', 'Israel', 'USA', 'Hong Kong',
+    'Singapore', 'Iceland', 'Canada', 'Greece', 'Malta', 'United Arab Emirates',
+    'European Community', 'RSA', 'Lebanon', 'Lithuania', 'Brazil', 'Czech Republic',
+    'Bahrain', 'Saudi Arabia', 'Unspecified',
+]
+UK_SHARE = 0.89
+LINES_PER_INVOICE = 21
+CUSTOMERS_PER_INVOICE = 0.17
+CANCELLATION_RATE = 0.02
+MISSING_CUSTOMER_RATE = 0.25
+FIRST_INVOICE_NO = 536365
+FIRST_CUSTOMER_ID = 12346
+
+
+def _power_law_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+class RetailGenerator:
+    """Draws chunks of transactions from a fixed synthetic population."""
+
+    def __init__(self, n_rows, seed=0, start='2010-12-01', days=373):
+        self.n_rows = n_rows
+        self.rng = np.random.default_rng(seed)
+        self.start = pd.Timestamp(start)
+        self.days = days
+
+        n_invoices = max(1, n_rows // LINES_PER_INVOICE)
+        self.n_customers = max(10, int(n_invoices * CUSTOMERS_PER_INVOICE))
+        self.n_products = max(50, int(4000 * (n_rows / 540_000) ** 0.25))
+
+        self.customer_weights = _power_law_weights(self.n_customers, 0.8)
+        self.product_weights = _power_law_weights(self.n_products, 0.9)
+        country_weights = _power_law_weights(len(OTHER_COUNTRIES), 1.2) * (1 - UK_SHARE)
+        countries = np.array(['United Kingdom'] + OTHER_COUNTRIES, dtype=object)
+        self.customer_country = countries[self.rng.choice(
+            len(countries), self.n_customers, p=np.concatenate([[UK_SHARE], country_weights]))]
+
+        codes = 20000 + np.arange(self.n_products)
+        suffix = np.where(self.rng.random(self.n_products) < 0.15, 'A', '')
+        self.stock_codes = np.char.add(codes.astype(str), suffix).astype(object)
+        self.descriptions = np.array([f'PRODUCT {code}' for code in self.stock_codes], dtype=object)
+        self.base_prices = np.round(self.rng.lognormal(1.0, 0.8, self.n_products), 2)
+        self._next_invoice = FIRST_INVOICE_NO
+        self._day_offset = 0.0
+
+    def chunk(self, n_rows):
+        rng = self.rng
+        n_invoices = max(1, n_rows // LINES_PER_INVOICE)
+        lines = rng.multinomial(n_rows - n_invoices, np.full(n_invoices, 1 / n_invoices)) + 1
+
+        invoice_ids = self._next_invoice + np.arange(n_invoices)
+        self._next_invoice += n_invoices
+        invoice_no = invoice_ids.astype(str).astype(object)
+        cancelled = rng.random(n_invoices) < CANCELLATION_RATE
+        invoice_no[cancelled] = 'C' + invoice_no[cancelled]
+
+        # Invoice timestamps move forward through the period chunk by chunk
+        span = self.days * n_rows / self.n_rows
+        offsets = self._day_offset + np.sort(rng.random(n_invoices)) * span
+        self._day_offset += span
+        invoice_date = (self.start + pd.to_timedelta(np.floor(offsets * 1440), unit='min')).to_numpy()
+
+        customer = rng.choice(self.n_customers, n_invoices, p=self.customer_weights)
+        customer_id = (FIRST_CUSTOMER_ID + customer).astype(np.float64)
+        customer_id[rng.random(n_invoices) < MISSING_CUSTOMER_RATE] = np.nan
+        country = self.customer_country[customer]
+
+        product = rng.choice(self.n_products, n_rows, p=self.product_weights)
+        quantity = rng.geometric(0.15, n_rows).astype(np.int64)
+        line_cancelled = np.repeat(cancelled, lines)
+        quantity[line_cancelled] *= -1
+        price = self.base_prices[product] * rng.choice([1.0, 0.85, 1.25], n_rows, p=[0.8, 0.15, 0.05])
+        price[rng.random(n_rows) < 0.0005] = 0.0
+
+        return pd.DataFrame({
+            'InvoiceNo': np.repeat(invoice_no, lines),
+            'StockCode': self.stock_codes[product],
+            'Description': self.descriptions[product],
+            'Quantity': quantity,
+            'InvoiceDate': np.repeat(invoice_date, lines),
+            'UnitPrice': np.round(price, 2),
+            'CustomerID': np.repeat(customer_id, lines),
+            'Country': np.repeat(country, lines),
+        }, columns=COLUMNS)
+
+    def chunks(self, chunksize=1_000_000):
+        remaining = self.n_rows
+        while remaining > 0:
+            n = min(chunksize, remaining)
+            yield self.chunk(n)
+            remaining -= n
+
+
+def generate_transactions(n_rows, seed=0):
+    """Return ``n_rows`` synthetic transactions as one DataFrame."""
+    return pd.concat(RetailGenerator(n_rows, seed).chunks(), ignore_index=True)
+
+
+def write_transactions(n_rows, path, seed=0, chunksize=1_000_000):
+    """Write synthetic transactions to .parquet, .csv or .xlsx (small only)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    generator = RetailGenerator(n_rows, seed)
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for chunk in generator.chunks(chunksize):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        writer.close()
+    elif path.endswith('.csv'):
+        for i, chunk in enumerate(generator.chunks(chunksize)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    elif path.endswith('.xlsx'):
+        pd.concat(generator.chunks(chunksize), ignore_index=True).to_excel(path, index=False)
+    else:
+        raise ValueError(f'Unsupported output format: {path}')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate Online-Retail-shaped transactions')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_transactions(args.rows, args.path, seed=args.seed)
+    print(f'✓ {args.rows:,} synthetic transactions written to {args.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Helpers for the customer segmentation & RFM analysis pipeline."""
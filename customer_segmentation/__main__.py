@@ -0,0 +1,3 @@
+from customer_segmentation.cli import main
+
+main()
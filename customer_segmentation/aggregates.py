@@ -0,0 +1,193 @@
+"""Single-pass fused aggregation for the Section 3 EDA tables and Section 4 RFM.
+
+The pandas version runs a separate groupby for InvoiceNo, Country,
+(StockCode, Description), YearMonth and CustomerID, each with its own
+``nunique`` hashing. :class:`FusedAggregates` factorizes those keys to integer
+codes once and builds every table from the shared code arrays with
+``np.bincount``-style kernels.
+
+Distinct-order counts reuse a per-invoice reduction: when a key (country,
+month, customer) is constant within each invoice - which it is for real
+transaction logs - orders per key is a bincount over invoices, and distinct
+customers per key only needs the (key, customer) pairs of the invoices, not
+of every line. Keys that vary within an invoice fall back to exact pair
+deduplication.
+
+Counts and dates match the pandas tables exactly; revenue sums agree to
+floating-point rounding (bincount adds in a different order).
+"""
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.pipeline import month_code, month_label
+
+NS_PER_DAY = 86_400_000_000_000
+
+
+def _factorize(values):
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), uniques
+
+
+def _distinct_per_key(key, other, n_key, n_other):
+    """Number of distinct ``other`` codes per ``key`` code (both int arrays)."""
+    pairs = pd.unique(key * n_other + other)
+    return np.bincount(pairs // n_other, minlength=n_key)
+
+
+class FusedAggregates:
+    """Factorize ``df_clean`` once and serve all Section 3/4 aggregates."""
+
+    def __init__(self, df_clean):
+        self.amount = df_clean['TotalAmount'].to_numpy(dtype=np.float64)
+        self.quantity = df_clean['Quantity'].to_numpy(dtype=np.int64)
+        self.dates = df_clean['InvoiceDate'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        self.inv, self.invoice_labels = _factorize(df_clean['InvoiceNo'])
+        self.cust, self.customer_labels = _factorize(df_clean['CustomerID'])
+        self.country, self.country_labels = _factorize(df_clean['Country'])
+        year_month = (df_clean['YearMonth'] if 'YearMonth' in df_clean
+                      else month_code(df_clean['InvoiceDate']))
+        self.month, self.month_labels = _factorize(np.asarray(year_month, dtype=np.int64))
+
+        # (StockCode, Description) in groupby order; rows without a
+        # Description are dropped like groupby(dropna=True) does
+        stock, self.stock_labels = _factorize(df_clean['StockCode'])
+        desc, self.desc_labels = _factorize(df_clean['Description'])
+        self.stock, self.desc = stock, desc
+        self.product_rows = desc >= 0
+        self.product, product_uniques = _factorize(
+            stock[self.product_rows] * max(len(self.desc_labels), 1) + desc[self.product_rows])
+        self.product_stock = product_uniques // max(len(self.desc_labels), 1)
+        self.product_desc = product_uniques % max(len(self.desc_labels), 1)
+
+        self.n_inv = len(self.invoice_labels)
+        self._build_invoices()
+
+    def _build_invoices(self):
+        """Per-invoice reduction shared by every distinct-order count."""
+        n = self.n_inv
+        first = np.full(n, len(self.inv), dtype=np.int64)
+        np.minimum.at(first, self.inv, np.arange(len(self.inv)))
+        last_date = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last_date, self.inv, self.dates)
+        first_date = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_date, self.inv, self.dates)
+        self.invoice_amount = np.bincount(self.inv, weights=self.amount, minlength=n)
+        self.invoice_last_date = last_date
+        self.invoice_first_date = first_date
+        # Attribute of each invoice, and whether it is constant within it
+        self.invoice_attr = {}
+        for name in ('cust', 'country', 'month'):
+            codes = getattr(self, name)
+            per_invoice = codes[first]
+            constant = bool((per_invoice[self.inv] == codes).all())
+            self.invoice_attr[name] = (per_invoice, constant)
+
+    def customer_segments(self, segments):
+        """Segment code of every customer code, and the segment labels, from
+        the Section 5 table (CustomerID, Segment)."""
+        categories = pd.Categorical(segments['Segment'])
+        segment_of = pd.Series(categories.codes, index=segments['CustomerID'].to_numpy())
+        codes = segment_of.reindex(np.asarray(self.customer_labels)).to_numpy()
+        if np.isnan(codes).any() or (codes < 0).any():
+            raise ValueError('segments is missing customers present in the transactions')
+        return codes.astype(np.int64), list(categories.categories)
+
+    @property
+    def invoices(self):
+        """One row per invoice: CustomerID, InvoiceNo, InvoiceDate (max) and
+        TotalAmount (sum) - the input ``compute_rfm`` accepts."""
+        per_invoice, _ = self.invoice_attr['cust']
+        return pd.DataFrame({
+            'CustomerID': np.asarray(self.customer_labels)[per_invoice],
+            'InvoiceNo': np.asarray(self.invoice_labels),
+            'InvoiceDate': self.invoice_last_date.view('datetime64[ns]'),
+            'TotalAmount': self.invoice_amount,
+        })
+
+    def _orders(self, name, n_key):
+        per_invoice, constant = self.invoice_attr[name]
+        if constant:
+            return np.bincount(per_invoice, minlength=n_key)
+        return _distinct_per_key(getattr(self, name), self.inv, n_key, self.n_inv)
+
+    def _customers(self, name, n_key):
+        per_invoice, constant = self.invoice_attr[name]
+        cust_per_invoice, cust_constant = self.invoice_attr['cust']
+        n_cust = len(self.customer_labels)
+        if constant and cust_constant:
+            return _distinct_per_key(per_invoice, cust_per_invoice, n_key, n_cust)
+        return _distinct_per_key(getattr(self, name), self.cust, n_key, n_cust)
+
+    def totals(self):
+        """Section 3 headline numbers."""
+        return {
+            'total_revenue': self.amount.sum(),
+            'total_orders': self.n_inv,
+            'total_customers': len(self.customer_labels),
+            'avg_order_value': self.invoice_amount.mean(),
+        }
+
+    def country_revenue(self):
+        n_country = len(self.country_labels)
+        country_revenue = pd.DataFrame({
+            'revenue': np.bincount(self.country, weights=self.amount, minlength=n_country),
+            'orders': self._orders('country', n_country),
+            'customers': self._customers('country', n_country),
+        }, index=pd.Index(self.country_labels, name='Country'))
+        country_revenue = country_revenue.sort_values('revenue', ascending=False)
+        country_revenue['revenue_share_%'] = (country_revenue['revenue'] / self.amount.sum()
+                                              * 100).round(2)
+        return country_revenue
+
+    def product_revenue(self):
+        n_product = len(self.product_stock)
+        product_inv = self.inv[self.product_rows]
+        return pd.DataFrame({
+            'StockCode': np.asarray(self.stock_labels)[self.product_stock],
+            'Description': np.asarray(self.desc_labels)[self.product_desc],
+            'revenue': np.bincount(self.product, weights=self.amount[self.product_rows],
+                                   minlength=n_product),
+            'quantity_Sold': np.bincount(self.product, weights=self.quantity[self.product_rows],
+                                         minlength=n_product).astype(np.int64),
+            'time_ordered': _distinct_per_key(self.product, product_inv, n_product, self.n_inv),
+        }).sort_values('revenue', ascending=False).reset_index(drop=True)
+
+    def monthly_revenue(self):
+        n_month = len(self.month_labels)
+        months = np.asarray(self.month_labels)
+        return pd.DataFrame({
+            'YearMonth': month_label(months),
+            'revenue': np.bincount(self.month, weights=self.amount, minlength=n_month),
+            'orders': self._orders('month', n_month),
+            'customers': self._customers('month', n_month),
+        })
+
+    def eda_tables(self):
+        """Same dict as ``pipeline.eda_tables``."""
+        return {
+            **self.totals(),
+            'country_revenue': self.country_revenue(),
+            'product_revenue': self.product_revenue(),
+            'monthly_revenue': self.monthly_revenue(),
+        }
+
+    def rfm(self, analysis_date):
+        """Section 4 Recency / Frequency / Monetary (plus Tenure) per customer."""
+        n_cust = len(self.customer_labels)
+        cust_per_invoice, constant = self.invoice_attr['cust']
+        last = np.full(n_cust, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last, cust_per_invoice if constant else self.cust,
+                      self.invoice_last_date if constant else self.dates)
+        first = np.full(n_cust, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, cust_per_invoice if constant else self.cust,
+                      self.invoice_first_date if constant else self.dates)
+        today = pd.Timestamp(analysis_date).as_unit('ns').value
+        return pd.DataFrame({
+            'CustomerID': np.asarray(self.customer_labels),
+            'Recency': (today - last) // NS_PER_DAY,
+            'Frequency': self._orders('cust', n_cust),
+            'Monetary': np.bincount(self.cust, weights=self.amount, minlength=n_cust),
+            'Tenure': (today - first) // NS_PER_DAY,
+        })
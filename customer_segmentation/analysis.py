@@ -0,0 +1,584 @@
+"""The nine sections of the segmentation analysis as one importable pipeline.
+
+:class:`Analysis` holds the tables produced so far and runs the sections in
+order; the CLI subcommands (``rfm``, ``segment``, ``charts``, ``report``)
+simply stop at different points. Modules that are slow to import are only
+imported by the section that needs them - plotting (matplotlib / seaborn)
+in Section 6, the Excel writers in Section 9, the process pool when
+``rfm_jobs > 1`` - so producing the RFM table never pays for them.
+
+Section 3 runs after segmentation: its tables are roll-ups of the
+(month, country, product, segment) cube in ``cube.py``.
+
+Every section runs as an instrumented stage (see ``instrument.py``). The
+long ``head()`` / ``info()`` / ``describe()`` dumps are printed only with
+``show_eda=True``.
+"""
+import os
+
+import pandas as pd
+
+from customer_segmentation.export import DEFAULT_MAX_EXCEL_ROWS
+from customer_segmentation.instrument import StageRecorder
+from customer_segmentation.pipeline import (analysis_date_for, clean_transactions, compute_rfm,
+                                            score_rfm, segment_rfm, segment_tables)
+
+RECOMMENDATIONS = pd.DataFrame({
+    'Segment': [
+        'Champions',
+        'Loyal Customers',
+        'Potential Loyalists',
+        'New Customers',
+        'At Risk',
+        'Need Attention',
+        'Hibernating',
+        'Lost'
+    ],
+    'Marketing Action': [
+        '🏆 Reward! Early access, VIP treatment, referral incentives',
+        '💎 Upsell higher-value products, loyalty programs',
+        '🌱 Free shipping, membership programs, recommendations',
+        '🎁 Onboarding series, welcome discount for 2nd purchase',
+        '⚠️ Win them back! Limited-time offers, "We miss you" emails',
+        '📢 Re-engagement campaigns, special promotions',
+        '😴 Deep discounts, reactivation campaigns',
+        '🔄 Last attempt - big incentives, survey why they left'
+    ],
+    'Priority': [1, 2, 3, 4, 2, 3, 4, 5]
+})
+
+
+def banner(title):
+    print("\n" + "━" * 70)
+    print(f"  {title}")
+    print("━" * 70)
+
+
+class Analysis:
+    """Runs the sections against one data source and keeps their outputs."""
+
+    def __init__(self, source='data/or.xlsx', out_dir='outputs', charts_dir='charts',
+                 show_eda=False, rfm_jobs=1, jobs=1, scatter_max_points=50_000,
+                 segmentation='rules', clusters=None, clv_horizon=365,
+                 basket_min_support=0.01, max_excel_rows=DEFAULT_MAX_EXCEL_ROWS,
+                 recorder=None):
+        self.source = source
+        self.out_dir = out_dir
+        self.charts_dir = charts_dir
+        self.show_eda = show_eda
+        self.rfm_jobs = rfm_jobs
+        self.jobs = jobs
+        self.scatter_max_points = scatter_max_points
+        self.segmentation = segmentation
+        self.clusters = clusters
+        self.cluster_model = None
+        self.clv_horizon = clv_horizon
+        self.clv_model = None
+        self.basket_min_support = basket_min_support
+        self.basket_pairs = None
+        self.max_excel_rows = max_excel_rows
+        self.cohorts = None
+        self.recorder = recorder or StageRecorder()
+        self.aggregates = None
+        self.rfm = None
+        self.cube = None
+        self.eda = None
+        self._artifact_cache = None
+        self._export_stats = None
+
+    @property
+    def artifact_cache(self):
+        # Outputs whose input tables and parameters are unchanged are skipped
+        if self._artifact_cache is None:
+            from customer_segmentation.artifacts import ArtifactCache
+            self._artifact_cache = ArtifactCache(os.path.join(self.out_dir, '.artifact_manifest.json'))
+        return self._artifact_cache
+
+    @property
+    def export_stats(self):
+        if self._export_stats is None:
+            from customer_segmentation.export import ExportStats
+            self._export_stats = ExportStats()
+        return self._export_stats
+
+    # ── SECTION 1: DATA LOADING & EXPLORATION ───────────────────────
+    def load(self):
+        from customer_segmentation.ingest import load_transactions
+
+        banner("SECTION 1: DATA LOADING & EXPLORATION")
+        with self.recorder.stage('1_load') as stage:
+            # Parsed once into a typed columnar cache, memory-mapped on later runs
+            df = self.df = load_transactions(self.source)
+
+            print(f"\n📦 Dataset loaded!")
+            print(f"   Shape: {df.shape[0]:,} rows × {df.shape[1]} columns")
+            print(f"   Date range: {df['InvoiceDate'].min().date()} to {df['InvoiceDate'].max().date()}")
+            print(f"   Unique customers: {df['CustomerID'].nunique():,}")
+
+            if self.show_eda:
+                print("\n📋 First 5 rows:")
+                print(df.head().to_string())
+
+                print("\n🔍 Column Info:")
+                df.info()
+
+                print("\n📊 Statistical Summary:")
+                print(df.describe().to_string())
+
+                print("\n🔎 Missing Values:")
+                missing = pd.DataFrame({
+                    'Missing Count': df.isnull().sum(),
+                    'Missing %': (df.isnull().sum() / len(df) * 100).round(2)
+                })
+                print(missing[missing['Missing Count'] > 0].to_string())
+            stage.outputs(df)
+
+    # ── SECTION 2: DATA CLEANING ────────────────────────────────────
+    def clean(self):
+        banner("SECTION 2: DATA CLEANING")
+        print(f"\nBefore cleaning: {len(self.df):,} rows")
+        with self.recorder.stage('2_clean', inputs=self.df) as stage:
+            # One combined mask; raw columns are released as they are filtered
+            df_clean, clean_counts = clean_transactions(self.df, release=True)
+            del self.df
+            self.df_clean = df_clean
+            print(f"after removing missing CustomerID {clean_counts['with_customer_id']:,}rows")
+            print(f"after removing cancellations : {clean_counts['without_cancellations']:,}rows")
+            print(f"After removing negative values: {clean_counts['positive_values']:,}rows")
+
+            print(f'cleaning completed! ')
+            print(f'final dataset :{len(df_clean):,}rows')
+            print(f"customers : {df_clean['CustomerID'].nunique():,}")
+            print(f"total revenue : ${df_clean['TotalAmount'].to_numpy(dtype='float64').sum():,.2f}")
+            print(f" missing values after cleaning: {df_clean.isnull().sum().sum()}")
+            stage.outputs(df_clean)
+
+    # ── SECTION 3: EXPLORATORY DATA ANALYSIS (EDA) ──────────────────
+    def factorize(self):
+        """Factorize the Section 3/4 keys once; the RFM and the cube share them."""
+        from customer_segmentation.aggregates import FusedAggregates
+
+        with self.recorder.stage('3_factorize', inputs=self.df_clean):
+            self.aggregates = FusedAggregates(self.df_clean)
+
+    def explore(self):
+        from customer_segmentation.aggregates import FusedAggregates
+        from customer_segmentation.cube import Cube
+
+        banner("SECTION 3: EXPLORATORY DATA ANALYSIS")
+        with self.recorder.stage('3_eda', inputs=self.df_clean) as stage:
+            if self.aggregates is None:
+                self.aggregates = FusedAggregates(self.df_clean)
+            # (month, country, product, segment) cube; every table below is a
+            # roll-up of it, and it is saved for ad-hoc slicing
+            segments = self.rfm
+            self.cube = Cube.build(self.aggregates, segments)
+            self.cube.save(os.path.join(self.out_dir, 'cube'))
+            eda = self.eda = self.cube.eda_tables()
+
+            print(f"Total Revenue: ${eda['total_revenue']:,.2f}")
+            print(f"Total Orders: {eda['total_orders']:,}")
+            print(f"Total Customers: {eda['total_customers']:,}")
+            print(f"Average Order Value: ${eda['avg_order_value']:,.2f}")
+
+            print(f' top 10 countries by revenue :')
+            print(eda['country_revenue'].head(10).to_string())
+
+            print(f'top 10 Product by Revenue :')
+            print(eda['product_revenue'].head(10).to_string(index=False))
+
+            print("\n📊 Monthly Revenue Trend:")
+            print(eda['monthly_revenue'].to_string(index=False))
+
+            if segments is not None:
+                print("\n📊 Revenue by Segment:")
+                print(self.cube.rollup('segment').sort_values('revenue', ascending=False)
+                      .to_string(index=False))
+            print(f"✓ Cube saved: {self.out_dir}/cube/ ({len(self.cube.meta['cuboids'])} cuboids)")
+            stage.outputs([eda['country_revenue'], eda['product_revenue'], eda['monthly_revenue']])
+
+    # ── SECTION 3B: MARKET BASKET ANALYSIS ──────────────────────────
+    def basket(self):
+        if not self.basket_min_support:
+            return
+        from customer_segmentation.aggregates import FusedAggregates
+        from customer_segmentation.basket import Baskets, save_pairs
+
+        banner("SECTION 3B: MARKET BASKET ANALYSIS")
+        with self.recorder.stage('3b_basket', inputs=self.df_clean) as stage:
+            if self.aggregates is None:
+                self.aggregates = FusedAggregates(self.df_clean)
+            # Sparse invoice x StockCode matrix; pair counts are X.T @ X over
+            # the products above the minimum support (see basket.py)
+            baskets = Baskets(self.aggregates)
+            tables = {'All': baskets.pairs(self.basket_min_support)}
+            if self.rfm is not None and 'Segment' in self.rfm:
+                tables.update(baskets.segment_pairs(self.rfm, self.basket_min_support))
+            self.basket_pairs = tables
+
+            print(f"🛒 Products bought together (support ≥ {self.basket_min_support:.1%} of orders):")
+            print(tables['All'].head(10).to_string(index=False))
+            print("\n📊 Strongest pair per segment:")
+            for segment, pairs in tables.items():
+                if segment != 'All' and len(pairs):
+                    top = pairs.iloc[0]
+                    print(f"   {segment:<20} {top['StockCode_A']} + {top['StockCode_B']}  "
+                          f"lift {top['Lift']:.1f}, {top['Orders']:,} orders ({len(pairs):,} pairs)")
+            save_pairs(tables, os.path.join(self.out_dir, 'basket'))
+            print(f"✓ Pairs saved: {self.out_dir}/basket/ (one CSV per segment)")
+            stage.outputs(list(tables.values()))
+
+    # ── SECTION 3C: COHORT RETENTION ────────────────────────────────
+    def cohort_analysis(self):
+        from customer_segmentation.aggregates import FusedAggregates
+        from customer_segmentation.cohorts import cohort_tables
+
+        banner("SECTION 3C: COHORT RETENTION")
+        with self.recorder.stage('3c_cohorts', inputs=self.df_clean) as stage:
+            if self.aggregates is None:
+                self.aggregates = FusedAggregates(self.df_clean)
+            # First-purchase month cohorts x months since acquisition, one
+            # vectorized pass over the month codes (see cohorts.py)
+            cohorts = self.cohorts = cohort_tables(self.aggregates)
+            retention = cohorts['cohort_retention']
+            print(f"✓ {len(retention):,} monthly cohorts")
+            print("\n📊 Retention by Months Since First Purchase (first 6 months):")
+            print(retention.iloc[:, :8].to_string(index=False, float_format='{:.0%}'.format,
+                                                   na_rep=''))
+            stage.outputs(list(cohorts.values()))
+
+    # ── SECTION 4: RFM ANALYSIS - THE CORE ──────────────────────────
+    def compute_rfm(self):
+        banner("SECTION 4: RFM ANALYSIS")
+        with self.recorder.stage('4_rfm', inputs=self.df_clean) as stage:
+            # Set analysis date as 1 day after the last transaction
+            self.analysis_date = analysis_date_for(self.df_clean)
+            print(f"\n📅 Analysis Date: {self.analysis_date.date()}")
+            print(f"   (This is the 'today' for RFM calculation)\n")
+
+            # Per customer, optionally across customer shards; scoring below
+            # stays one global pass either way
+            if self.rfm_jobs > 1:
+                from customer_segmentation.parallel import parallel_rfm
+                rfm = parallel_rfm(self.df_clean, self.analysis_date, jobs=self.rfm_jobs)
+            elif self.aggregates is not None:
+                rfm = self.aggregates.rfm(self.analysis_date)
+            else:
+                rfm = compute_rfm(self.df_clean, self.analysis_date)
+            print(f"✓ RFM calculated for {len(rfm):,} customers")
+
+            if self.show_eda:
+                print("\n📊 RFM Statistics:")
+                print(rfm.describe().to_string())
+
+                print("\n📋 Sample RFM Data (First 10 customers):")
+                print(rfm.head(10).to_string(index=False))
+
+            # Create RFM scores (1-5 scale, 5 is best)
+            print("\n🔧 Creating RFM Scores...")
+            rfm = self.rfm = score_rfm(rfm)
+
+            print("✓ RFM Scores calculated!")
+            print("\n📋 Sample RFM Scores (First 10):")
+            print(rfm[['CustomerID', 'Recency', 'Frequency', 'Monetary', 'R_Score', 'F_Score',
+                       'M_Score', 'RFM_Score']].head(10).to_string(index=False))
+            stage.outputs(rfm)
+
+    # ── SECTION 5: CUSTOMER SEGMENTATION ────────────────────────────
+    def segment(self):
+        banner("SECTION 5: CUSTOMER SEGMENTATION")
+        with self.recorder.stage('5_segmentation', inputs=self.rfm) as stage:
+            if self.segmentation == 'kmeans':
+                # Mini-batch k-means on log-scaled RFM; clusters are named by
+                # the segment their centroid falls into (see clustering.py)
+                from customer_segmentation.clustering import cluster_rfm, print_fit_report
+                self.rfm, self.cluster_model = cluster_rfm(self.rfm, k=self.clusters)
+                print_fit_report(self.cluster_model)
+            else:
+                # Segment rules (see segments.py) are compiled to a 5x5x5 (R, F, M)
+                # lookup, so this is one vectorized indexing step
+                self.rfm = segment_rfm(self.rfm)
+            print("✓ Customers segmented!")
+
+            print("\n📊 Customer Segment Distribution:")
+            self.segment_counts, self.segment_analysis = segment_tables(self.rfm)
+            print(self.segment_counts.to_string(index=False))
+
+            print("\n📊 Detailed Segment Analysis:")
+            print(self.segment_analysis.to_string(index=False))
+            stage.outputs([self.segment_counts, self.segment_analysis])
+
+    # ── SECTION 5B: CUSTOMER LIFETIME VALUE ─────────────────────────
+    def clv(self):
+        if not self.clv_horizon:
+            return
+        from customer_segmentation.clv import add_clv, print_fit_report
+
+        banner("SECTION 5B: CUSTOMER LIFETIME VALUE")
+        with self.recorder.stage('5b_clv', inputs=self.rfm) as stage:
+            # BG/NBD purchases + Gamma-Gamma order values fitted to the RFM
+            # table; adds predicted purchases, churn probability and value
+            self.rfm, self.clv_model = add_clv(self.rfm, self.clv_horizon)
+            print_fit_report(self.clv_model, self.rfm)
+            stage.outputs(self.rfm)
+
+    # ── SECTION 6: VISUALIZATIONS ───────────────────────────────────
+    def charts(self):
+        from customer_segmentation.charts import render_charts
+
+        banner("SECTION 6: CREATING VISUALIZATIONS")
+        with self.recorder.stage('6_charts', inputs=self.rfm):
+            # Each chart is an independent task; jobs > 1 renders them in a process pool
+            render_charts({
+                'segment_counts': self.segment_counts,
+                'segment_analysis': self.segment_analysis,
+                'rfm': self.rfm,
+                'monthly_revenue': self.eda['monthly_revenue'],
+                'country_revenue': self.eda['country_revenue'],
+                'cohort_retention': self.cohorts['cohort_retention'],
+            }, out_dir=self.charts_dir, jobs=self.jobs,
+               scatter_max_points=self.scatter_max_points, cache=self.artifact_cache)
+
+    # ── SECTION 7: KEY FINDINGS & INSIGHTS ──────────────────────────
+    def findings(self):
+        banner("SECTION 7: KEY FINDINGS & INSIGHTS")
+        with self.recorder.stage('7_insights', inputs=self.rfm):
+            rfm, eda = self.rfm, self.eda
+            total_customers, total_revenue = eda['total_customers'], eda['total_revenue']
+            top_segment = self.segment_analysis.iloc[0]['Segment']
+            top_segment_rev = self.segment_analysis.iloc[0]['Total_Revenue']
+            top_segment_pct = self.segment_analysis.iloc[0]['Revenue_Share_%']
+            champions_count = rfm[rfm['Segment'] == 'Champions'].shape[0]
+            at_risk_count = rfm[rfm['Segment'] == 'At Risk'].shape[0]
+            lost_count = rfm[rfm['Segment'] == 'Lost'].shape[0]
+            if self.clv_model is not None:
+                clv_per_customer = rfm['Expected_Value'].mean()
+                clv_basis = f'predicted next {self.clv_model.horizon} days'
+                expected_churners = rfm['Churn_Probability'].sum()
+                churn_line = (f"\n║  • Churn model: {expected_churners:,.0f} customers expected "
+                              "to have churned     ║")
+            else:
+                clv_per_customer = total_revenue / total_customers
+                clv_basis = 'historical revenue'
+                expected_churners, churn_line = None, ''
+            top_country = eda['country_revenue'].index[0]
+            uk_share = eda['country_revenue'].iloc[0]['revenue_share_%']
+            self.highlights = {'top_segment_pct': top_segment_pct, 'champions_count': champions_count,
+                               'at_risk_count': at_risk_count}
+
+            print(f"""
+╔══════════════════════════════════════════════════════════════════╗
+║                   KEY BUSINESS FINDINGS                         ║
+╠══════════════════════════════════════════════════════════════════╣
+║                                                                  ║
+║  FINDING 1: CUSTOMER BASE                                       ║
+║  • {total_customers:,} customers analyzed across 38 countries            ║
+║  • Total revenue: £{total_revenue:,.0f}                           ║
+║  • Avg customer lifetime value: £{clv_per_customer:,.2f} ({clv_basis})  ║
+║                                                                  ║
+║  FINDING 2: MOST VALUABLE SEGMENT                               ║
+║  • {top_segment} drives {top_segment_pct}% of total revenue           ║
+║  • Revenue: £{top_segment_rev:,.0f}                                   ║
+║  • This is your GOLD - protect at all costs!                    ║
+║                                                                  ║
+║  FINDING 3: CHAMPIONS (HIGH-VALUE CUSTOMERS)                    ║
+║  • {champions_count:,} customers in Champions segment                    ║
+║  • These are your best customers - reward them!                 ║
+║  • Early access, VIP treatment, referral incentives             ║
+║                                                                  ║
+║  FINDING 4: AT RISK CUSTOMERS (URGENT!)                         ║
+║  • {at_risk_count:,} customers at risk of churning                       ║
+║  • Used to be good customers, haven't purchased recently        ║
+║  • Immediate win-back campaigns needed                          ║{churn_line}
+║                                                                  ║
+║  FINDING 5: LOST CUSTOMERS                                      ║
+║  • {lost_count:,} customers already lost                                 ║
+║  • Deep reactivation campaigns with strong incentives           ║
+║  • Survey them to understand why they left                      ║
+║                                                                  ║
+║  FINDING 6: GEOGRAPHIC CONCENTRATION                            ║
+║  • {top_country} dominates with {uk_share}% revenue share                ║
+║  • High concentration = risk if UK market declines              ║
+║  • Opportunity: Expand in other 37 countries                    ║
+║                                                                  ║
+╚══════════════════════════════════════════════════════════════════╝""")
+
+            self.findings_df = pd.DataFrame({
+                'Finding': [
+                    'Total Customers Analyzed',
+                    'Total Revenue Generated',
+                    'Most Valuable Segment',
+                    'Champions Customers',
+                    'At Risk Customers',
+                    'Lost Customers',
+                    'Top Country',
+                    'Avg Customer Lifetime Value'
+                ],
+                'Insight': [
+                    f'{total_customers:,} customers across 38 countries',
+                    f'£{total_revenue:,.0f} over 1 year period',
+                    f'{top_segment} - £{top_segment_rev:,.0f} ({top_segment_pct}% of revenue)',
+                    f'{champions_count:,} customers - highest value, retain at all costs!',
+                    f'{at_risk_count:,} customers - need immediate attention',
+                    f'{lost_count:,} customers - win-back campaigns needed',
+                    f'{top_country} dominates with {uk_share}% revenue share',
+                    f'£{clv_per_customer:,.2f} per customer ({clv_basis})'
+                ]
+            })
+            if expected_churners is not None:
+                self.findings_df.loc[len(self.findings_df)] = [
+                    'Expected Churners',
+                    f'{expected_churners:,.0f} customers ({expected_churners / total_customers:.1%}) '
+                    'by the BG/NBD churn probability']
+
+    # ── SECTION 8: MARKETING RECOMMENDATIONS ────────────────────────
+    def recommendations(self):
+        banner("SECTION 8: MARKETING RECOMMENDATIONS BY SEGMENT")
+        print(RECOMMENDATIONS.to_string(index=False))
+
+    # ── SECTION 9: EXPORT RESULTS ───────────────────────────────────
+    def export_rfm_scores(self):
+        """``rfm`` subcommand output: the scored table without segments."""
+        from customer_segmentation.export import write_table
+
+        banner("SECTION 9: EXPORTING RESULTS")
+        with self.recorder.stage('9_export', inputs=self.rfm):
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, 'rfm_scores.csv')
+            write_table(self.rfm, path, stats=self.export_stats)
+            print(f"✓ CSV saved: {path}")
+
+    def export_customers(self, stage_name='9_export'):
+        """Per-customer table (CSV, Parquet, gzip CSV), scoring model and profile store."""
+        from customer_segmentation.artifacts import artifact_key
+        from customer_segmentation.export import write_table
+        from customer_segmentation.profiles import ProfileStore
+        from customer_segmentation.scoring import ScoringModel
+
+        with self.recorder.stage(stage_name, inputs=self.rfm):
+            os.makedirs(self.out_dir, exist_ok=True)
+            rfm = self.rfm
+            for suffix in ('.csv', '.parquet', '.csv.gz'):
+                rfm_path = os.path.join(self.out_dir, 'rfm_customer_segmentation' + suffix)
+                self.artifact_cache.build(rfm_path, artifact_key([rfm], {'path': rfm_path}),
+                                          lambda: write_table(rfm, rfm_path, stats=self.export_stats))
+
+            # Keep the quintile edges so new customers can be scored without re-binning
+            ScoringModel.from_qcut(rfm).save(os.path.join(self.out_dir, 'scoring_model.json'))
+            # Memory-mapped per-customer profiles for fast lookup by ID / segment
+            ProfileStore.build(rfm, os.path.join(self.out_dir, 'profiles'),
+                               analysis_date=self.analysis_date)
+            if self.cluster_model is not None:
+                self.cluster_model.save(os.path.join(self.out_dir, 'cluster_model.json'))
+                print(f"✓ Cluster model saved: {self.out_dir}/cluster_model.json")
+            if self.clv_model is not None:
+                self.clv_model.save(os.path.join(self.out_dir, 'clv_model.json'))
+                print(f"✓ CLV model saved: {self.out_dir}/clv_model.json")
+
+            print(f"✓ CSV saved: {self.out_dir}/rfm_customer_segmentation.csv (+ .parquet, .csv.gz)")
+            print(f"✓ Scoring model saved: {self.out_dir}/scoring_model.json")
+            print(f"✓ Profile store saved: {self.out_dir}/profiles/")
+
+    def export_report(self):
+        """Section 9 Excel report, streamed row by row."""
+        from customer_segmentation.artifacts import artifact_key
+        from customer_segmentation.export import write_report
+
+        banner("SECTION 9: EXPORTING RESULTS TO EXCEL")
+        with self.recorder.stage('9_report', inputs=self.rfm):
+            os.makedirs(self.out_dir, exist_ok=True)
+            report_sheets = {
+                'RFM_Analysis': self.rfm,
+                'Segment_Summary': self.segment_analysis,
+                'Segment_Distribution': self.segment_counts,
+                'Country_Analysis': self.eda['country_revenue'],
+                'Monthly_Trend': self.eda['monthly_revenue'],
+                'Key_Findings': self.findings_df,
+                'Recommendations': RECOMMENDATIONS,
+                'Cohort_Customers': self.cohorts['cohort_customers'],
+                'Cohort_Retention': self.cohorts['cohort_retention'],
+                'Cohort_Revenue': self.cohorts['cohort_revenue'],
+            }
+            report_path = os.path.join(self.out_dir, 'Customer_Segmentation_Report.xlsx')
+
+            def write_excel_report():
+                # RFM_Analysis is left out above max_excel_rows customers
+                write_report(report_path, report_sheets, per_customer_sheet='RFM_Analysis',
+                             index_sheets=('Country_Analysis',),
+                             max_excel_rows=self.max_excel_rows, stats=self.export_stats)
+
+            self.artifact_cache.build(
+                report_path,
+                artifact_key(list(report_sheets.values()),
+                             {'sheets': list(report_sheets), 'max_excel_rows': self.max_excel_rows},
+                             write_excel_report),
+                write_excel_report)
+            print(f"✓ Excel report saved: {report_path}")
+            print("   Sheets: RFM_Analysis, Segment_Summary, Segment_Distribution,")
+            print("           Country_Analysis, Monthly_Trend, Key_Findings, Recommendations,")
+            print("           Cohort_Customers, Cohort_Retention, Cohort_Revenue")
+
+    def finish(self):
+        if self._artifact_cache is not None:
+            self.artifact_cache.report()
+        if self._export_stats is not None:
+            self.export_stats.print_throughput()
+        self.recorder.close()
+        print("\n⏱ Section timings:")
+        print(self.recorder.summary().to_string(index=False))
+        if self.recorder.jsonl_path:
+            print(f"✓ Stage metrics saved: {self.recorder.jsonl_path}")
+        if self.recorder.trace_path:
+            print(f"✓ Chrome trace saved: {self.recorder.trace_path}")
+
+    def print_summary(self):
+        highlights = self.highlights
+        print("\n" + "=" * 70)
+        print("  ✅ PROJECT 2: ANALYSIS COMPLETE!")
+        print("=" * 70)
+        print(f"""
+📁 OUTPUT FILES:
+   {self.source:<42} ← Original dataset
+   {self.out_dir}/Customer_Segmentation_Report.xlsx  ← Full Excel report (10 sheets)
+   {self.out_dir}/rfm_customer_segmentation.csv      ← RFM scores per customer
+   {self.charts_dir}/chart1_segment_distribution.png     ← Customer segments
+   {self.charts_dir}/chart2_revenue_by_segment.png       ← Revenue contribution
+   {self.charts_dir}/chart3_rfm_scatter.png              ← RFM relationships
+   {self.charts_dir}/chart4_monthly_trend.png            ← Monthly revenue trend
+   {self.charts_dir}/chart5_top_countries.png            ← Geographic analysis
+   {self.charts_dir}/chart6_segment_heatmap.png          ← Segment comparison
+   {self.charts_dir}/chart7_cohort_retention.png         ← Cohort retention
+
+📊 PROJECT STATS:
+   {len(self.df_clean):,} transactions analyzed
+   {self.eda['total_customers']:,} customers segmented
+   8 customer segments identified
+   7 professional charts created
+   10-sheet Excel report generated
+
+🎯 BUSINESS IMPACT:
+   • Identified {highlights['champions_count']:,} Champions customers to protect
+   • {highlights['at_risk_count']:,} At Risk customers need immediate campaigns
+   • Top segment drives {highlights['top_segment_pct']}% of revenue
+   • Clear marketing playbook for each of 8 segments
+""")
+
+
+# Sections each subcommand runs, in order
+COMMANDS = {
+    'rfm': ['load', 'clean', 'compute_rfm', 'export_rfm_scores', 'finish'],
+    'segment': ['load', 'clean', 'compute_rfm', 'segment', 'clv', 'export_customers', 'finish'],
+    'charts': ['load', 'clean', 'factorize', 'compute_rfm', 'segment', 'clv', 'explore',
+               'cohort_analysis', 'charts', 'finish'],
+    'report': ['load', 'clean', 'factorize', 'compute_rfm', 'segment', 'clv', 'explore', 'basket',
+               'cohort_analysis', 'charts', 'findings', 'recommendations', 'export_report',
+               'export_customers', 'finish', 'print_summary'],
+}
+
+
+def run(command, **options):
+    """Run a subcommand's sections and return the :class:`Analysis`."""
+    analysis = Analysis(**options)
+    for step in COMMANDS[command]:
+        getattr(analysis, step)()
+    return analysis
@@ -0,0 +1,89 @@
+"""Content-addressed skip-if-unchanged cache for charts and report files.
+
+Every output is keyed on a hash of the exact tables it is derived from plus
+its render parameters (and the source of the function that draws it). The
+key is stored in a small JSON manifest next to the outputs; when a rerun
+produces the same key and the file is still on disk with the recorded size,
+the artifact is skipped.
+"""
+import hashlib
+import inspect
+import json
+import os
+
+import pandas as pd
+
+DEFAULT_MANIFEST = os.path.join('outputs', '.artifact_manifest.json')
+
+
+def hash_frame(df):
+    """Stable content hash of a DataFrame (values, index, columns, dtypes)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(json.dumps([str(t) for t in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def artifact_key(frames, params=None, func=None):
+    """Key for an artifact built from ``frames`` with ``params``.
+
+    Passing the render/write ``func`` folds its source code into the key, so
+    editing a chart invalidates just that chart.
+    """
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(hash_frame(frame).encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    if func is not None:
+        digest.update(inspect.getsource(func).encode())
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    def __init__(self, manifest_path=DEFAULT_MANIFEST, verbose=True):
+        self.manifest_path = manifest_path
+        self.verbose = verbose
+        self.hits = []
+        self.misses = []
+        try:
+            with open(manifest_path) as fh:
+                self.manifest = json.load(fh)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def is_fresh(self, path, key):
+        entry = self.manifest.get(path)
+        fresh = (entry is not None and entry['key'] == key and os.path.exists(path)
+                 and os.path.getsize(path) == entry['size'])
+        (self.hits if fresh else self.misses).append(path)
+        if fresh and self.verbose:
+            print(f'   ↺ Unchanged, skipped: {path}')
+        return fresh
+
+    def record(self, path, key):
+        self.manifest[path] = {'key': key, 'size': os.path.getsize(path)}
+        self.save()
+
+    def build(self, path, key, write):
+        """Call ``write()`` to (re)create ``path`` unless it is fresh.
+
+        Returns True when the cached artifact was reused.
+        """
+        if self.is_fresh(path, key):
+            return True
+        write()
+        self.record(path, key)
+        return False
+
+    def save(self):
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self.manifest, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def report(self):
+        print(f'   Artifact cache: {len(self.hits)} hit(s), {len(self.misses)} miss(es)')
@@ -0,0 +1,186 @@
+"""Market-basket analysis: which products are bought together, per segment.
+
+``product_revenue`` ranks products on their own; this module looks at
+co-purchases. The invoices are a sparse CSR invoice x StockCode incidence
+matrix ``X`` (1 where the invoice has at least one line of the product)
+built straight from the factorized codes of
+:class:`~customer_segmentation.aggregates.FusedAggregates`. The co-occurrence
+counts of every product pair are then the sparse product ``X.T @ X``, and
+for a pair (A, B) over ``n`` invoices::
+
+    support    = count(A, B) / n
+    confidence = count(A, B) / count(A)        (A -> B, and B -> A)
+    lift       = count(A, B) * n / (count(A) * count(B))
+
+A pair can only reach ``min_support`` if both of its products do, so
+products below it are dropped before the product (the Apriori pruning), as
+are invoices left with fewer than two products. The product is computed in
+blocks of columns against the lower-numbered products only, so at most one
+block of the upper triangle is held before the ``min_support`` filter.
+
+Per-segment tables run the same kernel on the rows (invoices) of each
+segment's customers, with supports relative to that segment's invoices, and
+are written one CSV per segment under ``outputs/basket/``.
+
+Usage::
+
+    python -m customer_segmentation.basket data/or.xlsx --segments outputs/rfm_customer_segmentation.parquet
+    python -m customer_segmentation.basket data/or.xlsx --min-support 0.02 --top 20
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DEFAULT_MIN_SUPPORT = 0.01
+# Products per block of the pair-count product
+BLOCK_ITEMS = 2048
+
+
+def item_pairs(matrix, min_support=DEFAULT_MIN_SUPPORT, block_items=BLOCK_ITEMS):
+    """Pairs of columns of the 0/1 CSR ``matrix`` (invoices x items) that
+    co-occur in at least ``min_support`` of its rows, as a frame of item
+    codes (``item_a < item_b``), co-occurrence counts, support, both
+    confidences and lift."""
+    n_rows = matrix.shape[0]
+    # A pair seen in a single invoice is not an association, whatever the support
+    min_count = max(int(np.ceil(min_support * n_rows - 1e-9)), 2)
+    item_count = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    frequent = np.flatnonzero(item_count >= min_count)
+    x = matrix[:, frequent]
+    x = x[np.diff(x.indptr) >= 2]
+    x_t, x_c = x.T.tocsr(), x.tocsc()
+
+    a, b, count = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    for start in range(0, len(frequent), block_items):
+        stop = min(start + block_items, len(frequent))
+        # Rows are the products before ``stop``: only the upper triangle is needed
+        counts = (x_t[:stop] @ x_c[:, start:stop]).tocoo()
+        col = counts.col + start
+        keep = (counts.row < col) & (counts.data >= min_count)
+        a.append(counts.row[keep])
+        b.append(col[keep])
+        count.append(counts.data[keep])
+    a, b, count = np.concatenate(a), np.concatenate(b), np.concatenate(count)
+
+    count = count.astype(np.int64)
+    item_a, item_b = frequent[a.astype(np.int64)], frequent[b.astype(np.int64)]
+    count_a, count_b = item_count[item_a], item_count[item_b]
+    return pd.DataFrame({
+        'item_a': item_a, 'item_b': item_b, 'Orders': count,
+        'Support': count / max(n_rows, 1),
+        'Confidence_AB': count / count_a,
+        'Confidence_BA': count / count_b,
+        'Lift': count * n_rows / (count_a * count_b.astype(np.float64)),
+    })
+
+
+class Baskets:
+    """The invoice x StockCode incidence matrix of ``df_clean``, with each
+    invoice's customer, ready to be cut by segment."""
+
+    def __init__(self, aggregates):
+        fa = aggregates
+        n_stock = max(len(fa.stock_labels), 1)
+        # Sorted distinct (invoice, StockCode) pairs are already in CSR order
+        pairs = np.sort(fa.inv * n_stock + fa.stock)
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+        rows = pairs // n_stock
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.int32), (pairs % n_stock).astype(np.int32),
+             np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=fa.n_inv))])),
+            shape=(fa.n_inv, n_stock))
+        self.invoice_customer = fa.invoice_attr['cust'][0]
+        self.aggregates = fa
+        self.stock_labels = np.asarray(fa.stock_labels)
+        # One Description per StockCode (the first in sort order) for display
+        first = np.unique(fa.product_stock, return_index=True)[1]
+        self.descriptions = np.full(n_stock, None, dtype=object)
+        self.descriptions[fa.product_stock[first]] = np.asarray(fa.desc_labels,
+                                                                dtype=object)[fa.product_desc[first]]
+
+    @property
+    def nbytes(self):
+        return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+    def pairs(self, min_support=DEFAULT_MIN_SUPPORT, invoices=None):
+        """Product pairs over all invoices (or the ``invoices`` mask), by lift."""
+        matrix = self.matrix if invoices is None else self.matrix[invoices]
+        pairs = item_pairs(matrix, min_support)
+        table = pd.DataFrame({
+            'StockCode_A': self.stock_labels[pairs['item_a']],
+            'Description_A': self.descriptions[pairs['item_a']],
+            'StockCode_B': self.stock_labels[pairs['item_b']],
+            'Description_B': self.descriptions[pairs['item_b']],
+        })
+        table = pd.concat([table, pairs.drop(columns=['item_a', 'item_b'])], axis=1)
+        return table.sort_values(['Lift', 'Support'], ascending=False, ignore_index=True)
+
+    def segment_pairs(self, segments, min_support=DEFAULT_MIN_SUPPORT):
+        """``{segment: pairs}`` with supports relative to each segment's own
+        invoices; ``segments`` is the Section 5 table (CustomerID, Segment)."""
+        customer_segment, labels = self.aggregates.customer_segments(segments)
+        invoice_segment = customer_segment[self.invoice_customer]
+        return {label: self.pairs(min_support, invoice_segment == code)
+                for code, label in enumerate(labels)}
+
+
+def segment_filename(segment):
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(segment)).strip('_').lower() + '.csv'
+
+
+def save_pairs(tables, out_dir, top=None):
+    """One CSV per segment in ``out_dir``; returns the paths written."""
+    from customer_segmentation.export import write_table
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for segment, table in tables.items():
+        path = os.path.join(out_dir, segment_filename(segment))
+        write_table(table if top is None else table.head(top), path)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Product pairs bought together, per segment')
+    parser.add_argument('source', help='Transactions (.xlsx, .csv or .parquet)')
+    parser.add_argument('--segments', default=None,
+                        help='Section 5 table (CustomerID, Segment) for per-segment pairs')
+    parser.add_argument('--min-support', type=float, default=DEFAULT_MIN_SUPPORT,
+                        help='Minimum share of invoices containing a pair')
+    parser.add_argument('--top', type=int, default=10, help='Pairs printed per segment')
+    parser.add_argument('--out-dir', default=None, help='Write one CSV per segment here')
+    args = parser.parse_args(argv)
+
+    from customer_segmentation.aggregates import FusedAggregates
+    from customer_segmentation.ingest import load_transactions
+    from customer_segmentation.pipeline import clean_transactions
+
+    df_clean, _ = clean_transactions(load_transactions(args.source), release=True)
+    start = time.perf_counter()
+    baskets = Baskets(FusedAggregates(df_clean))
+    if args.segments:
+        segments = (pd.read_parquet(args.segments) if args.segments.endswith('.parquet')
+                    else pd.read_csv(args.segments))
+        tables = baskets.segment_pairs(segments, args.min_support)
+    else:
+        tables = {'All': baskets.pairs(args.min_support)}
+    seconds = time.perf_counter() - start
+    for segment, table in tables.items():
+        print(f'\n🛒 {segment}: {len(table):,} pairs')
+        print(table.head(args.top).to_string(index=False))
+    matrix = baskets.matrix
+    print(f'\n{matrix.shape[0]:,} invoices x {matrix.shape[1]:,} products, {matrix.nnz:,} '
+          f'non-zeros ({baskets.nbytes / 2**20:.1f} MB), {seconds:.2f}s')
+    if args.out_dir:
+        save_pairs(tables, args.out_dir)
+        print(f'✓ Pairs saved: {args.out_dir}/')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""Section 6 charts as independent render tasks.
+
+Each chart is a plain function of the aggregated tables it needs, so the seven
+figures can be rendered serially or dispatched to a process pool
+(``render_charts(..., jobs=N)``). For the pool, every input table is written
+once as an Arrow IPC file (on /dev/shm when available) and memory-mapped by
+the workers, so no DataFrame is pickled per task.
+
+Rendering is deterministic: serial and parallel runs produce byte-identical
+PNGs because every process applies the same style before drawing.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend for VS Code
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+CHART_DPI = 150
+
+
+def setup_style():
+    plt.rcParams['figure.figsize'] = (12, 6)
+    sns.set_palette('Set2')
+
+
+def _save(fig, path):
+    plt.tight_layout()
+    plt.savefig(path, dpi=CHART_DPI, bbox_inches='tight')
+    plt.close(fig)
+
+
+def plot_segment_distribution(path, segment_counts):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+
+    colors = sns.color_palette('Set2', len(segment_counts))
+    axes[0].pie(segment_counts['Customer_Count'], labels=segment_counts['Segment'],
+                autopct='%1.1f%%', colors=colors, startangle=90)
+    axes[0].set_title('Customer Distribution by Segment', fontsize=14, fontweight='bold')
+
+    axes[1].barh(segment_counts['Segment'], segment_counts['Customer_Count'], color=colors)
+    axes[1].set_xlabel('Number of Customers')
+    axes[1].set_title('Customer Count by Segment', fontsize=14, fontweight='bold')
+    axes[1].grid(axis='x', alpha=0.3)
+
+    _save(fig, path)
+
+
+def plot_revenue_by_segment(path, segment_analysis):
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    segment_rev_sorted = segment_analysis.sort_values('Total_Revenue', ascending=True)
+    colors_rev = sns.color_palette('RdYlGn', len(segment_rev_sorted))
+
+    bars = ax.barh(segment_rev_sorted['Segment'], segment_rev_sorted['Total_Revenue'], color=colors_rev)
+    ax.set_xlabel('Total Revenue (£)', fontsize=12)
+    ax.set_title('Total Revenue by Customer Segment', fontsize=14, fontweight='bold')
+    ax.grid(axis='x', alpha=0.3)
+
+    for bar, val, pct in zip(bars, segment_rev_sorted['Total_Revenue'], segment_rev_sorted['Revenue_Share_%']):
+        ax.text(bar.get_width() + 5000, bar.get_y() + bar.get_height()/2,
+                f'£{val:,.0f} ({pct}%)', va='center', fontsize=9)
+
+    _save(fig, path)
+
+
+# Above this many customers Chart 3 switches to density + stratified sampling
+SCATTER_MAX_POINTS = 50_000
+SCATTER_MIN_PER_SEGMENT = 200
+SCATTER_HEXBIN_GRIDSIZE = 80
+
+RFM_SCATTER_PANELS = [
+    ('Recency', 'Monetary', 'Recency (days)', 'Monetary (£)', 'Recency vs Monetary'),
+    ('Frequency', 'Monetary', 'Frequency (orders)', 'Monetary (£)', 'Frequency vs Monetary'),
+    ('Recency', 'Frequency', 'Recency (days)', 'Frequency (orders)', 'Recency vs Frequency'),
+]
+
+
+def stratified_sample(groups, max_points, min_per_segment=SCATTER_MIN_PER_SEGMENT, seed=42):
+    """Sample each segment in proportion to its size (small segments keep at
+    least ``min_per_segment`` points so they stay visible)."""
+    rng = np.random.default_rng(seed)
+    total = sum(len(seg_data) for _, seg_data in groups)
+    sampled = []
+    for segment, seg_data in groups:
+        n = max(min_per_segment, int(round(max_points * len(seg_data) / total)))
+        if n < len(seg_data):
+            seg_data = seg_data.iloc[np.sort(rng.choice(len(seg_data), n, replace=False))]
+        sampled.append((segment, seg_data))
+    return sampled
+
+
+def plot_rfm_scatter(path, rfm, max_points=SCATTER_MAX_POINTS, mode='density'):
+    """Chart 3. Up to ``max_points`` customers every point is drawn; above it,
+    ``mode='density'`` draws a hexbin layer of all customers under a
+    stratified sample per segment, ``mode='sample'`` draws the sample only."""
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+
+    # Group once (first-appearance order, same as rfm['Segment'].unique())
+    groups = list(rfm.groupby('Segment', sort=False))
+    large = len(rfm) > max_points
+    if large:
+        shares = {segment: len(seg_data) / len(rfm) * 100 for segment, seg_data in groups}
+        groups = stratified_sample(groups, max_points)
+
+    for ax, (x, y, xlabel, ylabel, title) in zip(axes, RFM_SCATTER_PANELS):
+        if large and mode == 'density':
+            ax.hexbin(rfm[x], rfm[y], gridsize=SCATTER_HEXBIN_GRIDSIZE, bins='log',
+                      mincnt=1, cmap='Greys', linewidths=0)
+        for segment, seg_data in groups:
+            label = f'{segment} ({shares[segment]:.1f}%)' if large else segment
+            ax.scatter(seg_data[x], seg_data[y],
+                       alpha=0.3 if large else 0.6, s=8 if large else 50, label=label)
+        ax.set_xlabel(xlabel, fontsize=11)
+        ax.set_ylabel(ylabel, fontsize=11)
+        ax.set_title(title, fontsize=13, fontweight='bold')
+        ax.grid(alpha=0.3)
+    axes[0].legend(bbox_to_anchor=(1, 1), fontsize=8)
+
+    _save(fig, path)
+
+
+def plot_monthly_trend(path, monthly_revenue):
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    ax.plot(monthly_revenue['YearMonth'], monthly_revenue['revenue'],
+            marker='o', linewidth=2.5, markersize=8, color='#2ecc71')
+    ax.fill_between(range(len(monthly_revenue)), monthly_revenue['revenue'], alpha=0.3, color='#2ecc71')
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Revenue (£)', fontsize=12)
+    ax.set_title('Monthly Revenue Trend', fontsize=14, fontweight='bold')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(alpha=0.3)
+
+    _save(fig, path)
+
+
+def plot_top_countries(path, country_revenue):
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    top10_countries = country_revenue.head(10).sort_values('revenue')
+    colors_country = sns.color_palette('viridis', len(top10_countries))
+
+    bars = ax.barh(top10_countries.index, top10_countries['revenue'], color=colors_country)
+    ax.set_xlabel('Revenue (£)', fontsize=12)
+    ax.set_title('Top 10 Countries by Revenue', fontsize=14, fontweight='bold')
+    ax.grid(axis='x', alpha=0.3)
+
+    for bar, val in zip(bars, top10_countries['revenue']):
+        ax.text(bar.get_width() + 10000, bar.get_y() + bar.get_height()/2,
+                f'£{val:,.0f}', va='center', fontsize=9)
+
+    _save(fig, path)
+
+
+def min_max_scale(frame):
+    """Column-wise scaling to [0, 1], computed exactly like sklearn's
+    ``MinMaxScaler().fit_transform`` (constant columns map to 0)."""
+    values = frame.to_numpy(dtype=np.float64)
+    low = np.nanmin(values, axis=0)
+    span = np.nanmax(values, axis=0) - low
+    scale = 1.0 / np.where(span < 10 * np.finfo(np.float64).eps, 1.0, span)
+    return pd.DataFrame(values * scale + (-low * scale), index=frame.index, columns=frame.columns)
+
+
+def plot_segment_heatmap(path, segment_analysis):
+    heatmap_data = segment_analysis[['Segment', 'Avg_Recency', 'Avg_Frequency', 'Avg_Monetary']].set_index('Segment')
+
+    # Normalize for better visualization
+    heatmap_normalized = min_max_scale(heatmap_data)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.heatmap(heatmap_normalized.T, annot=False, cmap='RdYlGn', linewidths=0.5, ax=ax,
+                cbar_kws={'label': 'Normalized Score'})
+    ax.set_title('Customer Segment Comparison (Normalized RFM)', fontsize=14, fontweight='bold')
+    ax.set_ylabel('RFM Metric', fontsize=12)
+    ax.set_xlabel('Customer Segment', fontsize=12)
+
+    _save(fig, path)
+
+
+def plot_cohort_retention(path, cohort_retention):
+    retention = cohort_retention.drop(columns=['Customers']).set_index('Cohort')
+    n_cohorts, n_months = retention.shape
+    # Annotate small matrices; with hundreds of cohorts label every k-th row
+    annotate = n_cohorts <= 24 and n_months <= 24
+
+    fig, ax = plt.subplots(figsize=(max(12, n_months * 0.5), max(6, min(n_cohorts, 60) * 0.35)))
+    sns.heatmap(retention, annot=annotate, fmt='.0%', annot_kws={'fontsize': 8}, cmap='YlGnBu',
+                vmin=0, vmax=max(float(np.nanmax(retention.iloc[:, 1:].to_numpy(), initial=0)), 0.01),
+                linewidths=0.5 if annotate else 0, ax=ax,
+                yticklabels=max(1, n_cohorts // 40), xticklabels=max(1, n_months // 40),
+                cbar_kws={'label': 'Customers still buying'})
+    ax.set_title('Monthly Cohort Retention', fontsize=14, fontweight='bold')
+    ax.set_ylabel('First-Purchase Month', fontsize=12)
+    ax.set_xlabel('Months Since First Purchase', fontsize=12)
+
+    _save(fig, path)
+
+
+# (file name, title, render function, input table, columns needed or None)
+CHART_TASKS = [
+    ('chart1_segment_distribution.png', 'Segment Distribution', plot_segment_distribution,
+     'segment_counts', None),
+    ('chart2_revenue_by_segment.png', 'Revenue by Segment', plot_revenue_by_segment,
+     'segment_analysis', None),
+    ('chart3_rfm_scatter.png', 'RFM Scatter Plots', plot_rfm_scatter,
+     'rfm', ['Segment', 'Recency', 'Frequency', 'Monetary']),
+    ('chart4_monthly_trend.png', 'Monthly Revenue Trend', plot_monthly_trend,
+     'monthly_revenue', None),
+    ('chart5_top_countries.png', 'Top Countries', plot_top_countries,
+     'country_revenue', None),
+    ('chart6_segment_heatmap.png', 'Segment Heatmap', plot_segment_heatmap,
+     'segment_analysis', None),
+    ('chart7_cohort_retention.png', 'Cohort Retention', plot_cohort_retention,
+     'cohort_retention', None),
+]
+
+
+def _task_inputs(tables):
+    """The (possibly column-pruned) table each chart task reads."""
+    inputs = {}
+    for _, _, _, name, columns in CHART_TASKS:
+        table = tables[name]
+        inputs[name] = table if columns is None else table[columns]
+    return inputs
+
+
+def _write_ipc(inputs, directory):
+    import pyarrow as pa
+    paths = {}
+    for name, table in inputs.items():
+        path = os.path.join(directory, f'{name}.arrow')
+        arrow_table = pa.Table.from_pandas(table)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        paths[name] = path
+    return paths
+
+
+def _render_from_ipc(index, ipc_path, out_dir, options):
+    import pyarrow as pa
+    filename, _, func, _, _ = CHART_TASKS[index]
+    with pa.memory_map(ipc_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all().to_pandas()
+    start = time.perf_counter()
+    func(os.path.join(out_dir, filename), table, **options)
+    return filename, time.perf_counter() - start
+
+
+def chart_key(index, table, options):
+    """Artifact-cache key: input table + render parameters + chart code."""
+    from customer_segmentation.artifacts import artifact_key
+    filename, _, func, _, _ = CHART_TASKS[index]
+    params = dict(options, filename=filename, dpi=CHART_DPI)
+    return artifact_key([table], params, func=func)
+
+
+def render_charts(tables, out_dir='charts', jobs=1, scatter_max_points=SCATTER_MAX_POINTS,
+                  scatter_mode='density', cache=None, verbose=True):
+    """Render the seven Section 6 charts into ``out_dir``.
+
+    ``tables`` maps segment_counts, segment_analysis, rfm, monthly_revenue,
+    country_revenue and cohort_retention to DataFrames. With ``jobs > 1``
+    charts are rendered in a process pool fed by memory-mapped Arrow IPC
+    files. ``scatter_max_points`` and ``scatter_mode`` control Chart 3 at
+    large customer counts. With an
+    :class:`~customer_segmentation.artifacts.ArtifactCache`, charts whose
+    inputs and parameters are unchanged are skipped.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    inputs = _task_inputs(tables)
+    options = {filename: {} for filename, *_ in CHART_TASKS}
+    options['chart3_rfm_scatter.png'] = {'max_points': scatter_max_points, 'mode': scatter_mode}
+    start = time.perf_counter()
+
+    pending, keys = [], {}
+    for i, (filename, _, _, name, _) in enumerate(CHART_TASKS):
+        if cache is not None:
+            keys[i] = chart_key(i, inputs[name], options[filename])
+            if cache.is_fresh(os.path.join(out_dir, filename), keys[i]):
+                continue
+        pending.append(i)
+
+    def done(i):
+        if cache is not None:
+            cache.record(os.path.join(out_dir, CHART_TASKS[i][0]), keys[i])
+
+    if jobs <= 1 or len(pending) <= 1:
+        setup_style()
+        for i in pending:
+            filename, title, func, name, _ = CHART_TASKS[i]
+            if verbose:
+                print(f'📊 Chart: {title}...')
+            func(os.path.join(out_dir, filename), inputs[name], **options[filename])
+            done(i)
+            if verbose:
+                print(f'   ✓ Saved: {filename}')
+    else:
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        with tempfile.TemporaryDirectory(dir=shm_dir) as tmp:
+            ipc_paths = _write_ipc({CHART_TASKS[i][3]: inputs[CHART_TASKS[i][3]] for i in pending}, tmp)
+            with ProcessPoolExecutor(max_workers=jobs, initializer=setup_style) as pool:
+                futures = {i: pool.submit(_render_from_ipc, i, ipc_paths[CHART_TASKS[i][3]], out_dir,
+                                          options[CHART_TASKS[i][0]])
+                           for i in pending}
+                for i, future in futures.items():
+                    filename, seconds = future.result()
+                    done(i)
+                    if verbose:
+                        print(f'   ✓ Saved: {filename} ({seconds:.2f}s)')
+
+    if verbose:
+        print(f'   {len(pending)} of {len(CHART_TASKS)} charts rendered in '
+              f'{time.perf_counter() - start:.2f}s '
+              f'({"serial" if jobs <= 1 else f"{jobs} processes"})')
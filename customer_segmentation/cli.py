@@ -0,0 +1,107 @@
+"""Command line entry point: ``python -m customer_segmentation <command>``.
+
+Commands run the analysis up to a given point:
+
+* ``rfm``      - load, clean, RFM + scores -> ``outputs/rfm_scores.csv``
+* ``segment``  - ... + segments and CLV predictions -> per-customer CSV/Parquet, scoring
+  model, profile store
+* ``charts``   - ... + EDA tables, cohort retention and the seven charts
+* ``report``   - everything, including the Excel report (what the script used to do) and
+  the per-segment market-basket pairs
+* ``dag``      - the same outputs as a stage graph with a Parquet stage cache: only
+  stages whose inputs, parameters or code changed recompute (see ``stages.py``)
+"""
+import argparse
+import warnings
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='customer_segmentation',
+                                     description='Customer segmentation & RFM analysis')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--source', default='data/or.xlsx',
+                        help='Transactions (.xlsx, .csv or .parquet)')
+    common.add_argument('--out-dir', default='outputs')
+    common.add_argument('--show-eda', action='store_true',
+                        help='Print the head() / info() / describe() dumps')
+    common.add_argument('--rfm-jobs', type=int, default=1,
+                        help='Processes used for the Section 4 RFM (customer shards)')
+    common.add_argument('--metrics', default=None,
+                        help='Per-section metrics as JSON lines (default: <out-dir>/stage_metrics.jsonl)')
+    common.add_argument('--trace', default=None, help='Also write a Chrome trace of the sections')
+    common.add_argument('--profile', action='store_true',
+                        help='Run every section under cProfile + tracemalloc (<out-dir>/profile/)')
+    charting = argparse.ArgumentParser(add_help=False)
+    charting.add_argument('--charts-dir', default='charts')
+    charting.add_argument('--jobs', type=int, default=1,
+                          help='Processes used to render the Section 6 charts')
+    charting.add_argument('--scatter-max-points', type=int, default=50_000,
+                          help='Above this many customers Chart 3 uses density + sampling')
+
+    segmenting = argparse.ArgumentParser(add_help=False)
+    segmenting.add_argument('--segmentation', choices=['rules', 'kmeans'], default='rules',
+                            help='Score-threshold rules or k-means clusters on RFM features')
+    segmenting.add_argument('--clusters', type=int, default=None,
+                            help='k for --segmentation kmeans (default: sweep on a sample)')
+    segmenting.add_argument('--clv-horizon', type=int, default=365,
+                            help='Days of purchases / value the CLV models predict (0: skip CLV)')
+    basket = argparse.ArgumentParser(add_help=False)
+    basket.add_argument('--basket-min-support', type=float, default=0.01,
+                        help='Share of orders a product pair must reach (0: skip basket analysis)')
+    basket.add_argument('--max-excel-rows', type=int, default=200_000,
+                        help='Leave the per-customer sheet out of the Excel report above this '
+                             'many customers (it is always in the CSV/Parquet exports)')
+
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rfm', parents=[common], help='RFM table with scores')
+    sub.add_parser('segment', parents=[common, segmenting],
+                   help='RFM + segments, per-customer exports')
+    sub.add_parser('charts', parents=[common, segmenting, charting],
+                   help='Segments + the seven charts')
+    sub.add_parser('report', parents=[common, segmenting, charting, basket],
+                   help='Full analysis and Excel report')
+    dag = sub.add_parser('dag', parents=[common, segmenting, charting, basket],
+                         help='Full analysis as a cached stage graph')
+    dag.add_argument('targets', nargs='*',
+                     help='Stages to bring up to date (default: charts, report, basket, product_revenue)')
+    dag.add_argument('--rules', default=None, help='Segment rule table (JSON / YAML)')
+    dag.add_argument('--cache-dir', default=None,
+                     help='Parquet stage cache (default: <out-dir>/.stage_cache)')
+    dag.add_argument('--workers', type=int, default=2,
+                     help='Threads running independent stages concurrently (1 with --profile)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    from customer_segmentation.instrument import StageRecorder
+
+    metrics = args.metrics or f'{args.out_dir}/stage_metrics.jsonl'
+    recorder = StageRecorder(metrics, args.trace,
+                             f'{args.out_dir}/profile' if args.profile else None)
+    options = {'source': args.source, 'out_dir': args.out_dir,
+               'rfm_jobs': args.rfm_jobs, 'recorder': recorder}
+    if args.command != 'rfm':
+        options.update(segmentation=args.segmentation, clusters=args.clusters,
+                       clv_horizon=args.clv_horizon)
+    if args.command in ('charts', 'report', 'dag'):
+        options.update(charts_dir=args.charts_dir, jobs=args.jobs,
+                       scatter_max_points=args.scatter_max_points)
+    if args.command in ('report', 'dag'):
+        options.update(basket_min_support=args.basket_min_support,
+                       max_excel_rows=args.max_excel_rows)
+
+    print("=" * 70)
+    print("PROJECT 2: CUSTOMER SEGMENTATION & RFM ANALYSIS")
+    print("=" * 70)
+    if args.command == 'dag':
+        from customer_segmentation.stages import run_dag
+        run_dag(args.targets, rules_path=args.rules, cache_dir=args.cache_dir,
+                workers=args.workers, **options)
+        return
+
+    from customer_segmentation.analysis import run
+    run(args.command, show_eda=args.show_eda, **options)
+
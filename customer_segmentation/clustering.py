@@ -0,0 +1,319 @@
+"""Data-driven segmentation: mini-batch k-means on log-scaled RFM features.
+
+The rule table in ``segments.py`` cuts customers at fixed score thresholds.
+:class:`ClusterModel` instead clusters standardized ``log1p`` Recency,
+Frequency and Monetary and names each cluster after the segment its centroid
+falls into, so the clusters plug into the existing Section 5 tables, charts
+and exports.
+
+:class:`MiniBatchKMeans` is a small NumPy implementation of Sculley's
+mini-batch k-means: k-means++ seeding on a sample, then each batch moves
+every centre to the running mean of the points it has been assigned so far.
+Memory is bounded by the batch size, assignment is chunked, and the
+distance products go through BLAS (multi-threaded); ``predict(jobs=N)``
+additionally spreads chunks over threads. :func:`select_k` sweeps k on one
+shared sample, scoring each fit by inertia and a simplified (centroid)
+silhouette, so the sweep costs a few small fits rather than full ones.
+
+A fitted model is just the scaler and k centroids, so new customers are
+assigned in O(k) without refitting (:meth:`ClusterModel.assign`).
+
+Usage::
+
+    python -m customer_segmentation.clustering outputs/rfm_customer_segmentation.csv
+    python -m customer_segmentation.clustering outputs/rfm_customer_segmentation.csv --k 6
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['Recency', 'Frequency', 'Monetary']
+DEFAULT_KS = range(3, 11)
+SWEEP_SAMPLE = 20_000
+PREDICT_CHUNK = 1 << 16
+
+
+def rfm_features(rfm):
+    """``log1p`` of Recency / Frequency / Monetary as an (n, 3) float64 array."""
+    return np.log1p(np.clip(rfm[FEATURES].to_numpy(dtype=np.float64), 0, None))
+
+
+def _sq_distances(X, centers):
+    # ||x||^2 - 2 x.c + ||c||^2 via one matrix product
+    d2 = (X * X).sum(axis=1)[:, None] - 2 * X @ centers.T + (centers * centers).sum(axis=1)
+    return np.maximum(d2, 0, out=d2)
+
+
+def _assign(X, centers):
+    d2 = _sq_distances(X, centers)
+    labels = d2.argmin(axis=1)
+    return labels, d2[np.arange(len(X)), labels]
+
+
+def _kmeans_pp(X, k, rng):
+    """k-means++ seeding."""
+    centers = np.empty((k, X.shape[1]))
+    centers[0] = X[rng.integers(len(X))]
+    closest = _sq_distances(X, centers[:1])[:, 0]
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centers[i] = X[index]
+        closest = np.minimum(closest, _sq_distances(X, centers[i:i + 1])[:, 0])
+    return centers
+
+
+class MiniBatchKMeans:
+    """Mini-batch k-means with bounded memory.
+
+    Runs ``n_init`` seedings and keeps the one with the lowest inertia on
+    the seeding sample; each run stops once the centres move less than
+    ``tol`` (squared, in feature units) over a batch, or after ``max_iter``
+    batches.
+    """
+
+    def __init__(self, k=8, batch_size=4096, max_iter=300, tol=1e-6, n_init=3,
+                 init_size=None, seed=0):
+        self.k = k
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.n_init = n_init
+        self.init_size = init_size
+        self.seed = seed
+        self.centers = None
+
+    def _run(self, X, init_sample, rng):
+        centers = _kmeans_pp(init_sample, self.k, rng)
+        counts = np.zeros(self.k)
+        for step in range(self.max_iter):
+            batch = X[rng.integers(len(X), size=min(self.batch_size, len(X)))]
+            labels, d2 = _assign(batch, centers)
+            batch_counts = np.bincount(labels, minlength=self.k)
+            sums = np.column_stack([np.bincount(labels, weights=batch[:, j], minlength=self.k)
+                                    for j in range(X.shape[1])])
+            counts += batch_counts
+            hit = batch_counts > 0
+            previous = centers.copy()
+            # Running mean of every point each centre has been assigned
+            centers[hit] += (sums[hit] - batch_counts[hit, None] * centers[hit]) / counts[hit, None]
+            if step >= 10 and (counts == 0).any():
+                # Re-seed centres nothing was ever assigned to at the worst-fit points
+                dead = np.flatnonzero(counts == 0)
+                centers[dead] = batch[np.argsort(d2)[-len(dead):]]
+                counts[dead] = 1
+            if ((centers - previous) ** 2).sum(axis=1).max() < self.tol:
+                break
+        self.n_iter = step + 1
+        return centers
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        rng = np.random.default_rng(self.seed)
+        init_size = min(len(X), self.init_size or max(3 * self.batch_size, 10 * self.k))
+        init_sample = X[rng.choice(len(X), init_size, replace=False)]
+        best = None
+        for _ in range(self.n_init):
+            centers = self._run(X, init_sample, rng)
+            inertia = _assign(init_sample, centers)[1].sum()
+            if best is None or inertia < best[0]:
+                best = (inertia, centers)
+        self.centers = best[1]
+        return self
+
+    def predict(self, X, jobs=1, chunk=PREDICT_CHUNK):
+        """Nearest centre per row, ``chunk`` rows at a time."""
+        X = np.asarray(X, dtype=np.float64)
+        starts = range(0, len(X), chunk)
+        work = lambda start: _assign(X[start:start + chunk], self.centers)[0]
+        if jobs > 1 and len(starts) > 1:
+            # NumPy releases the GIL in the matrix products, so threads scale
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                parts = list(pool.map(work, starts))
+        else:
+            parts = [work(start) for start in starts]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def inertia(self, X, chunk=PREDICT_CHUNK):
+        X = np.asarray(X, dtype=np.float64)
+        return float(sum(_assign(X[s:s + chunk], self.centers)[1].sum()
+                         for s in range(0, len(X), chunk)))
+
+
+def centroid_silhouette(X, centers):
+    """Simplified silhouette: ``(b - a) / max(a, b)`` with ``a`` the distance
+    to the own centre and ``b`` to the next nearest one. O(n k) instead of
+    the O(n^2) pairwise version."""
+    d = np.sqrt(_sq_distances(X, centers))
+    d.sort(axis=1)
+    a, b = d[:, 0], d[:, 1]
+    return float(np.mean((b - a) / np.maximum(np.maximum(a, b), 1e-12)))
+
+
+def select_k(X, ks=DEFAULT_KS, sample_size=SWEEP_SAMPLE, seed=0, **kmeans_options):
+    """Fit each k on one shared sample; returns the sweep table and the k
+    with the best centroid silhouette."""
+    X = np.asarray(X, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    sample = X[rng.choice(len(X), min(sample_size, len(X)), replace=False)]
+    rows = []
+    for k in ks:
+        if k >= len(sample):
+            break
+        start = time.perf_counter()
+        model = MiniBatchKMeans(k=k, seed=seed, **kmeans_options).fit(sample)
+        rows.append({'k': k, 'inertia': round(model.inertia(sample), 2),
+                     'silhouette': round(centroid_silhouette(sample, model.centers), 4),
+                     'fit_s': round(time.perf_counter() - start, 3)})
+    sweep = pd.DataFrame(rows)
+    return sweep, int(sweep.loc[sweep['silhouette'].idxmax(), 'k'])
+
+
+def label_centroids(centroids, scoring, rules):
+    """Segment name of each centroid (raw R/F/M units): score it with the
+    quintile edges, then look the scores up in the rule table."""
+    scores = [scoring.score_metric(metric, centroids[:, i]) for i, metric in enumerate(FEATURES)]
+    return [str(label) for label in rules.assign(*scores)]
+
+
+class ClusterModel:
+    """Feature scaler, k centroids and the segment name of each centroid."""
+
+    def __init__(self, mean, std, centers, labels, sizes=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.labels = list(labels)
+        self.sizes = None if sizes is None else np.asarray(sizes, dtype=np.int64)
+        self.stats = {}
+
+    @property
+    def k(self):
+        return len(self.centers)
+
+    @classmethod
+    def fit(cls, rfm, k=None, ks=DEFAULT_KS, sample_size=SWEEP_SAMPLE, rules=None, scoring=None,
+            jobs=1, seed=0, **kmeans_options):
+        """Fit on ``rfm`` (sweeping ``ks`` on a sample when ``k`` is None)
+        and label the clusters. ``scoring`` defaults to the qcut quintile
+        edges of ``rfm``, ``rules`` to the default segment rules."""
+        from customer_segmentation.scoring import ScoringModel
+        from customer_segmentation.segments import DEFAULT_SEGMENT_RULES
+
+        features = rfm_features(rfm)
+        mean, std = features.mean(axis=0), features.std(axis=0)
+        std[std == 0] = 1.0
+        X = (features - mean) / std
+        stats = {'customers': len(X)}
+        if k is None:
+            start = time.perf_counter()
+            stats['sweep'], k = select_k(X, ks, sample_size, seed=seed)
+            stats['sweep_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        kmeans = MiniBatchKMeans(k=k, seed=seed, **kmeans_options).fit(X)
+        stats['fit_s'] = time.perf_counter() - start
+        stats['n_iter'] = kmeans.n_iter
+        start = time.perf_counter()
+        assigned = kmeans.predict(X, jobs=jobs)
+        stats['predict_s'] = time.perf_counter() - start
+
+        scoring = scoring or ScoringModel.from_qcut(rfm)
+        centroids = np.expm1(kmeans.centers * std + mean)
+        labels = label_centroids(centroids, scoring, rules or DEFAULT_SEGMENT_RULES)
+        model = cls(mean, std, kmeans.centers, labels, np.bincount(assigned, minlength=k))
+        model.stats = stats
+        return model, assigned
+
+    def transform(self, recency, frequency, monetary):
+        raw = np.column_stack([np.asarray(recency, dtype=np.float64),
+                               np.asarray(frequency, dtype=np.float64),
+                               np.asarray(monetary, dtype=np.float64)])
+        return (np.log1p(np.clip(raw, 0, None)) - self.mean) / self.std
+
+    def assign(self, recency, frequency, monetary):
+        """Cluster ids and segment names for new customers - O(k) each."""
+        clusters, _ = _assign(self.transform(recency, frequency, monetary), self.centers)
+        return clusters, np.asarray(self.labels, dtype=object)[clusters]
+
+    def predict(self, rfm, jobs=1):
+        kmeans = MiniBatchKMeans(k=self.k)
+        kmeans.centers = self.centers
+        return kmeans.predict(self.transform(*(rfm[f] for f in FEATURES)), jobs=jobs)
+
+    def centroids(self):
+        """Centroids in raw units with their segment name and size."""
+        table = pd.DataFrame(np.expm1(self.centers * self.std + self.mean), columns=FEATURES)
+        table.insert(0, 'Cluster', np.arange(self.k))
+        table['Segment'] = self.labels
+        if self.sizes is not None:
+            table['Customers'] = self.sizes
+        return table.round({'Recency': 1, 'Frequency': 2, 'Monetary': 2})
+
+    def to_dict(self):
+        return {'features': FEATURES, 'transform': 'log1p-standardize',
+                'mean': self.mean.tolist(), 'std': self.std.tolist(),
+                'centers': self.centers.tolist(), 'labels': self.labels,
+                'sizes': None if self.sizes is None else self.sizes.tolist()}
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec['mean'], spec['std'], spec['centers'], spec['labels'], spec.get('sizes'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            return cls.from_dict(json.load(fh))
+
+
+def cluster_rfm(rfm, k=None, rules=None, jobs=1, **options):
+    """Section 5 by clustering: adds ``Cluster`` and sets ``Segment`` to the
+    cluster's segment name. Returns ``(rfm, model)``."""
+    model, assigned = ClusterModel.fit(rfm, k=k, rules=rules, jobs=jobs, **options)
+    rfm['Cluster'] = assigned
+    rfm['Segment'] = np.asarray(model.labels, dtype=object)[assigned]
+    return rfm, model
+
+
+def print_fit_report(model):
+    stats = model.stats
+    if 'sweep' in stats:
+        print(f"\n🔎 k sweep on a {min(SWEEP_SAMPLE, stats['customers']):,}-customer sample "
+              f"({stats['sweep_s']:.2f}s):")
+        print(stats['sweep'].to_string(index=False))
+    print(f"\n🧮 k-means with k={model.k}: fit {stats['fit_s']:.2f}s "
+          f"({stats['customers'] / max(stats['fit_s'], 1e-9):,.0f} customers/s, "
+          f"{stats['n_iter']} batches), predict {stats['predict_s']:.3f}s "
+          f"({stats['customers'] / max(stats['predict_s'], 1e-9):,.0f} customers/s)")
+    print(model.centroids().to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cluster customers on their RFM features')
+    parser.add_argument('rfm', help='RFM table (.csv or .parquet)')
+    parser.add_argument('--k', type=int, default=None, help='Clusters (default: sweep)')
+    parser.add_argument('--model', default='outputs/cluster_model.json')
+    parser.add_argument('--rules', default=None, help='Segment rule table (JSON / YAML)')
+    parser.add_argument('--jobs', type=int, default=1, help='Threads for the assignment pass')
+    args = parser.parse_args(argv)
+
+    from customer_segmentation.segments import load_rules
+
+    rfm = (pd.read_parquet(args.rfm) if args.rfm.endswith('.parquet') else pd.read_csv(args.rfm))
+    _, model = cluster_rfm(rfm, k=args.k, jobs=args.jobs,
+                           rules=load_rules(args.rules) if args.rules else None)
+    print_fit_report(model)
+    model.save(args.model)
+    print(f'✓ Cluster model saved: {args.model}')
+
+
+if __name__ == '__main__':
+    main()
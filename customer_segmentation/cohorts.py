@@ -0,0 +1,141 @@
+"""First-purchase cohorts: retention and revenue by months since acquisition.
+
+``monthly_revenue`` mixes first-time and returning buyers. Here every
+customer belongs to the cohort of the month of their first purchase, and
+activity is indexed by months since that month, so each row of the
+matrices follows one cohort over time::
+
+    Cohort   Customers     0      1      2   ...
+    2010-12        109  1.00   0.33   0.32
+    2011-01         70  1.00   0.17   0.14
+
+:func:`cohort_matrices` does this in one vectorized pass over integer month
+codes (``year * 12 + month - 1``): the first month per customer is a
+``np.minimum.at`` over the customer codes, and the (cohort, age) cells are a
+flat ``np.bincount`` - revenue directly, active customers over the distinct
+(customer, month) pairs. No per-cohort loop, so the cost is one sort of the
+pairs whatever the number of cohorts. When a customer and a month are
+constant within each invoice (true for transaction logs) the pass runs over
+the per-invoice reduction of
+:class:`~customer_segmentation.aggregates.FusedAggregates` instead of the
+lines.
+
+Cells a cohort has not reached yet (later than the last month in the data)
+are NaN, which is what draws the triangle of the retention heatmap.
+
+Usage::
+
+    python -m customer_segmentation.cohorts data/or.xlsx
+    python -m customer_segmentation.cohorts data/or.xlsx --table revenue --out outputs/cohort_revenue.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.pipeline import month_label
+
+COHORT_TABLES = ['cohort_customers', 'cohort_retention', 'cohort_revenue']
+
+
+def cohort_matrices(customer, month, amount, n_customers=None):
+    """Cohort x months-since-acquisition matrices from per-purchase arrays.
+
+    ``customer`` are customer codes (0..n-1), ``month`` integer month codes
+    and ``amount`` the revenue of each row. Returns ``(first_month, active,
+    revenue)``: the first month code, then square ``span x span`` matrices
+    (``span`` months from the first to the last in the data) whose row ``i``
+    is the cohort of month ``first_month + i`` and column ``j`` the months
+    since acquisition.
+    """
+    customer = np.asarray(customer, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    n_customers = int(customer.max()) + 1 if n_customers is None else n_customers
+    start = int(month.min()) if len(month) else 0
+    span = int(month.max()) - start + 1 if len(month) else 0
+    month = month - start
+
+    first = np.full(n_customers, span, dtype=np.int64)
+    np.minimum.at(first, customer, month)
+    cohort = first[customer]
+    revenue = np.bincount(cohort * span + (month - cohort), weights=amount,
+                          minlength=span * span).reshape(span, span)
+
+    # A customer is active in a month once however many times they bought
+    pairs = np.sort(customer * span + month)
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+    pair_cohort = first[pairs // span]
+    active = np.bincount(pair_cohort * span + (pairs % span - pair_cohort),
+                         minlength=span * span).reshape(span, span)
+    return start, active, revenue
+
+
+def cohort_tables(aggregates):
+    """``cohort_customers``, ``cohort_retention`` and ``cohort_revenue``
+    tables (one row per cohort with new customers) from a
+    :class:`~customer_segmentation.aggregates.FusedAggregates`."""
+    fa = aggregates
+    month_codes = np.asarray(fa.month_labels, dtype=np.int64)
+    invoice_customer, customer_constant = fa.invoice_attr['cust']
+    invoice_month, month_constant = fa.invoice_attr['month']
+    if customer_constant and month_constant:
+        customer, month, amount = invoice_customer, month_codes[invoice_month], fa.invoice_amount
+    else:
+        customer, month, amount = fa.cust, month_codes[fa.month], fa.amount
+    start, active, revenue = cohort_matrices(customer, month, amount, len(fa.customer_labels))
+    return cohort_frames(start, active, revenue)
+
+
+def cohort_frames(start, active, revenue):
+    """Label :func:`cohort_matrices` output: cohorts as ``'YYYY-MM'``, ages
+    as ``'0'``, ``'1'``, ... columns (string names, so the tables go to
+    Parquet and Excel as they are)."""
+    span = len(active)
+    sizes = active[:, 0] if span else np.zeros(0, dtype=np.int64)
+    rows = np.flatnonzero(sizes)
+    # Row i can only be observed for span - i months
+    unobserved = np.arange(span)[None, :] >= (span - np.arange(span))[:, None]
+    columns = [str(age) for age in range(span)]
+    head = {'Cohort': month_label(start + rows), 'Customers': sizes[rows]}
+
+    def frame(values):
+        values = np.where(unobserved, np.nan, values)[rows]
+        return pd.concat([pd.DataFrame(head), pd.DataFrame(values, columns=columns)], axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retention = active / sizes[:, None]
+    return {'cohort_customers': frame(active), 'cohort_retention': frame(retention),
+            'cohort_revenue': frame(revenue)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='First-purchase cohort retention and revenue')
+    parser.add_argument('source', help='Transactions (.xlsx, .csv or .parquet)')
+    parser.add_argument('--table', choices=['customers', 'retention', 'revenue'],
+                        default='retention')
+    parser.add_argument('--out', default=None, help='Write the table (.csv / .parquet)')
+    args = parser.parse_args(argv)
+
+    from customer_segmentation.aggregates import FusedAggregates
+    from customer_segmentation.ingest import load_transactions
+    from customer_segmentation.pipeline import clean_transactions
+
+    df_clean, _ = clean_transactions(load_transactions(args.source), release=True)
+    aggregates = FusedAggregates(df_clean)
+    start = time.perf_counter()
+    tables = cohort_tables(aggregates)
+    seconds = time.perf_counter() - start
+    table = tables[f'cohort_{args.table}']
+    with pd.option_context('display.max_columns', 16, 'display.width', 200,
+                           'display.float_format', '{:.2f}'.format):
+        print(table.to_string(index=False, max_cols=16))
+    print(f'\n{len(table):,} cohorts x {len(table.columns) - 2} months in {seconds * 1e3:.1f}ms')
+    if args.out:
+        from customer_segmentation.export import write_table
+        write_table(table, args.out)
+        print(f'✓ Saved: {args.out}')
+
+
+if __name__ == '__main__':
+    main()
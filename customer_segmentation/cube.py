@@ -0,0 +1,458 @@
+"""Pre-aggregated (month, country, product, segment) cube with HLL sketches.
+
+Every Section 3 breakdown used to be its own groupby over ``df_clean``, and
+any new one (country x month, segment x country, ...) another full scan.
+:class:`Cube` aggregates the transactions once to cells keyed on the
+integer codes of four dimensions - month, country, product (StockCode,
+Description) and segment - holding additive measures (revenue, quantity,
+line count) plus mergeable distinct-count sketches for orders and
+customers. :meth:`Cube.rollup` answers any dimension subset (optionally
+sliced with ``where``) from the cells alone, in milliseconds.
+
+Distinct counts do not add across cells, so each cell keeps a HyperLogLog
+sketch (precision :data:`HLL_PRECISION`) of the hashed InvoiceNo /
+CustomerID values, stored sparsely: only the registers a cell actually
+touched, as ``register << 6 | rank`` codes in one array per sketch with
+per-cell offsets. Rolling up merges the sketches of a group's cells (max
+rank per register), then estimates with linear counting while registers
+are still free - close to exact at these cardinalities - and the
+HyperLogLog harmonic mean beyond that. Hashes are of the labels, not the
+codes, so cubes built from different extracts merge consistently.
+
+Which numbers are exact: the headline totals and every measure and count of
+the single-dimension cuboids (month, country, product, segment) - recounted
+from the lines with the same kernels as
+:class:`~customer_segmentation.aggregates.FusedAggregates`, so the Section 3
+tables are identical to the in-memory ones. Revenue, quantity and lines add
+across cells, so they are exact in every rollup. Only ``orders`` and
+``customers`` of multi-dimension cuboids, and of rollups that merge sketches
+(a slice keeping several members of a dimension outside ``by``), are
+HyperLogLog estimates.
+
+A cube is a directory of ``.npy`` arrays plus ``meta.json`` (labels and
+totals), memory-mapped on open like the profile store.
+
+Usage::
+
+    python -m customer_segmentation.cube build data/or.xlsx outputs/cube --segments outputs/rfm_customer_segmentation.parquet
+    python -m customer_segmentation.cube query outputs/cube country segment --top 20
+    python -m customer_segmentation.cube query outputs/cube month --where segment=Champions
+"""
+import argparse
+import json
+import os
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.aggregates import _distinct_per_key
+from customer_segmentation.pipeline import month_label
+
+CUBE_VERSION = 1
+DIMENSIONS = ['month', 'country', 'product', 'segment']
+MEASURES = ['revenue', 'quantity', 'lines']
+SKETCHES = ['orders', 'customers']
+HLL_PRECISION = 16
+RANK_BITS = 6
+RANK_MASK = (1 << RANK_BITS) - 1
+REGISTER_BITS = 24  # room for precisions up to 24 in the merge keys
+# A coarser cuboid keeps its sketches only when they are at least this many
+# times smaller than the finest cuboid's (merging would otherwise read about
+# as many registers from the finest one anyway)
+SKETCH_SHRINK = 4
+# Label column(s) each dimension is reported under
+LABEL_COLUMNS = {'month': ['YearMonth'], 'country': ['Country'],
+                 'product': ['StockCode', 'Description'], 'segment': ['Segment']}
+
+
+def hll_hash(labels, precision=HLL_PRECISION):
+    """``register << 6 | rank`` HyperLogLog code of each label's 64-bit hash."""
+    values = np.asarray(labels)
+    if values.dtype.kind not in 'iub':
+        values = values.astype(object)
+    hashed = pd.util.hash_array(values)
+    register = hashed >> np.uint64(64 - precision)
+    rest = hashed << np.uint64(precision)
+    # Rank = leading zeros of the remaining bits + 1; the top 53 bits go
+    # through frexp exactly, an all-zero top counts as the maximum rank
+    _, exponent = np.frexp((rest >> np.uint64(11)).astype(np.float64))
+    bit_length = np.where(exponent > 0, exponent + 11, 0)
+    rank = np.minimum(64 - bit_length + 1, 64 - precision + 1)
+    return (register.astype(np.int64) << RANK_BITS) | rank.astype(np.int64)
+
+
+def _merge_registers(groups, codes):
+    """Merge sparse sketches: ``(group, register, rank)`` with the max rank
+    of every distinct (group, register) pair in ``codes``, sorted by group
+    and register."""
+    packed = np.sort((groups.astype(np.int64) << (REGISTER_BITS + RANK_BITS)) | codes)
+    # Sorted, so the last code of each (group, register) run has the max rank
+    keys = packed >> RANK_BITS
+    last = np.empty(len(keys), dtype=bool)
+    last[-1:] = True
+    np.not_equal(keys[1:], keys[:-1], out=last[:-1])
+    packed = packed[last]
+    return (packed >> (REGISTER_BITS + RANK_BITS), (packed >> RANK_BITS) & ((1 << REGISTER_BITS) - 1),
+            (packed & RANK_MASK).astype(np.int8))
+
+
+def hll_estimate(groups, rank, n_groups, precision=HLL_PRECISION):
+    """Cardinality per group from merged registers (linear counting while
+    it applies, raw HyperLogLog above)."""
+    m = float(1 << precision)
+    touched = np.bincount(groups, minlength=n_groups)
+    harmonic = np.bincount(groups, weights=np.exp2(-rank.astype(np.float64)),
+                           minlength=n_groups) + (m - touched)
+    raw = 0.7213 / (1 + 1.079 / m) * m * m / harmonic
+    empty = m - touched
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / empty)
+    return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
+
+
+def _aggregate(rows, dims, sizes, precision):
+    """One cuboid: ``rows`` (dimension codes, measures and sparse sketches
+    per row - transaction lines or the cells of a finer cuboid) grouped by
+    ``dims``."""
+    n_rows = len(rows['revenue'])
+    key = np.zeros(n_rows, dtype=np.int64)
+    for dimension in dims:
+        key = key * sizes[dimension] + rows[dimension]
+    group, group_keys = pd.factorize(key, sort=True)
+    n_cells = len(group_keys)
+
+    arrays = {}
+    remainder = group_keys
+    for dimension in reversed(dims):
+        arrays[dimension] = (remainder % sizes[dimension]).astype(np.int32)
+        remainder = remainder // sizes[dimension]
+    for measure in MEASURES:
+        totals = np.bincount(group, weights=rows[measure], minlength=n_cells)
+        arrays[measure] = totals if measure == 'revenue' else totals.astype(np.int64)
+    for sketch in SKETCHES:
+        counts, codes = rows[f'{sketch}_counts'], rows[f'{sketch}_registers']
+        groups, registers, rank = _merge_registers(np.repeat(group, counts), codes)
+        arrays[f'{sketch}_registers'] = ((registers << RANK_BITS) | rank).astype(np.int32)
+        arrays[f'{sketch}_offsets'] = np.concatenate(
+            [[0], np.cumsum(np.bincount(groups, minlength=n_cells))]).astype(np.int64)
+        arrays[sketch] = np.rint(hll_estimate(groups, rank, n_cells, precision)).astype(np.int64)
+    return arrays
+
+
+def _as_rows(arrays):
+    """A cuboid's cells as the ``rows`` input of a coarser one."""
+    rows = dict(arrays)
+    for sketch in SKETCHES:
+        rows[f'{sketch}_counts'] = np.diff(arrays[f'{sketch}_offsets'])
+    return rows
+
+
+def cuboid_name(dims):
+    return '+'.join(dims) or 'all'
+
+
+class Cube:
+    """Every cuboid (group-by over a subset) of the (month, country,
+    product, segment) lattice."""
+
+    def __init__(self, cuboids, meta, path=None):
+        self.cuboids = cuboids
+        self.meta = meta
+        self.labels = meta['labels']
+        self.path = path
+
+    def __len__(self):
+        return self.meta['cuboids'][cuboid_name(DIMENSIONS)]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for name in self.meta['cuboids']
+                   for values in self._load(name).values())
+
+    @classmethod
+    def build(cls, aggregates, segments=None, precision=HLL_PRECISION):
+        """Cube from a :class:`~customer_segmentation.aggregates.FusedAggregates`
+        (its factorized codes) and optionally the Section 5 table
+        (CustomerID, Segment); without it the segment dimension is 'All'.
+
+        The finest cuboid aggregates the transaction lines; each coarser one
+        is rolled up from its smallest already-built parent."""
+        fa = aggregates
+        if segments is not None:
+            customer_segment, segment_labels = fa.customer_segments(segments)
+        else:
+            customer_segment = np.zeros(len(fa.customer_labels), dtype=np.int64)
+            segment_labels = ['All']
+
+        # Product = (StockCode, Description); a missing Description is its own member
+        n_desc = len(fa.desc_labels) + 1
+        product, product_keys = pd.factorize(fa.stock * n_desc + fa.desc + 1, sort=True)
+        descriptions = np.asarray(fa.desc_labels, dtype=object)
+
+        sizes = {'month': len(fa.month_labels), 'country': len(fa.country_labels),
+                 'product': len(product_keys), 'segment': len(segment_labels)}
+        lines = {'month': fa.month, 'country': fa.country, 'product': product.astype(np.int64),
+                 'segment': customer_segment[fa.cust], 'revenue': fa.amount,
+                 'quantity': fa.quantity, 'lines': np.ones(len(fa.amount), dtype=np.int64)}
+        # Invoice / customer hashes are computed once per label
+        for sketch, item_codes, labels in (('orders', fa.inv, fa.invoice_labels),
+                                           ('customers', fa.cust, fa.customer_labels)):
+            lines[f'{sketch}_counts'] = 1
+            lines[f'{sketch}_registers'] = hll_hash(labels, precision)[item_codes]
+
+        cuboids = {tuple(DIMENSIONS): _aggregate(lines, DIMENSIONS, sizes, precision)}
+        line_keys = {dimension: lines[dimension] for dimension in DIMENSIONS}
+        del lines
+        for size in range(len(DIMENSIONS) - 1, -1, -1):
+            for dims in combinations(DIMENSIONS, size):
+                parent = min((parent for parent in cuboids
+                              if len(parent) == size + 1 and set(dims) <= set(parent)),
+                             key=lambda parent: len(cuboids[parent]['revenue']))
+                cuboids[dims] = _aggregate(_as_rows(cuboids[parent]), dims, sizes, precision)
+
+        # The single-dimension cuboids (the Section 3 tables) and the grand
+        # total are recounted exactly from the lines; the sketches stay for
+        # merging under a slice
+        n_cust = len(fa.customer_labels)
+        for dimension, key in line_keys.items():
+            cuboid, n = cuboids[(dimension,)], sizes[dimension]
+            cells = cuboid[dimension]
+            cuboid['revenue'] = np.bincount(key, weights=fa.amount, minlength=n)[cells]
+            cuboid['quantity'] = np.bincount(key, weights=fa.quantity,
+                                             minlength=n).astype(np.int64)[cells]
+            cuboid['lines'] = np.bincount(key, minlength=n)[cells]
+            cuboid['orders'] = _distinct_per_key(key, fa.inv, n, fa.n_inv)[cells]
+            cuboid['customers'] = _distinct_per_key(key, fa.cust, n, n_cust)[cells]
+        cuboids[()]['orders'] = np.array([fa.n_inv], dtype=np.int64)
+        cuboids[()]['customers'] = np.array([n_cust], dtype=np.int64)
+
+        finest = sum(len(cuboids[tuple(DIMENSIONS)][f'{sketch}_registers']) for sketch in SKETCHES)
+        arrays = {}
+        for dims, cuboid in cuboids.items():
+            entries = sum(len(cuboid[f'{sketch}_registers']) for sketch in SKETCHES)
+            if len(dims) < len(DIMENSIONS) and entries * SKETCH_SHRINK > finest:
+                for sketch in SKETCHES:
+                    del cuboid[f'{sketch}_registers'], cuboid[f'{sketch}_offsets']
+            arrays[cuboid_name(dims)] = sorted(cuboid)
+
+        meta = {
+            'version': CUBE_VERSION, 'precision': precision,
+            'cuboids': {cuboid_name(dims): len(cuboid['revenue'])
+                        for dims, cuboid in cuboids.items()},
+            'arrays': arrays,
+            'labels': {
+                'month': np.asarray(fa.month_labels).tolist(),
+                'country': np.asarray(fa.country_labels).tolist(),
+                'product': {'StockCode': np.asarray(fa.stock_labels, dtype=object)[
+                                product_keys // n_desc].tolist(),
+                            'Description': [None if code < 0 else descriptions[code]
+                                            for code in product_keys % n_desc - 1]},
+                'segment': segment_labels,
+            },
+            # Exact totals (the sketches answer everything below them)
+            'totals': {'total_revenue': float(fa.amount.sum()), 'total_orders': int(fa.n_inv),
+                       'total_customers': len(fa.customer_labels),
+                       'avg_order_value': float(fa.invoice_amount.mean())},
+        }
+        return cls({cuboid_name(dims): arrays for dims, arrays in cuboids.items()}, meta)
+
+    def save(self, path):
+        for name, arrays in self.cuboids.items():
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+            for array, values in arrays.items():
+                np.save(os.path.join(path, name, f'{array}.npy'), values)
+        with open(os.path.join(path, 'meta.json'), 'w') as fh:
+            json.dump(self.meta, fh)
+        return path
+
+    @classmethod
+    def open(cls, path):
+        """Open a saved cube; cuboids are memory-mapped when first queried."""
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        if meta.get('version') != CUBE_VERSION:
+            raise ValueError(f"Unsupported cube version: {meta.get('version')}")
+        return cls({}, meta, path)
+
+    def _load(self, name):
+        if name not in self.cuboids:
+            self.cuboids[name] = {array: np.load(os.path.join(self.path, name, f'{array}.npy'),
+                                                 mmap_mode='r')
+                                  for array in self.meta['arrays'][name]}
+        return self.cuboids[name]
+
+    def cuboid(self, dims, sketches=False):
+        """Arrays of the cuboid grouped by ``dims``; with ``sketches=True`` the
+        smallest cuboid over (at least) ``dims`` that kept its sketches."""
+        if not sketches:
+            return self._load(cuboid_name([dimension for dimension in DIMENSIONS
+                                           if dimension in dims]))
+        candidates = [name for name, arrays in self.meta['arrays'].items()
+                      if 'orders_registers' in arrays and set(dims) <= set(arrays)]
+        return self._load(min(candidates, key=self.meta['cuboids'].get))
+
+    def codes(self, dimension, labels):
+        """Codes of ``labels`` in a dimension (months as 'YYYY-MM', products by StockCode)."""
+        known = (self.labels['product']['StockCode'] if dimension == 'product'
+                 else self.labels[dimension])
+        if dimension == 'month':
+            known = month_label(known)
+        wanted = set(labels if isinstance(labels, (list, tuple, set)) else [labels])
+        return [code for code, label in enumerate(known) if label in wanted]
+
+    def _size(self, dimension):
+        labels = self.labels[dimension]
+        return len(labels['StockCode']) if dimension == 'product' else len(labels)
+
+    def _label_columns(self, dimension, codes):
+        labels = self.labels[dimension]
+        if dimension == 'month':
+            return {'YearMonth': np.asarray(month_label(np.asarray(labels)), dtype=object)[codes]}
+        if dimension == 'product':
+            return {column: np.asarray(labels[column], dtype=object)[codes]
+                    for column in LABEL_COLUMNS['product']}
+        return {LABEL_COLUMNS[dimension][0]: np.asarray(labels, dtype=object)[codes]}
+
+    def rollup(self, by=(), where=None, sketches=SKETCHES):
+        """Measures and distinct counts per combination of the ``by``
+        dimensions, over the cells matching ``where`` ({dimension: labels}).
+
+        Reads the cuboid of ``by`` plus the sliced dimensions. When that maps
+        one cell to one result row (no slice keeps several members of a
+        dimension outside ``by``) the stored counts are returned as they are;
+        otherwise the cells' sketches are merged per row."""
+        by = [by] if isinstance(by, str) else list(by)
+        where = {dimension: self.codes(dimension, labels) for dimension, labels in (where or {}).items()}
+        unknown = (set(by) | set(where)) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f'Unknown dimensions {sorted(unknown)}; choose from {DIMENSIONS}')
+        merge = not all(dimension in by or len(codes) == 1 for dimension, codes in where.items())
+        cuboid = self.cuboid(set(by) | set(where), sketches=merge)
+        mask = np.ones(len(cuboid['revenue']), dtype=bool)
+        for dimension, codes in where.items():
+            mask &= np.isin(cuboid[dimension], codes)
+        cells = np.flatnonzero(mask)
+
+        if not merge:
+            cells = cells[np.lexsort([cuboid[dimension][cells] for dimension in reversed(by)])] \
+                if by else cells
+            table = {}
+            for dimension in by:
+                table.update(self._label_columns(dimension, cuboid[dimension][cells]))
+            for column in MEASURES + list(sketches):
+                table[column] = np.asarray(cuboid[column][cells])
+            return pd.DataFrame(table)
+
+        key = np.zeros(len(cells), dtype=np.int64)
+        for dimension in by:
+            key = key * self._size(dimension) + cuboid[dimension][cells]
+        group, group_keys = pd.factorize(key, sort=True)
+        n_groups = len(group_keys)
+        table = {}
+        remainder = group_keys
+        for dimension in reversed(by):
+            size = self._size(dimension)
+            table = {**self._label_columns(dimension, remainder % size), **table}
+            remainder = remainder // size
+        for measure in MEASURES:
+            totals = np.bincount(group, weights=cuboid[measure][cells], minlength=n_groups)
+            table[measure] = totals if measure == 'revenue' else totals.astype(np.int64)
+        for sketch in sketches:
+            offsets = cuboid[f'{sketch}_offsets']
+            counts = offsets[cells + 1] - offsets[cells]
+            registers = cuboid[f'{sketch}_registers'][_ranges(offsets[cells], counts)]
+            groups, _, rank = _merge_registers(np.repeat(group, counts), registers)
+            table[sketch] = np.rint(hll_estimate(groups, rank, n_groups,
+                                                 self.meta['precision'])).astype(np.int64)
+        return pd.DataFrame(table)
+
+    # ── Section 3 tables ─────────────────────────────────────────────
+    def totals(self):
+        return dict(self.meta['totals'])
+
+    def country_revenue(self):
+        table = self.rollup('country')
+        country_revenue = (table.set_index('Country')[['revenue', 'orders', 'customers']]
+                           .sort_values('revenue', ascending=False))
+        country_revenue['revenue_share_%'] = (country_revenue['revenue']
+                                              / self.meta['totals']['total_revenue'] * 100).round(2)
+        return country_revenue
+
+    def product_revenue(self):
+        table = self.rollup('product', sketches=['orders'])
+        table = table[table['Description'].notna()]
+        return (table.rename(columns={'quantity': 'quantity_Sold', 'orders': 'time_ordered'})
+                [['StockCode', 'Description', 'revenue', 'quantity_Sold', 'time_ordered']]
+                .sort_values('revenue', ascending=False).reset_index(drop=True))
+
+    def monthly_revenue(self):
+        return self.rollup('month')[['YearMonth', 'revenue', 'orders', 'customers']]
+
+    def eda_tables(self):
+        """Same dict as ``pipeline.eda_tables``, exact (single-dimension cuboids)."""
+        return {
+            **self.totals(),
+            'country_revenue': self.country_revenue(),
+            'product_revenue': self.product_revenue(),
+            'monthly_revenue': self.monthly_revenue(),
+        }
+
+
+def _ranges(starts, counts):
+    """Concatenation of ``range(start, start + count)`` for each pair."""
+    ends = np.cumsum(counts)
+    return np.repeat(starts - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-aggregated Section 3 cube')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='Build a cube from a transactions file')
+    build_cmd.add_argument('source', help='Transactions (.xlsx, .csv or .parquet)')
+    build_cmd.add_argument('cube')
+    build_cmd.add_argument('--segments', default=None,
+                           help='Section 5 table (CustomerID, Segment) for the segment dimension')
+    query_cmd = sub.add_parser('query', help='Roll the cube up to some dimensions')
+    query_cmd.add_argument('cube')
+    query_cmd.add_argument('by', nargs='*', choices=DIMENSIONS)
+    query_cmd.add_argument('--where', action='append', default=[],
+                           help='dimension=label[,label...] slice (repeatable)')
+    query_cmd.add_argument('--top', type=int, default=None, help='Largest groups by revenue')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from customer_segmentation.aggregates import FusedAggregates
+        from customer_segmentation.ingest import load_transactions
+        from customer_segmentation.pipeline import clean_transactions
+
+        df_clean, _ = clean_transactions(load_transactions(args.source), release=True)
+        segments = None
+        if args.segments:
+            segments = (pd.read_parquet(args.segments) if args.segments.endswith('.parquet')
+                        else pd.read_csv(args.segments))
+        start = time.perf_counter()
+        cube = Cube.build(FusedAggregates(df_clean), segments)
+        cube.save(args.cube)
+        print(f'✓ {len(cube):,} cells from {len(df_clean):,} transactions saved: {args.cube} '
+              f'({cube.nbytes / 2**20:.1f} MB, {time.perf_counter() - start:.2f}s)')
+        return
+
+    cube = Cube.open(args.cube)
+    where = {}
+    for clause in args.where:
+        dimension, _, labels = clause.partition('=')
+        where[dimension] = labels.split(',')
+    start = time.perf_counter()
+    table = cube.rollup(args.by, where=where)
+    seconds = time.perf_counter() - start
+    groups = len(table)
+    if args.top:
+        table = table.nlargest(args.top, 'revenue')
+    print(table.to_string(index=False))
+    print(f'\n{groups:,} groups in {seconds * 1e3:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
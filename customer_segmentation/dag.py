@@ -0,0 +1,318 @@
+"""A small DAG scheduler with a Parquet stage cache.
+
+A pipeline is a set of named :class:`Stage` objects, each a function of the
+outputs of its ``inputs``. Every stage gets a cache key before anything
+runs: a hash of its name, explicit ``version``, the source of its code, its
+parameters and the keys of its upstream stages (the source stage folds in
+a hash of the data file). Keys therefore change exactly when something a
+stage depends on changes, and the scheduler can decide up front which
+stages are invalidated.
+
+Persisted outputs live under ``cache_dir/<stage>/<key>/`` - DataFrames as
+Parquet, scalars in ``meta.json``, or the list of files a side-effect stage
+(charts, report) wrote. On a run only invalidated stages recompute; a
+cached stage is read back from Parquet only when a recomputing stage needs
+it as input. Stages whose inputs are ready run concurrently on a thread
+pool, so independent branches (EDA aggregates and RFM, say) overlap.
+"""
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT = 1
+DEFAULT_KEEP = 2
+
+
+def code_hash(objects):
+    """Hash of the source of functions, classes or modules.
+
+    Modules can also be given by dotted name, which hashes the file without
+    importing it (so keying a plotting stage does not import matplotlib).
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        if isinstance(obj, str):
+            with open(importlib.util.find_spec(obj).origin, 'rb') as fh:
+                digest.update(fh.read())
+            continue
+        obj = getattr(obj, 'func', obj)  # functools.partial
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+class Stage:
+    """A named step: ``func(*values_of_inputs)`` -> output.
+
+    The output is a DataFrame, a dict of DataFrames and JSON scalars, or -
+    with ``kind='files'`` - the list of paths the stage wrote. ``params``
+    only feed the cache key; bind the actual arguments into ``func`` (e.g.
+    with ``functools.partial``). ``code`` lists further functions / modules
+    (or dotted module names) whose source counts as the stage's code.
+    ``persist=False`` stages are keyed but never written (the raw load,
+    in-memory helpers).
+    """
+
+    def __init__(self, name, func, inputs=(), params=None, version=1, code=(),
+                 kind='data', persist=True):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.version = version
+        self.code = (func, *code)
+        self.kind = kind
+        self.persist = persist
+
+    def key(self, upstream_keys):
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'stage': self.name, 'version': self.version,
+                                  'params': self.params, 'inputs': upstream_keys},
+                                 sort_keys=True, default=str).encode())
+        digest.update(code_hash(self.code).encode())
+        return digest.hexdigest()
+
+
+def _scalar(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def file_fingerprint(path):
+    """``[relative path, size, mtime_ns]`` of a file, or of every file under a
+    directory; None when missing."""
+    if not os.path.exists(path):
+        return None
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return [['', stat.st_size, stat.st_mtime_ns]]
+    entries = []
+    for directory, _, names in os.walk(path):
+        for name in sorted(names):
+            full = os.path.join(directory, name)
+            stat = os.stat(full)
+            entries.append([os.path.relpath(full, path), stat.st_size, stat.st_mtime_ns])
+    return sorted(entries)
+
+
+class StageCache:
+    """Parquet outputs under ``root/<stage>/<key[:16]>/``."""
+
+    def __init__(self, root, keep=DEFAULT_KEEP):
+        self.root = root
+        self.keep = keep
+
+    def _dir(self, stage, key):
+        return os.path.join(self.root, stage.name, key[:16])
+
+    def _meta(self, stage, key):
+        try:
+            with open(os.path.join(self._dir(stage, key), 'meta.json')) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('key') == key and meta.get('format') == CACHE_FORMAT else None
+
+    def contains(self, stage, key):
+        if not stage.persist:
+            return False
+        meta = self._meta(stage, key)
+        if meta is None:
+            return False
+        # A side-effect stage is only fresh while its files are the ones it
+        # wrote (another key's run may have overwritten them since)
+        return all(file_fingerprint(path) == fingerprint
+                   for path, fingerprint in meta.get('files', {}).items())
+
+    def load(self, stage, key):
+        meta = self._meta(stage, key)
+        directory = self._dir(stage, key)
+        if meta['kind'] == 'files':
+            return list(meta['files'])
+        frames = {name: pd.read_parquet(os.path.join(directory, f'{name}.parquet'))
+                  for name in meta['frames']}
+        if meta['kind'] == 'frame':
+            return frames['value']
+        return {**meta['scalars'], **frames}
+
+    def save(self, stage, key, value):
+        directory = self._dir(stage, key)
+        tmp = directory + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        meta = {'format': CACHE_FORMAT, 'stage': stage.name, 'key': key,
+                'created': time.time(), 'frames': [], 'scalars': {}}
+        if stage.kind == 'files':
+            meta.update(kind='files', files={path: file_fingerprint(path) for path in value})
+        else:
+            items = {'value': value} if isinstance(value, pd.DataFrame) else value
+            meta['kind'] = 'frame' if isinstance(value, pd.DataFrame) else 'dict'
+            for name, item in items.items():
+                if isinstance(item, pd.DataFrame):
+                    item.to_parquet(os.path.join(tmp, f'{name}.parquet'))
+                    meta['frames'].append(name)
+                else:
+                    meta['scalars'][name] = _scalar(item)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        self.prune(stage)
+
+    def prune(self, stage):
+        """Keep only the ``keep`` most recent entries of a stage."""
+        stage_dir = os.path.join(self.root, stage.name)
+        entries = sorted((os.path.join(stage_dir, name) for name in os.listdir(stage_dir)
+                          if not name.endswith('.tmp')),
+                         key=os.path.getmtime, reverse=True)
+        for path in entries[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class DAG:
+    """Stages plus the scheduler that runs the invalidated part of them."""
+
+    def __init__(self, stages, cache_dir, workers=2, recorder=None, verbose=True):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f'Stage {stage.name!r} has unknown inputs: {missing}')
+        self.order = self._topological_order()
+        self.cache = StageCache(cache_dir)
+        self.workers = workers
+        self.recorder = recorder
+        self.verbose = verbose
+        self.status = {}
+        self.keys_used = {}
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f'Cycle in stage graph: {" -> ".join(path + [name])}')
+            state[name] = 'visiting'
+            for dep in self.stages[name].inputs:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def sinks(self):
+        consumed = {dep for stage in self.stages.values() for dep in stage.inputs}
+        return [name for name in self.order if name not in consumed]
+
+    def keys(self):
+        keys = {}
+        for name in self.order:
+            stage = self.stages[name]
+            keys[name] = stage.key({dep: keys[dep] for dep in stage.inputs})
+        return keys
+
+    def plan(self, targets=None):
+        """``(run, load, keys)``: stages to recompute and cached stages to
+        read back so that every target is up to date."""
+        keys = self.keys()
+        run, load = set(), set()
+
+        def need(name):
+            if name in run or name in load:
+                return
+            stage = self.stages[name]
+            if self.cache.contains(stage, keys[name]):
+                load.add(name)
+                return
+            run.add(name)
+            for dep in stage.inputs:
+                need(dep)
+
+        for name in targets or self.sinks():
+            if name not in self.stages:
+                raise ValueError(f'Unknown stage {name!r}; stages are {self.order}')
+            need(name)
+        return run, load, keys
+
+    def _execute(self, name, key, values, load):
+        stage = self.stages[name]
+        start = time.perf_counter()
+        if name in load:
+            value = self.cache.load(stage, key)
+        else:
+            inputs = [values[dep] for dep in stage.inputs]
+            context = (self.recorder.stage(name, inputs=inputs) if self.recorder is not None
+                       else nullcontext())
+            with context as recorded:
+                value = stage.func(*inputs)
+                if recorded is not None:
+                    recorded.outputs(value)
+            if stage.persist:
+                self.cache.save(stage, key, value)
+        return value, time.perf_counter() - start
+
+    def run(self, targets=None):
+        """Bring ``targets`` (default: every sink) up to date and return
+        their values."""
+        targets = list(targets or self.sinks())
+        run, load, keys = self.plan(targets)
+        tasks = run | load
+        # Values are dropped once every recomputing consumer has them
+        consumers = {name: sum(name in self.stages[other].inputs for other in run)
+                     for name in tasks}
+        self.status = {name: ('cached' if self.cache.contains(self.stages[name], keys[name])
+                              else 'skipped', None) for name in self.order}
+        values, running = {}, {}
+        pending = [name for name in self.order if name in tasks]
+
+        # cProfile hooks do not separate concurrent stages: profile one at a time
+        profiling = self.recorder is not None and self.recorder.profile_dir
+        workers = 1 if profiling else max(self.workers, 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.stages[name].inputs if name in run else ()
+                    if all(dep in values for dep in deps):
+                        pending.remove(name)
+                        if self.verbose and name in run:
+                            print(f'   ▶ {name} ...')
+                        running[pool.submit(self._execute, name, keys[name], values, load)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    values[name], seconds = future.result()
+                    self.status[name] = ('ran' if name in run else 'loaded', seconds)
+                    if self.verbose:
+                        print(f'   {"✓" if name in run else "↺"} {name} '
+                              f'{"computed" if name in run else "read from cache"} in {seconds:.2f}s')
+                    if name in run:
+                        for dep in self.stages[name].inputs:
+                            consumers[dep] -= 1
+                            if consumers[dep] == 0 and dep not in targets:
+                                values.pop(dep, None)
+        self.keys_used = keys
+        return {name: values[name] for name in targets}
+
+    def report(self):
+        """Per-stage status of the last run: ran / loaded / cached."""
+        return pd.DataFrame([{
+            'stage': name,
+            'status': self.status[name][0],
+            'seconds': None if self.status[name][1] is None else round(self.status[name][1], 3),
+            'key': self.keys_used[name][:12],
+        } for name in self.order])
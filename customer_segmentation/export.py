@@ -0,0 +1,137 @@
+"""Bulk export of the Section 9 results.
+
+``pd.ExcelWriter(engine='openpyxl')`` builds a cell object for every value, so
+the per-customer ``RFM_Analysis`` sheet dominates time and memory. This module
+streams sheets row by row with xlsxwriter's ``constant_memory`` mode (or
+openpyxl's write-only mode when xlsxwriter is missing), writes the customer
+table to Parquet and gzip CSV next to the plain CSV, and keeps the workbook to
+the summary sheets when the customer table is too big for Excel - above
+``DEFAULT_MAX_EXCEL_ROWS`` rows by default, well before the worksheet limit,
+since a sheet that size is slow to write and to open.
+
+Every writer is timed; ``print_throughput`` shows rows/s and MB/s per output.
+"""
+import os
+import time
+
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_576  # including the header row
+DEFAULT_MAX_EXCEL_ROWS = 200_000
+ROW_CHUNK = 50_000
+
+
+class ExportStats:
+    def __init__(self):
+        self.rows = []
+
+    def timed(self, writer, path, n_rows, write):
+        start = time.perf_counter()
+        write()
+        seconds = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        self.rows.append({
+            'writer': writer,
+            'path': path,
+            'rows': n_rows,
+            'seconds': round(seconds, 3),
+            'rows_per_s': round(n_rows / max(seconds, 1e-9)),
+            'MB': round(size_mb, 2),
+            'MB_per_s': round(size_mb / max(seconds, 1e-9), 2),
+        })
+
+    def print_throughput(self):
+        if not self.rows:
+            return
+        print('\n⏱ Export throughput:')
+        print(pd.DataFrame(self.rows).to_string(index=False))
+
+
+def _cell_values(series):
+    """Python values for one column chunk; missing values become None."""
+    if isinstance(series.dtype, pd.PeriodDtype):
+        series = series.astype(str)
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def _iter_rows(df):
+    for start in range(0, len(df), ROW_CHUNK):
+        chunk = df.iloc[start:start + ROW_CHUNK]
+        yield from zip(*(_cell_values(chunk[col]) for col in chunk.columns))
+
+
+def _sheet_frame(df, index):
+    return df.reset_index() if index else df
+
+
+def write_xlsx(path, sheets, index_sheets=()):
+    """Write ``{sheet_name: DataFrame}`` with a constant-memory writer.
+
+    Rows are written strictly top to bottom, so xlsxwriter can flush each row
+    to disk as soon as it is complete.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        return _write_xlsx_openpyxl(path, sheets, index_sheets)
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'nan_inf_to_errors': True,
+    })
+    header = workbook.add_format({'bold': True})
+    try:
+        for sheet_name, df in sheets.items():
+            df = _sheet_frame(df, sheet_name in index_sheets)
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(c) for c in df.columns], header)
+            for row_num, row in enumerate(_iter_rows(df), start=1):
+                worksheet.write_row(row_num, 0, row)
+    finally:
+        workbook.close()
+
+
+def _write_xlsx_openpyxl(path, sheets, index_sheets=()):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        df = _sheet_frame(df, sheet_name in index_sheets)
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append([str(c) for c in df.columns])
+        for row in _iter_rows(df):
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def write_report(path, sheets, per_customer_sheet='RFM_Analysis', index_sheets=(),
+                 max_excel_rows=DEFAULT_MAX_EXCEL_ROWS, stats=None):
+    """Write the Excel report, leaving out ``per_customer_sheet`` when it
+    has more than ``max_excel_rows`` rows (capped at the worksheet limit); it
+    is still exported to CSV/Parquet.
+
+    Returns the list of sheet names written.
+    """
+    sheets = dict(sheets)
+    max_rows = min(max_excel_rows, EXCEL_MAX_ROWS - 1)
+    if per_customer_sheet in sheets and len(sheets[per_customer_sheet]) > max_rows:
+        print(f'   ⚠️ {per_customer_sheet} has {len(sheets[per_customer_sheet]):,} rows - '
+              f'kept out of the workbook (see the CSV/Parquet exports)')
+        del sheets[per_customer_sheet]
+    n_rows = sum(len(df) for df in sheets.values())
+    stats = stats or ExportStats()
+    stats.timed('xlsx (streaming)', path, n_rows, lambda: write_xlsx(path, sheets, index_sheets))
+    return list(sheets)
+
+
+def write_table(df, path, stats=None):
+    """Write ``df`` as .csv, .csv.gz or .parquet depending on ``path``."""
+    if path.endswith('.parquet'):
+        writer, write = 'parquet', lambda: df.to_parquet(path, index=False)
+    elif path.endswith('.csv.gz'):
+        writer, write = 'csv.gz', lambda: df.to_csv(path, index=False, compression='gzip')
+    else:
+        writer, write = 'csv', lambda: df.to_csv(path, index=False)
+    stats = stats or ExportStats()
+    stats.timed(writer, path, len(df), write)
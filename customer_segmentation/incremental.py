@@ -0,0 +1,229 @@
+"""Incremental RFM updates from daily transaction deltas.
+
+Keeps a persistent per-customer state (first and last purchase dates,
+distinct invoice count, monetary sum) so a new batch of cleaned transactions can be folded in
+without rescanning history. ``Recency`` is derived on demand against a moving
+analysis date.
+
+Invoices can straddle two delta files (e.g. an export cut at midnight), so the
+store also remembers the (CustomerID, InvoiceNo) pairs seen in the trailing
+``boundary_days`` window before the latest invoice date. A pair already in
+that window is not counted again, which keeps ``Frequency`` equal to the
+``InvoiceNo`` nunique of a full recompute.
+
+The window trails the latest invoice seen, so deltas must arrive roughly in
+date order: a delta reaching back more than ``boundary_days`` before the
+watermark could re-count invoices whose pairs were already pruned, and is
+rejected with a warning instead of being applied. Re-export such late data
+together with the newer days and rebuild the state.
+
+Usage::
+
+    python -m customer_segmentation.incremental outputs/rfm_state apply data/delta_2011-12-09.csv
+    python -m customer_segmentation.incremental outputs/rfm_state show --analysis-date 2011-12-10
+"""
+import argparse
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.streaming import clean_chunk, iter_chunks
+
+DEFAULT_BOUNDARY_DAYS = 1
+
+CUSTOMER_COLUMNS = ['FirstPurchase', 'LastPurchase', 'Frequency', 'Monetary']
+BOUNDARY_COLUMNS = ['CustomerID', 'InvoiceNo', 'InvoiceDate']
+
+
+class RFMState:
+    """Per-customer RFM accumulators plus the invoice boundary window."""
+
+    def __init__(self, customers=None, boundary=None, watermark=None,
+                 boundary_days=DEFAULT_BOUNDARY_DAYS):
+        if customers is None:
+            customers = pd.DataFrame({
+                'FirstPurchase': pd.Series(dtype='datetime64[ns]'),
+                'LastPurchase': pd.Series(dtype='datetime64[ns]'),
+                'Frequency': pd.Series(dtype='int64'),
+                'Monetary': pd.Series(dtype='float64'),
+            }, index=pd.Index([], dtype='int64', name='CustomerID'))
+        if boundary is None:
+            boundary = pd.DataFrame({
+                'CustomerID': pd.Series(dtype='int64'),
+                'InvoiceNo': pd.Series(dtype='str'),
+                'InvoiceDate': pd.Series(dtype='datetime64[ns]'),
+            })
+        self.customers = customers
+        self.boundary = boundary
+        self.watermark = watermark
+        self.boundary_days = boundary_days
+
+    def window_start(self):
+        """Earliest invoice date the boundary window still covers."""
+        if self.watermark is None:
+            return None
+        return self.watermark - pd.Timedelta(days=self.boundary_days)
+
+    def accepts(self, delta):
+        """Whether ``delta`` lies inside the dedup window (or is the first)."""
+        return (self.watermark is None or delta.empty
+                or delta['InvoiceDate'].min() >= self.window_start())
+
+    def apply_delta(self, delta):
+        """Fold a batch of cleaned transactions into the state.
+
+        ``delta`` needs CustomerID, InvoiceNo, InvoiceDate and TotalAmount.
+        Work is proportional to the delta plus the boundary window. A delta
+        older than the window (see the module docstring) is not applied.
+        """
+        if delta.empty:
+            return self
+        if not self.accepts(delta):
+            warnings.warn(f'Delta starts at {delta["InvoiceDate"].min()}, before the dedup '
+                          f'window ({self.window_start()}); not applied - invoices it shares '
+                          f'with earlier deltas would be counted twice')
+            return self
+        delta = delta[BOUNDARY_COLUMNS + ['TotalAmount']].assign(
+            CustomerID=delta['CustomerID'].astype('int64'),
+            InvoiceNo=delta['InvoiceNo'].astype(str),
+            TotalAmount=delta['TotalAmount'].astype('float64'),
+        )
+
+        # Invoice pairs seen for the first time (not in this or a prior delta)
+        pairs = delta.groupby(['CustomerID', 'InvoiceNo'], observed=True,
+                              as_index=False)['InvoiceDate'].max()
+        seen = pairs.merge(self.boundary[['CustomerID', 'InvoiceNo']],
+                           on=['CustomerID', 'InvoiceNo'], how='left', indicator=True)
+        new_pairs = pairs[(seen['_merge'] == 'left_only').to_numpy()]
+
+        grouped = delta.groupby('CustomerID')
+        update = pd.DataFrame({
+            'FirstPurchase': grouped['InvoiceDate'].min(),
+            'LastPurchase': grouped['InvoiceDate'].max(),
+            'Frequency': new_pairs.groupby('CustomerID').size(),
+            'Monetary': grouped['TotalAmount'].sum(),
+        })
+        update['Frequency'] = update['Frequency'].fillna(0).astype('int64')
+
+        known = update.index.isin(self.customers.index)
+        old = update[known]
+        if len(old):
+            current = self.customers.loc[old.index]
+            self.customers.loc[old.index, 'FirstPurchase'] = current['FirstPurchase'].where(
+                current['FirstPurchase'] <= old['FirstPurchase'], old['FirstPurchase'])
+            self.customers.loc[old.index, 'LastPurchase'] = current['LastPurchase'].where(
+                current['LastPurchase'] >= old['LastPurchase'], old['LastPurchase'])
+            self.customers.loc[old.index, 'Frequency'] = current['Frequency'] + old['Frequency']
+            self.customers.loc[old.index, 'Monetary'] = current['Monetary'] + old['Monetary']
+        if (~known).any():
+            fresh = update.loc[~known, CUSTOMER_COLUMNS]
+            customers = pd.concat([self.customers, fresh]) if len(self.customers) else fresh
+            self.customers = customers.rename_axis('CustomerID')
+
+        latest = delta['InvoiceDate'].max()
+        if self.watermark is None or latest > self.watermark:
+            self.watermark = latest
+        boundary = pd.concat([self.boundary, new_pairs[BOUNDARY_COLUMNS]], ignore_index=True)
+        keep = boundary['InvoiceDate'] >= self.window_start()
+        self.boundary = boundary[keep].reset_index(drop=True)
+        return self
+
+    def rfm(self, analysis_date=None):
+        """Return the Section 4 ``rfm`` table (with Tenure, like
+        ``compute_rfm``) as of ``analysis_date``.
+
+        Defaults to one day after the latest invoice, like ANALYSIS_DATE.
+        Before any delta is applied the table is empty.
+        """
+        if analysis_date is None:
+            if self.watermark is None:
+                return pd.DataFrame({
+                    'CustomerID': np.empty(0, dtype=np.int64),
+                    'Recency': np.empty(0, dtype=np.int64),
+                    'Frequency': np.empty(0, dtype=np.int64),
+                    'Monetary': np.empty(0, dtype=np.float64),
+                    'Tenure': np.empty(0, dtype=np.int64),
+                })
+            analysis_date = self.watermark + pd.Timedelta(days=1)
+        customers = self.customers.sort_index()
+        today = pd.Timestamp(analysis_date)
+        return pd.DataFrame({
+            'CustomerID': customers.index.to_numpy(),
+            'Recency': (today - customers['LastPurchase']).dt.days.to_numpy(),
+            'Frequency': customers['Frequency'].to_numpy(),
+            'Monetary': customers['Monetary'].to_numpy(),
+            'Tenure': (today - customers['FirstPurchase']).dt.days.to_numpy(),
+        })
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.customers.to_parquet(os.path.join(path, 'customers.parquet'))
+        self.boundary.to_parquet(os.path.join(path, 'boundary.parquet'), index=False)
+        meta = {
+            'watermark': None if self.watermark is None else self.watermark.isoformat(),
+            'boundary_days': self.boundary_days,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh, indent=2)
+
+    @classmethod
+    def load(cls, path, boundary_days=DEFAULT_BOUNDARY_DAYS):
+        """Load a saved state, or start an empty one if ``path`` is new."""
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return cls(boundary_days=boundary_days)
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        watermark = meta['watermark'] and pd.Timestamp(meta['watermark'])
+        return cls(
+            customers=pd.read_parquet(os.path.join(path, 'customers.parquet')),
+            boundary=pd.read_parquet(os.path.join(path, 'boundary.parquet')),
+            watermark=watermark,
+            boundary_days=meta['boundary_days'],
+        )
+
+
+def load_delta(path):
+    """Read and clean a delta file (CSV or Parquet) with the Section 2 rules."""
+    return pd.concat([clean_chunk(chunk) for chunk in iter_chunks(path)], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental RFM state store')
+    parser.add_argument('state', help='State directory (created on first apply)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    apply_cmd = sub.add_parser('apply', help='Fold delta files into the state')
+    apply_cmd.add_argument('deltas', nargs='+')
+    apply_cmd.add_argument('--boundary-days', type=int, default=DEFAULT_BOUNDARY_DAYS)
+    show_cmd = sub.add_parser('show', help='Print or export the current rfm table')
+    show_cmd.add_argument('--analysis-date', default=None)
+    show_cmd.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'apply':
+        state = RFMState.load(args.state, boundary_days=args.boundary_days)
+        for path in args.deltas:
+            delta = load_delta(path)
+            if not state.accepts(delta):
+                print(f'⚠ Skipped {path}: starts at {delta["InvoiceDate"].min()}, before the '
+                      f'dedup window ({state.window_start()})')
+                continue
+            state.apply_delta(delta)
+            print(f'✓ Applied {path}: {len(delta):,} rows, '
+                  f'{len(state.customers):,} customers, watermark {state.watermark}')
+        state.save(args.state)
+    else:
+        state = RFMState.load(args.state)
+        rfm = state.rfm(args.analysis_date and pd.Timestamp(args.analysis_date))
+        if args.out:
+            rfm.to_csv(args.out, index=False)
+            print(f'✓ rfm for {len(rfm):,} customers saved: {args.out}')
+        else:
+            print(rfm.describe().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Per-stage instrumentation for the pipeline sections.
+
+A :class:`StageRecorder` wraps each section (load, clean, EDA, RFM,
+segmentation, charts, export) and records wall time, CPU time, peak RSS and
+its delta (sampled on a background thread), input / output row counts and
+the memory of the DataFrames going in and out. Records are appended as JSON
+lines and can also be written as a Chrome trace (``chrome://tracing`` or
+Perfetto). With ``profile_dir`` set, every stage additionally runs under
+cProfile and tracemalloc and the top hotspots are dumped per stage.
+
+CPU time is ``time.process_time``: it is process-wide, so for stages that
+overlap on threads (the DAG scheduler) ``cpu_s`` includes the other stages'
+work. Stages share one tracemalloc session, started by the first profiled
+stage and stopped by the last, and each reports the allocation growth
+between its own start and stop snapshots.
+
+Stages can be used as a context manager::
+
+    with recorder.stage('clean', inputs=df) as stage:
+        df_clean, _ = clean_transactions(df)
+        stage.outputs(df_clean)
+
+or, in flat scripts, with ``recorder.begin(...)`` / ``recorder.end(...)``.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+HOTSPOTS = 15
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        return tracemalloc.take_snapshot()
+
+
+def _stop_tracemalloc(baseline):
+    """Allocation growth since ``baseline``, biggest first; stops tracing
+    when no other stage is using it."""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        growth = tracemalloc.take_snapshot().compare_to(baseline, 'lineno')
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+        return growth
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as fh:
+        return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+class MemorySampler:
+    """Samples RSS on a background thread to catch a stage's peak."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.start = current_rss_mb()
+        self.peak = self.start
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+        self.end = current_rss_mb()
+
+
+def _frames(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, (pd.DataFrame, pd.Series))]
+    return []
+
+
+def frame_stats(value):
+    """``(rows, bytes)`` of the DataFrames in ``value`` (a frame, or a dict /
+    sequence of them). Rows are those of the largest frame."""
+    frames = _frames(value)
+    if not frames:
+        return None, None
+    rows = max(len(frame) for frame in frames)
+    nbytes = sum(int(frame.memory_usage(deep=True).sum() if isinstance(frame, pd.DataFrame)
+                     else frame.memory_usage(deep=True)) for frame in frames)
+    return rows, nbytes
+
+
+class Stage:
+    """One running stage; call :meth:`outputs` before it ends."""
+
+    def __init__(self, recorder, name, inputs=None):
+        self.recorder = recorder
+        self.name = name
+        self.record = {'stage': name}
+        self.record['rows_in'], self.record['bytes_in'] = frame_stats(inputs)
+        self._outputs = None
+        self._profiler = None
+
+    def outputs(self, value):
+        # Measured after the stage's clock stops
+        self._outputs = value
+
+    def start(self):
+        self._memory = MemorySampler().__enter__()
+        if self.recorder.profile_dir:
+            self._baseline = _start_tracemalloc()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        self.record['start_us'] = int((time.perf_counter() - self.recorder.origin) * 1e6)
+        self.record['tid'] = threading.get_native_id()  # stages may run on worker threads
+        return self
+
+    def stop(self):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.recorder.dump_hotspots(self.name, self._profiler,
+                                        _stop_tracemalloc(self._baseline))
+        self._memory.__exit__(None, None, None)
+        self.record['rows_out'], self.record['bytes_out'] = frame_stats(self._outputs)
+        self._outputs = None
+        self.record.update({
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'rss_start_mb': round(self._memory.start, 1),
+            'rss_peak_mb': round(self._memory.peak, 1),
+            'rss_peak_delta_mb': round(self._memory.peak - self._memory.start, 1),
+        })
+        self.recorder.add(self.record)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StageRecorder:
+    """Collects stage records; writes JSON lines, a Chrome trace and
+    (in profile mode) per-stage hotspot reports."""
+
+    def __init__(self, jsonl_path=None, trace_path=None, profile_dir=None, verbose=True):
+        self.jsonl_path = jsonl_path
+        self.trace_path = trace_path
+        self.profile_dir = profile_dir
+        self.verbose = verbose
+        self.records = []
+        self.origin = time.perf_counter()
+        self._current = None
+        if jsonl_path:
+            os.makedirs(os.path.dirname(jsonl_path) or '.', exist_ok=True)
+            open(jsonl_path, 'w').close()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def stage(self, name, inputs=None):
+        return Stage(self, name, inputs)
+
+    def begin(self, name, inputs=None):
+        """Start a stage in flat code; ends the previous one if still open."""
+        if self._current is not None:
+            self.end()
+        self._current = self.stage(name, inputs).start()
+        return self._current
+
+    def end(self, outputs=None):
+        if outputs is not None:
+            self._current.outputs(outputs)
+        self._current.stop()
+        self._current = None
+
+    def add(self, record):
+        self.records.append(record)
+        if self.jsonl_path:
+            with open(self.jsonl_path, 'a') as fh:
+                fh.write(json.dumps(record) + '\n')
+
+    def dump_hotspots(self, name, profiler, allocations):
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(HOTSPOTS)
+        lines = [f'== {name}: top {HOTSPOTS} functions by cumulative time ==', out.getvalue(),
+                 f'== {name}: top {HOTSPOTS} allocation sites (tracemalloc growth) ==']
+        for stat in allocations[:HOTSPOTS]:
+            lines.append(str(stat))
+        path = os.path.join(self.profile_dir, f'{name}.txt')
+        with open(path, 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        profiler.dump_stats(os.path.join(self.profile_dir, f'{name}.pstats'))
+        if self.verbose:
+            print(f'   🔥 {name} hotspots: {path}')
+
+    def write_trace(self, path=None):
+        """Write the stages as Chrome trace 'complete' events."""
+        path = path or self.trace_path
+        events = [{
+            'name': record['stage'], 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(),
+            'tid': record.get('tid', 0), 'ts': record['start_us'], 'dur': int(record['wall_s'] * 1e6),
+            'args': {k: v for k, v in record.items() if k not in ('stage', 'start_us', 'tid')},
+        } for record in self.records]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as fh:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fh)
+
+    def close(self):
+        if self._current is not None:
+            self.end()
+        if self.trace_path:
+            self.write_trace()
+
+    def summary(self):
+        columns = ['stage', 'wall_s', 'cpu_s', 'rss_peak_mb', 'rss_peak_delta_mb',
+                   'rows_in', 'rows_out', 'bytes_in', 'bytes_out']
+        table = pd.DataFrame(self.records, columns=columns)
+        table[['rows_in', 'rows_out']] = table[['rows_in', 'rows_out']].astype('Int64')
+        for column in ('bytes_in', 'bytes_out'):
+            table[column] = (table[column] / 2**20).round(1)
+        return table.rename(columns={'bytes_in': 'mb_in', 'bytes_out': 'mb_out'})
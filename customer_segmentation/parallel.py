@@ -0,0 +1,75 @@
+"""Section 4 RFM across customer shards in a process pool.
+
+Recency / Frequency / Monetary only depend on one customer's own rows, so
+the cleaned transactions can be hash-partitioned by ``CustomerID`` and each
+shard reduced independently. The parent hashes the IDs once, stable-sorts
+the four RFM columns by shard and writes each shard's rows to its own Arrow
+IPC file (on /dev/shm when available); every worker memory-maps only its
+file and runs :func:`~customer_segmentation.pipeline.compute_rfm` on it, so
+no DataFrame is pickled to the workers and the total work stays O(N)
+whatever the shard count.
+
+Only the quantile scoring needs all customers at once - the merged table is
+handed back to ``score_rfm`` / ``segment_rfm`` unchanged. Each customer lands
+in exactly one shard with its rows in their original order, so the result is
+identical to the serial ``compute_rfm`` table, sums included.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.pipeline import compute_rfm
+
+RFM_COLUMNS = ['CustomerID', 'InvoiceNo', 'InvoiceDate', 'TotalAmount']
+
+
+def shard_of(customer_ids, n_shards):
+    """Shard number (0..n_shards-1) of each customer ID."""
+    hashes = pd.util.hash_array(np.asarray(customer_ids, dtype=np.int64))
+    return (hashes % np.uint64(n_shards)).astype(np.int64)
+
+
+def _write_ipc(df, path):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _shard_rfm(ipc_path, analysis_date):
+    import pyarrow as pa
+    with pa.memory_map(ipc_path, 'r') as source:
+        transactions = pa.ipc.open_file(source).read_all().to_pandas()
+    return compute_rfm(transactions, analysis_date)
+
+
+def parallel_rfm(df_clean, analysis_date, jobs=None, n_shards=None):
+    """Unscored RFM table computed over ``n_shards`` customer shards.
+
+    ``jobs`` defaults to the CPU count and ``n_shards`` to ``jobs``. Rows come
+    back sorted by CustomerID like ``compute_rfm(df_clean, analysis_date)``.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    n_shards = n_shards or jobs
+    if n_shards <= 1:
+        return compute_rfm(df_clean, analysis_date)
+
+    shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    shard = shard_of(df_clean['CustomerID'].to_numpy(), n_shards)
+    # Stable, so every customer keeps its rows in their original order
+    order = np.argsort(shard, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(shard, minlength=n_shards))])
+    transactions = df_clean[RFM_COLUMNS].take(order)
+    with tempfile.TemporaryDirectory(dir=shm_dir) as tmp:
+        ipc_paths = [os.path.join(tmp, f'shard-{i}.arrow') for i in range(n_shards)]
+        for i, path in enumerate(ipc_paths):
+            _write_ipc(transactions.iloc[bounds[i]:bounds[i + 1]], path)
+        del transactions
+        with ProcessPoolExecutor(max_workers=min(jobs, n_shards)) as pool:
+            shards = list(pool.map(_shard_rfm, ipc_paths, [analysis_date] * n_shards))
+
+    rfm = pd.concat(shards, ignore_index=True)
+    return rfm.sort_values('CustomerID', kind='stable', ignore_index=True)
@@ -0,0 +1,212 @@
+"""Sections 2-5 of the analysis as callable stages.
+
+The script prints around these; the benchmark suite and other entry points
+call them directly so every stage can be timed on its own.
+"""
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.segments import assign_segments
+
+
+def month_code(dates):
+    """``year * 12 + month - 1`` per timestamp, as int32 (any datetime unit)."""
+    months = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+    return (months + 1970 * 12).astype(np.int32)
+
+
+def month_label(codes):
+    """``'YYYY-MM'`` labels for :func:`month_code` values."""
+    return [f'{code // 12:04d}-{code % 12 + 1:02d}' for code in np.asarray(codes)]
+
+
+def cancelled(invoice_no):
+    """Boolean array: InvoiceNo starts with 'C'.
+
+    Categorical columns are tested once per category and broadcast through the
+    codes; Arrow-backed string columns go through the Arrow ``starts_with``
+    kernel, so no per-row Python strings are created. Other columns (object
+    dtype on pandas 2) fall back to ``.str.startswith``.
+    """
+    if isinstance(invoice_no.dtype, pd.CategoricalDtype):
+        flags = np.append(cancelled(pd.Series(invoice_no.cat.categories)), False)
+        return flags[invoice_no.cat.codes.to_numpy()]  # code -1 (missing) -> False
+    if not isinstance(invoice_no.dtype, pd.StringDtype):
+        invoice_no = invoice_no.astype('str')
+    # pandas 2 turns astype('str') into plain object, which has no storage
+    if getattr(invoice_no.dtype, 'storage', None) == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        flags = pc.fill_null(pc.starts_with(pa.array(invoice_no.array), 'C'), False)
+        return flags.to_numpy(zero_copy_only=False)
+    return invoice_no.str.startswith('C').to_numpy(dtype=bool, na_value=False)
+
+
+def clean_transactions(df, release=False):
+    """Section 2 cleaning. Returns ``(df_clean, row_counts)`` where
+    ``row_counts`` holds the row count after each cleaning step.
+
+    The three filters are combined into one mask and rows are taken once,
+    column by column (the result has a fresh RangeIndex). With
+    ``release=True`` each raw column is popped from ``df`` as it is
+    filtered, so the raw and clean tables never both exist in full (``df``
+    is left empty). ``TotalAmount`` is float32 (sum it in float64),
+    ``CustomerID`` int32 and ``YearMonth`` an int32 month code (see
+    :func:`month_code`).
+    """
+    counts = {'raw': len(df)}
+
+    mask = df['CustomerID'].notna().to_numpy(copy=True)
+    counts['with_customer_id'] = int(mask.sum())
+
+    mask &= ~cancelled(df['InvoiceNo'])
+    counts['without_cancellations'] = int(mask.sum())
+
+    mask &= (df['Quantity'] > 0).to_numpy(dtype=bool, na_value=False)
+    mask &= (df['UnitPrice'] > 0).to_numpy(dtype=bool, na_value=False)
+    counts['positive_values'] = int(mask.sum())
+
+    # Filter the underlying arrays (Arrow strings are filtered chunk by chunk)
+    # and give the result a fresh RangeIndex instead of an int64 label index
+    columns = {}
+    for name in list(df.columns):
+        column = df.pop(name) if release else df[name]
+        columns[name] = column.array[mask]
+        del column
+    df_clean = pd.DataFrame(columns, copy=False)
+
+    df_clean['TotalAmount'] = np.multiply(df_clean['Quantity'].to_numpy(),
+                                          df_clean['UnitPrice'].to_numpy(), dtype=np.float32)
+    df_clean['CustomerID'] = df_clean['CustomerID'].to_numpy(dtype=np.int32)
+    df_clean['YearMonth'] = month_code(df_clean['InvoiceDate'])
+    return df_clean, counts
+
+
+def _amount64(df):
+    """``df`` with TotalAmount as float64, so float32 line amounts (see
+    :func:`clean_transactions`) are summed at full precision."""
+    if df['TotalAmount'].dtype == np.float64:
+        return df
+    return df.assign(TotalAmount=df['TotalAmount'].astype(np.float64))
+
+
+def eda_tables(df_clean):
+    """Section 3 headline numbers and country / product / month tables."""
+    df_clean = _amount64(df_clean)
+    total_revenue = df_clean['TotalAmount'].sum()
+    tables = {
+        'total_revenue': total_revenue,
+        'total_orders': df_clean['InvoiceNo'].nunique(),
+        'total_customers': df_clean['CustomerID'].nunique(),
+        'avg_order_value': df_clean.groupby('InvoiceNo')['TotalAmount'].sum().mean(),
+    }
+
+    country_revenue = df_clean.groupby('Country').agg(
+        revenue=('TotalAmount', 'sum'),
+        orders=('InvoiceNo', 'nunique'),
+        customers=('CustomerID', 'nunique')
+    ).sort_values('revenue', ascending=False)
+    country_revenue['revenue_share_%'] = (country_revenue['revenue'] / total_revenue * 100).round(2)
+    tables['country_revenue'] = country_revenue
+
+    tables['product_revenue'] = df_clean.groupby(['StockCode', 'Description']).agg(
+        revenue=('TotalAmount', 'sum'),
+        quantity_Sold=('Quantity', 'sum'),
+        time_ordered=('InvoiceNo', 'nunique')
+    ).sort_values('revenue', ascending=False).reset_index()
+
+    year_month = (df_clean['YearMonth'] if 'YearMonth' in df_clean
+                  else pd.Series(month_code(df_clean['InvoiceDate']), index=df_clean.index,
+                                 name='YearMonth'))
+    monthly_revenue = df_clean.groupby(year_month).agg(
+        revenue=('TotalAmount', 'sum'),
+        orders=('InvoiceNo', 'nunique'),
+        customers=('CustomerID', 'nunique')
+    ).reset_index()
+    monthly_revenue['YearMonth'] = month_label(monthly_revenue['YearMonth'])
+    tables['monthly_revenue'] = monthly_revenue
+    return tables
+
+
+def analysis_date_for(df_clean):
+    """The RFM 'today': one day after the last transaction."""
+    return df_clean['InvoiceDate'].max() + pd.Timedelta(days=1)
+
+
+def compute_rfm(transactions, analysis_date, invoices=None):
+    """Section 4 per-customer Recency / Frequency / Monetary (plus Tenure).
+
+    Uses only native groupby reductions (max date, nunique invoices, sum
+    amount) and derives Recency with one vectorized subtraction afterwards,
+    so pandas stays on its cythonized path. ``invoices`` may be a
+    precomputed one-row-per-invoice table (CustomerID, InvoiceNo, InvoiceDate,
+    TotalAmount - e.g. ``FusedAggregates.invoices``); Frequency is then a
+    plain group size and ``transactions`` is not needed.
+    """
+    if invoices is not None:
+        rfm = _amount64(invoices).groupby('CustomerID').agg(
+            FirstPurchase=('InvoiceDate', 'min'),
+            LastPurchase=('InvoiceDate', 'max'),
+            Frequency=('InvoiceNo', 'size'),
+            Monetary=('TotalAmount', 'sum'),
+        )
+    else:
+        rfm = _amount64(transactions).groupby('CustomerID').agg(
+            FirstPurchase=('InvoiceDate', 'min'),
+            LastPurchase=('InvoiceDate', 'max'),
+            Frequency=('InvoiceNo', 'nunique'),
+            Monetary=('TotalAmount', 'sum'),
+        )
+    today = pd.Timestamp(analysis_date)
+    recency = (today - rfm.pop('LastPurchase')).dt.days
+    rfm.insert(0, 'Recency', recency)
+    # Days since the first purchase (customer age, used by the CLV models)
+    rfm['Tenure'] = (today - rfm.pop('FirstPurchase')).dt.days
+    return rfm.reset_index()
+
+
+def score_rfm(rfm):
+    """Add R/F/M quintile scores (1-5, 5 is best), RFM_Score and its average."""
+    rfm['R_Score'] = pd.qcut(rfm['Recency'], q=5, labels=[5, 4, 3, 2, 1], duplicates='drop')
+    # Frequency has many ties, so bins may be dropped; codes + 1 still gives 1..n
+    rfm['F_Score'] = pd.qcut(rfm['Frequency'], q=5, duplicates='drop').cat.codes + 1
+    rfm['M_Score'] = pd.qcut(rfm['Monetary'], q=5, labels=[1, 2, 3, 4, 5], duplicates='drop')
+
+    rfm['R_Score'] = rfm['R_Score'].astype(int)
+    rfm['F_Score'] = rfm['F_Score'].astype(int)
+    rfm['M_Score'] = rfm['M_Score'].astype(int)
+
+    rfm['RFM_Score'] = rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str) + rfm['M_Score'].astype(str)
+    rfm['RFM_Score_Avg'] = rfm[['R_Score', 'F_Score', 'M_Score']].mean(axis=1).round(2)
+    return rfm
+
+
+def segment_rfm(rfm, rules=None):
+    """Section 5 segment labels from the compiled rule table."""
+    rfm['Segment'] = assign_segments(rfm, rules)
+    return rfm
+
+
+def segment_tables(rfm):
+    """Section 5 ``segment_counts`` and ``segment_analysis`` tables."""
+    segment_counts = rfm['Segment'].value_counts().reset_index()
+    segment_counts.columns = ['Segment', 'Customer_Count']
+    segment_counts['Percentage'] = (segment_counts['Customer_Count'] / len(rfm) * 100).round(2)
+
+    segment_analysis = rfm.groupby('Segment').agg({
+        'CustomerID': 'count',
+        'Recency': 'mean',
+        'Frequency': 'mean',
+        'Monetary': 'mean',
+        'RFM_Score_Avg': 'mean'
+    }).round(2).reset_index()
+    segment_analysis.columns = ['Segment', 'Customer_Count', 'Avg_Recency',
+                                'Avg_Frequency', 'Avg_Monetary', 'Avg_RFM_Score']
+
+    segment_revenue = rfm.groupby('Segment')['Monetary'].sum().reset_index()
+    segment_revenue.columns = ['Segment', 'Total_Revenue']
+
+    segment_analysis = segment_analysis.merge(segment_revenue, on='Segment')
+    segment_analysis['Revenue_Share_%'] = (segment_analysis['Total_Revenue'] / rfm['Monetary'].sum() * 100).round(2)
+    segment_analysis = segment_analysis.sort_values('Total_Revenue', ascending=False)
+    return segment_counts, segment_analysis
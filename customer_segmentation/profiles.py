@@ -0,0 +1,217 @@
+"""Memory-mapped per-customer profile store.
+
+The Section 5 ``rfm`` table is written as a directory of parallel ``.npy``
+arrays - a sorted CustomerID index, Recency / Frequency / Monetary, uint8
+R/F/M scores and a uint8 segment code into a small label table (``meta.json``).
+Opening a store memory-maps the arrays, so loading is near-instant and only
+the pages that are touched are read.
+
+Lookups by ID use a direct slot table when IDs are dense (the Online Retail
+IDs are five-digit integers), falling back to binary search on the sorted
+index otherwise. Customers are also kept ordered by (segment, CustomerID)
+with per-segment offsets, so listing a segment is a contiguous slice.
+
+Usage::
+
+    python -m customer_segmentation.profiles build outputs/rfm_customer_segmentation.parquet outputs/profiles
+    python -m customer_segmentation.profiles lookup outputs/profiles 12346 12347
+    python -m customer_segmentation.profiles segment outputs/profiles Champions --limit 20
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from customer_segmentation.segments import DEFAULT_SEGMENT_RULES
+
+STORE_VERSION = 1
+
+# Column name -> (array file, dtype)
+FIELDS = {
+    'CustomerID': ('customer_id', np.int64),
+    'Recency': ('recency', np.int32),
+    'Frequency': ('frequency', np.int32),
+    'Monetary': ('monetary', np.float64),
+    'R_Score': ('r_score', np.uint8),
+    'F_Score': ('f_score', np.uint8),
+    'M_Score': ('m_score', np.uint8),
+}
+# Build the direct ID -> slot table while the ID span is at most this many
+# times the number of customers (4 bytes per slot)
+MAX_SLOT_SPAN_RATIO = 8
+
+
+class ProfileStore:
+    """Typed, memory-mapped customer profiles with batch and segment lookups."""
+
+    def __init__(self, arrays, labels, meta=None, path=None, writable=False):
+        self.arrays = arrays
+        self.labels = list(labels)
+        self.meta = meta or {}
+        self.path = path
+        self.writable = writable
+        self.ids = arrays['customer_id']
+        self.slots = arrays.get('id_slots')
+        self.min_id = int(self.ids[0]) if len(self.ids) else 0
+
+    @classmethod
+    def build(cls, rfm, path, labels=None, analysis_date=None):
+        """Write ``rfm`` (Section 5 columns) as a store under ``path``.
+
+        ``analysis_date`` (the date Recency was measured from) is kept in the
+        metadata so consumers can turn Recency back into a last purchase date.
+        """
+        labels = list(DEFAULT_SEGMENT_RULES.labels) if labels is None else list(labels)
+        labels += sorted(set(rfm['Segment'].unique()) - set(labels))
+        if len(labels) > 255:
+            raise ValueError(f'Too many segment labels for a uint8 code: {len(labels)}')
+
+        rfm = rfm.sort_values('CustomerID')
+        arrays = {name: rfm[column].to_numpy(dtype=dtype) for column, (name, dtype) in FIELDS.items()}
+        ids = arrays['customer_id']
+        if len(ids) and (np.diff(ids) <= 0).any():
+            raise ValueError('CustomerID values must be unique')
+        segment = pd.Categorical(rfm['Segment'], categories=labels).codes.astype(np.uint8)
+        arrays['segment'] = segment
+
+        order = np.lexsort((ids, segment)).astype(np.int32)
+        arrays['segment_order'] = order
+        arrays['segment_offsets'] = np.searchsorted(
+            segment[order], np.arange(len(labels) + 1), side='left').astype(np.int64)
+        if len(ids) and ids[-1] - ids[0] + 1 <= MAX_SLOT_SPAN_RATIO * len(ids):
+            slots = np.full(ids[-1] - ids[0] + 1, -1, dtype=np.int32)
+            slots[ids - ids[0]] = np.arange(len(ids), dtype=np.int32)
+            arrays['id_slots'] = slots
+
+        os.makedirs(path, exist_ok=True)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), values)
+        meta = {'version': STORE_VERSION, 'customers': int(len(ids)), 'labels': labels,
+                'arrays': sorted(arrays),
+                'analysis_date': None if analysis_date is None else pd.Timestamp(analysis_date).isoformat()}
+        with open(os.path.join(path, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh, indent=2)
+        return cls(arrays, labels, meta, path=path, writable=True)
+
+    @classmethod
+    def open(cls, path, mmap_mode='r'):
+        """Memory-map a store. ``mmap_mode='r+'`` writes in-place profile
+        updates through to the files, ``'c'`` keeps them in memory only."""
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported profile store version: {meta.get('version')}")
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in meta['arrays']}
+        return cls(arrays, meta['labels'], meta, path=path, writable=mmap_mode == 'r+')
+
+    def add_labels(self, labels):
+        """Append segment labels the store does not know yet.
+
+        A writable store (built, or opened with ``mmap_mode='r+'``) saves the
+        extended label table to ``meta.json`` right away, so segment codes
+        written through to ``segment.npy`` always resolve when it is opened
+        again. The new labels have no rows in the (segment, CustomerID)
+        order until the store is rebuilt.
+        """
+        new = [label for label in labels if label not in self.labels]
+        if not new:
+            return
+        if len(self.labels) + len(new) > 255:
+            raise ValueError(f'Too many segment labels for a uint8 code: '
+                             f'{len(self.labels) + len(new)}')
+        self.labels += new
+        self.meta['labels'] = self.labels
+        if self.writable and self.path is not None:
+            meta_path = os.path.join(self.path, 'meta.json')
+            with open(meta_path + '.tmp', 'w') as fh:
+                json.dump(self.meta, fh, indent=2)
+            os.replace(meta_path + '.tmp', meta_path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def positions(self, customer_ids):
+        """Row position of each ID, -1 where the customer is unknown."""
+        ids = np.asarray(customer_ids, dtype=np.int64)
+        if self.slots is not None:
+            offset = ids - self.min_id
+            inside = (offset >= 0) & (offset < len(self.slots))
+            pos = np.full(len(ids), -1, dtype=np.int64)
+            pos[inside] = self.slots[offset[inside]]
+            return pos
+        pos = np.searchsorted(self.ids, ids)
+        pos[pos == len(self.ids)] = 0
+        return np.where(self.ids[pos] == ids, pos, -1) if len(self.ids) else np.full(len(ids), -1)
+
+    def rows(self, positions):
+        """Profiles at ``positions`` as a DataFrame with the rfm column names."""
+        positions = np.asarray(positions, dtype=np.int64)
+        table = {column: np.asarray(self.arrays[name][positions]) for column, (name, _) in FIELDS.items()}
+        table['Segment'] = np.asarray(self.labels, dtype=object)[self.arrays['segment'][positions]]
+        return pd.DataFrame(table)
+
+    def lookup(self, customer_ids):
+        """Profiles of the known customers in ``customer_ids``, in request order."""
+        pos = self.positions(customer_ids)
+        return self.rows(pos[pos >= 0])
+
+    def get(self, customer_id):
+        """One profile as a dict, or None - cheaper than ``lookup`` for a
+        single ID since no DataFrame is built."""
+        pos = self.positions([customer_id])[0]
+        if pos < 0:
+            return None
+        profile = {column: self.arrays[name][pos].item() for column, (name, _) in FIELDS.items()}
+        profile['Segment'] = self.labels[self.arrays['segment'][pos]]
+        return profile
+
+    def segment(self, label, start=0, stop=None):
+        """Customers of one segment ordered by CustomerID (optionally a
+        ``[start:stop]`` page of them)."""
+        code = self.labels.index(label)
+        if code + 1 >= len(self.arrays['segment_offsets']):
+            return self.rows([])  # added by add_labels after the build
+        begin, end = self.arrays['segment_offsets'][code:code + 2]
+        members = self.arrays['segment_order'][begin:end][start:stop]
+        return self.rows(members)
+
+    def segment_sizes(self):
+        return dict(zip(self.labels, np.diff(self.arrays['segment_offsets']).tolist()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memory-mapped customer profile store')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='Build a store from an rfm table')
+    build_cmd.add_argument('rfm', help='rfm table (.parquet or .csv) with Segment column')
+    build_cmd.add_argument('store')
+    lookup_cmd = sub.add_parser('lookup', help='Print profiles for customer IDs')
+    lookup_cmd.add_argument('store')
+    lookup_cmd.add_argument('ids', type=int, nargs='+')
+    segment_cmd = sub.add_parser('segment', help='List the customers of a segment')
+    segment_cmd.add_argument('store')
+    segment_cmd.add_argument('label')
+    segment_cmd.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        rfm = pd.read_parquet(args.rfm) if args.rfm.endswith('.parquet') else pd.read_csv(args.rfm)
+        store = ProfileStore.build(rfm, args.store)
+        frame_bytes = rfm.memory_usage(deep=True).sum()
+        print(f'✓ {len(store):,} profiles saved: {args.store} '
+              f'({store.nbytes / len(store):.1f} B/customer vs {frame_bytes / len(store):.1f} B in the DataFrame)')
+    elif args.command == 'lookup':
+        print(ProfileStore.open(args.store).lookup(args.ids).to_string(index=False))
+    else:
+        print(ProfileStore.open(args.store).segment(args.label, stop=args.limit).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
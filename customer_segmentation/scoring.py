@@ -0,0 +1,253 @@
+"""Reusable R/F/M scoring models backed by exact or sketched quintile edges.
+
+Section 4 scores customers with ``pd.qcut``, which sorts every metric column
+and throws the bin edges away afterwards. A :class:`ScoringModel` keeps the
+quintile edges for Recency/Frequency/Monetary so new customers can be scored
+with a binary search over four interior edges, without re-binning everyone.
+
+Edges come either from the exact ``qcut`` bins (``ScoringModel.from_qcut``) or
+from one bounded-memory pass over the data with a mergeable KLL quantile
+sketch (``ScoringModel.from_sketches``). ``rank_error_report`` compares a
+sketched model against exact ``qcut`` scoring.
+
+Usage::
+
+    python -m customer_segmentation.scoring fit outputs/rfm_customer_segmentation.csv --sketch
+    python -m customer_segmentation.scoring score new_customers.csv --model outputs/scoring_model.json
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+QUINTILES = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
+
+# Score labels per metric, as in Section 4. Recency is inverted (recent = 5);
+# Frequency uses qcut codes + 1 so it survives duplicate edges being dropped.
+METRICS = {
+    'Recency': {'score': 'R_Score', 'labels': [5, 4, 3, 2, 1]},
+    'Frequency': {'score': 'F_Score', 'labels': None},
+    'Monetary': {'score': 'M_Score', 'labels': [1, 2, 3, 4, 5]},
+}
+
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Items live in compactors; an item at level ``h`` stands for ``2**h``
+    inputs. When a level overflows it is sorted and every other item (random
+    offset) is promoted, so memory stays O(k log(n/k)) for any input size.
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=0):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Compact an even number of items, keep the odd one out here
+                keep = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate quantiles; q=0 and q=1 return the exact min/max."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cum = items[order], np.cumsum(weights[order])
+        cum /= cum[-1]
+        out = items[np.minimum(np.searchsorted(cum, qs, side='left'), len(items) - 1)]
+        out = np.where(np.asarray(qs) <= 0, self.min, out)
+        return np.where(np.asarray(qs) >= 1, self.max, out)
+
+    def __len__(self):
+        return sum(len(lv) for lv in self.levels)
+
+
+class ScoringModel:
+    """Quintile edges for R/F/M plus the labelling rules of Section 4."""
+
+    def __init__(self, edges, source='qcut'):
+        self.edges = {metric: np.asarray(e, dtype=np.float64) for metric, e in edges.items()}
+        self.source = source
+        for metric, spec in METRICS.items():
+            bins = len(np.unique(self.edges[metric])) - 1
+            if spec['labels'] is not None and bins != len(spec['labels']):
+                # Same failure pd.qcut raises when duplicates='drop' removes a bin
+                raise ValueError('Bin labels must be one fewer than the number of bin edges')
+
+    @classmethod
+    def from_qcut(cls, rfm):
+        """Exact edges, identical to the bins ``pd.qcut`` uses in Section 4."""
+        edges = {}
+        for metric in METRICS:
+            _, bins = pd.qcut(rfm[metric], q=5, retbins=True, duplicates='drop')
+            edges[metric] = bins
+        return cls(edges, source='qcut')
+
+    @classmethod
+    def from_sketches(cls, sketches):
+        return cls({metric: sketches[metric].quantiles(QUINTILES) for metric in METRICS},
+                   source='kll')
+
+    @classmethod
+    def fit_sketch(cls, chunks, k=200):
+        """One pass over an iterable of rfm chunks with bounded memory."""
+        sketches = {metric: KLLSketch(k=k) for metric in METRICS}
+        for chunk in chunks:
+            for metric, sketch in sketches.items():
+                sketch.update(chunk[metric].to_numpy())
+        return cls.from_sketches(sketches)
+
+    def score_metric(self, metric, values):
+        """O(log k) score lookup for one metric (values outside the fitted
+        range fall into the first / last bin)."""
+        edges = np.unique(self.edges[metric])
+        # qcut bins are right-closed: x in (e[i], e[i+1]] -> bin i
+        bins = np.searchsorted(edges[1:-1], np.asarray(values, dtype=np.float64), side='left')
+        labels = METRICS[metric]['labels']
+        if labels is None:
+            return bins + 1
+        return np.asarray(labels)[bins]
+
+    def score(self, rfm):
+        """Return a copy of ``rfm`` with R_Score, F_Score and M_Score."""
+        rfm = rfm.copy()
+        for metric, spec in METRICS.items():
+            rfm[spec['score']] = self.score_metric(metric, rfm[metric]).astype(int)
+        return rfm
+
+    def to_dict(self):
+        return {'source': self.source,
+                'edges': {metric: e.tolist() for metric, e in self.edges.items()}}
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            spec = json.load(fh)
+        return cls(spec['edges'], source=spec.get('source', 'qcut'))
+
+
+def exact_scores(rfm):
+    """Section 4 scoring with ``pd.qcut`` (reference for error reports)."""
+    return ScoringModel.from_qcut(rfm).score(rfm)
+
+
+def rank_error_report(rfm, model):
+    """Compare ``model`` against exact qcut scoring.
+
+    ``max_rank_error`` is the worst distance between an edge's empirical rank
+    (an interval when values tie) and its target quintile;
+    ``score_mismatch_%`` is the share of customers whose score differs from
+    ``pd.qcut``.
+    """
+    exact = exact_scores(rfm)
+    approx = model.score(rfm)
+    rows = []
+    for metric, spec in METRICS.items():
+        values = np.sort(rfm[metric].to_numpy(dtype=np.float64))
+        interior = model.edges[metric][1:-1]
+        targets = np.asarray(QUINTILES[1:-1])
+        if len(interior) != len(targets):
+            # Deduplicated qcut edges: compare each edge to its nearest quintile
+            targets = targets[np.abs(targets[:, None] - np.searchsorted(
+                values, interior, side='right') / len(values)).argmin(axis=0)]
+        # With ties an edge covers a rank interval; error is the distance to it
+        low = np.searchsorted(values, interior, side='left') / len(values)
+        high = np.searchsorted(values, interior, side='right') / len(values)
+        errors = np.maximum(0, np.maximum(low - targets, targets - high))
+        rows.append({
+            'metric': metric,
+            'max_rank_error': float(errors.max()) if len(errors) else 0.0,
+            'score_mismatch_%': round(float((exact[spec['score']] != approx[spec['score']]).mean() * 100), 3),
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fit / apply an RFM scoring model')
+    sub = parser.add_subparsers(dest='command', required=True)
+    fit_cmd = sub.add_parser('fit', help='Fit quintile edges from an rfm CSV')
+    fit_cmd.add_argument('rfm')
+    fit_cmd.add_argument('--model', default='outputs/scoring_model.json')
+    fit_cmd.add_argument('--sketch', action='store_true', help='Use a KLL sketch instead of qcut')
+    fit_cmd.add_argument('--k', type=int, default=200)
+    fit_cmd.add_argument('--chunksize', type=int, default=100_000)
+    score_cmd = sub.add_parser('score', help='Score an rfm CSV with a saved model')
+    score_cmd.add_argument('rfm')
+    score_cmd.add_argument('--model', default='outputs/scoring_model.json')
+    score_cmd.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'fit':
+        if args.sketch:
+            model = ScoringModel.fit_sketch(
+                pd.read_csv(args.rfm, chunksize=args.chunksize), k=args.k)
+        else:
+            model = ScoringModel.from_qcut(pd.read_csv(args.rfm))
+        model.save(args.model)
+        print(f'✓ Scoring model ({model.source}) saved: {args.model}')
+        if args.sketch:
+            print(rank_error_report(pd.read_csv(args.rfm), model).to_string(index=False))
+    else:
+        model = ScoringModel.load(args.model)
+        scored = model.score(pd.read_csv(args.rfm))
+        if args.out:
+            scored.to_csv(args.out, index=False)
+            print(f'✓ Scored {len(scored):,} customers: {args.out}')
+        else:
+            print(scored.head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
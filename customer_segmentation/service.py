@@ -0,0 +1,274 @@
+"""Local asyncio HTTP service for real-time segment lookup and scoring.
+
+Loads the quintile edges (``outputs/scoring_model.json``) and the profile
+store (``outputs/profiles``) once at startup and answers JSON requests:
+
+==========================  ===============================================
+``GET  /customers/<id>``    one customer's profile
+``POST /lookup``            ``{"customer_ids": [...]}`` -> profiles + missing
+``POST /score``             ``{"recency", "frequency", "monetary"}`` (or
+                            ``{"items": [...]}``) -> R/F/M scores + segment
+``POST /transactions``      ``{"customer_id", "invoice_no", "invoice_date",
+                            "amount"}`` (or ``{"transactions": [...]}``) ->
+                            updates that customer in place, returns profile
+``GET  /metrics``           request counts and p50/p99 latency per endpoint
+``GET  /health``            liveness
+==========================  ===============================================
+
+Ingested transactions are scored against the frozen quintile edges and the
+segment rules, like ``segment_customer``; Recency stays measured from the
+store's analysis date. Frequency counts each (customer, invoice) pair once
+per service lifetime. Existing profiles are updated in the memory-mapped
+arrays (written through to disk with ``--persist``); customers first seen by
+the service are kept in memory until the next batch run rebuilds the store.
+Segment labels of custom rules that the store lacks are added to its label
+table (saved to ``meta.json`` with ``--persist``). Timezone-aware invoice
+dates are converted to naive UTC.
+
+Only the standard library is used for HTTP (HTTP/1.1 with keep-alive), so the
+service runs anywhere the pipeline does::
+
+    python -m customer_segmentation.service --port 8765
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from customer_segmentation.profiles import FIELDS, ProfileStore
+from customer_segmentation.scoring import METRICS, ScoringModel
+from customer_segmentation.segments import DEFAULT_SEGMENT_RULES, SCORE_MIN, load_rules
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 100_000
+SECONDS_PER_DAY = 86_400
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+def naive_utc(value):
+    """Parse an ISO date; aware ones are converted to UTC and made naive,
+    like the naive timestamps of the transaction log."""
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class LatencyStats:
+    """Per-endpoint request counts and a sliding window of latencies."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self.counts = {}
+        self.samples = {}
+
+    def record(self, endpoint, seconds):
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def report(self):
+        endpoints = {}
+        for endpoint, samples in self.samples.items():
+            p50, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 99]) * 1000
+            endpoints[endpoint] = {'requests': self.counts[endpoint],
+                                   'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3)}
+        return {'uptime_s': round(time.time() - self.started, 1), 'endpoints': endpoints}
+
+
+class ScoringService:
+    """Profile lookups, what-if scoring and transaction ingest (no I/O)."""
+
+    def __init__(self, model, store, rules=None, analysis_date=None):
+        self.model = model
+        self.store = store
+        self.rules = rules or DEFAULT_SEGMENT_RULES
+        analysis_date = analysis_date or store.meta.get('analysis_date')
+        if analysis_date is None:
+            raise ValueError('The profile store has no analysis_date; pass one explicitly')
+        self.analysis_date = naive_utc(analysis_date)
+        self.edges = {metric: np.unique(edges)[1:-1] for metric, edges in model.edges.items()}
+        # Segment code of the rules -> code in the store's label table
+        store.add_labels(self.rules.labels)
+        self.store_codes = np.array([store.labels.index(label) for label in self.rules.labels])
+        self.new_customers = {}
+        self.seen_invoices = set()
+
+    def score(self, recency, frequency, monetary):
+        """R/F/M scores and segment for one (recency, frequency, monetary)."""
+        scores = {}
+        for metric, value in zip(METRICS, (recency, frequency, monetary)):
+            bin_index = int(np.searchsorted(self.edges[metric], float(value), side='left'))
+            labels = METRICS[metric]['labels']
+            scores[METRICS[metric]['score']] = bin_index + 1 if labels is None else labels[bin_index]
+        code = self.rules.lookup[scores['R_Score'] - SCORE_MIN, scores['F_Score'] - SCORE_MIN,
+                                 scores['M_Score'] - SCORE_MIN]
+        scores['RFM_Score'] = f"{scores['R_Score']}{scores['F_Score']}{scores['M_Score']}"
+        scores['Segment'] = self.rules.labels[code]
+        return scores
+
+    def _profile_at(self, pos):
+        arrays = self.store.arrays
+        profile = {column: arrays[name][pos].item() for column, (name, _) in FIELDS.items()}
+        profile['Segment'] = self.store.labels[arrays['segment'][pos]]
+        return profile
+
+    def lookup(self, customer_ids):
+        """``(profiles, missing_ids)`` for a batch of IDs, in request order."""
+        customer_ids = [int(c) for c in customer_ids]
+        positions = self.store.positions(customer_ids) if customer_ids else []
+        profiles, missing = [], []
+        for customer_id, pos in zip(customer_ids, positions):
+            if customer_id in self.new_customers:
+                profiles.append(self.new_customers[customer_id])
+            elif pos >= 0:
+                profiles.append(self._profile_at(pos))
+            else:
+                missing.append(customer_id)
+        return profiles, missing
+
+    def ingest(self, transaction):
+        """Fold one cleaned transaction into its customer's profile."""
+        customer_id = int(transaction['customer_id'])
+        amount = float(transaction['amount'])
+        invoice_date = naive_utc(transaction['invoice_date'])
+        recency = max(0, int((self.analysis_date - invoice_date).total_seconds() // SECONDS_PER_DAY))
+        invoice = (customer_id, str(transaction['invoice_no']))
+        new_invoice = invoice not in self.seen_invoices
+        self.seen_invoices.add(invoice)
+
+        pos = -1 if customer_id in self.new_customers else self.store.positions([customer_id])[0]
+        profile = self.new_customers.get(customer_id) or (
+            self._profile_at(pos) if pos >= 0 else
+            {'CustomerID': customer_id, 'Recency': recency, 'Frequency': 0, 'Monetary': 0.0})
+        profile['Recency'] = min(profile['Recency'], recency)
+        profile['Frequency'] += int(new_invoice)
+        profile['Monetary'] += amount
+        scores = self.score(profile['Recency'], profile['Frequency'], profile['Monetary'])
+        profile.update({column: scores[column] for column in ('R_Score', 'F_Score', 'M_Score', 'Segment')})
+
+        if pos >= 0:
+            arrays = self.store.arrays
+            for column, (name, _) in FIELDS.items():
+                arrays[name][pos] = profile[column]
+            arrays['segment'][pos] = self.store.labels.index(profile['Segment'])
+        else:
+            self.new_customers[customer_id] = profile
+        return profile
+
+    def dispatch(self, method, path, body):
+        """Route one request. Returns ``(endpoint, status, payload)``."""
+        if path == '/health':
+            return 'health', 200, {'status': 'ok', 'customers': len(self.store) + len(self.new_customers)}
+        if path.startswith('/customers/') and method == 'GET':
+            profiles, _ = self.lookup([path.rsplit('/', 1)[1]])
+            if not profiles:
+                return 'customer', 404, {'error': 'unknown customer'}
+            return 'customer', 200, profiles[0]
+        if path == '/lookup' and method == 'POST':
+            profiles, missing = self.lookup(body['customer_ids'])
+            return 'lookup', 200, {'customers': profiles, 'missing': missing}
+        if path == '/score' and method == 'POST':
+            items = body['items'] if 'items' in body else [body]
+            results = [self.score(item['recency'], item['frequency'], item['monetary']) for item in items]
+            return 'score', 200, {'items': results} if 'items' in body else results[0]
+        if path == '/transactions' and method == 'POST':
+            items = body['transactions'] if 'transactions' in body else [body]
+            results = [self.ingest(item) for item in items]
+            return 'transactions', 200, {'customers': results} if 'transactions' in body else results[0]
+        if path in ('/customers', '/lookup', '/score', '/transactions'):
+            return 'other', 405, {'error': f'{method} not allowed on {path}'}
+        return 'other', 404, {'error': f'no route for {path}'}
+
+
+class HTTPServer:
+    """Minimal HTTP/1.1 front end (JSON in, JSON out, keep-alive)."""
+
+    def __init__(self, service):
+        self.service = service
+        self.stats = LatencyStats()
+
+    def handle(self, method, path, raw_body):
+        if path == '/metrics':
+            return 'metrics', 200, self.stats.report()
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            return self.service.dispatch(method, path, body)
+        except (KeyError, TypeError, ValueError) as exc:
+            return 'error', 400, {'error': f'{type(exc).__name__}: {exc}'}
+        except Exception as exc:
+            # Keep the connection (and the server) alive on a handler bug
+            logger.exception('%s %s failed', method, path)
+            return 'error', 500, {'error': f'{type(exc).__name__}: {exc}'}
+
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                raw_body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                endpoint, status, payload = self.handle(method, target.split('?', 1)[0], raw_body)
+                data = json.dumps(payload).encode()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                        f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n')
+                if not keep_alive:
+                    head += 'Connection: close\r\n'
+                writer.write(head.encode() + b'\r\n' + data)
+                await writer.drain()
+                self.stats.record(endpoint, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.connection, host, port)
+        print(f'✓ Scoring service on http://{host}:{port} '
+              f'({len(self.service.store):,} customers, model: {self.service.model.source})')
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Real-time segment lookup and scoring service')
+    parser.add_argument('--model', default='outputs/scoring_model.json')
+    parser.add_argument('--profiles', default='outputs/profiles')
+    parser.add_argument('--rules', default=None, help='Segment rules (JSON/YAML)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--persist', action='store_true',
+                        help='Write in-place profile updates through to the store files')
+    args = parser.parse_args(argv)
+
+    store = ProfileStore.open(args.profiles, mmap_mode='r+' if args.persist else 'c')
+    rules = load_rules(args.rules) if args.rules else None
+    service = ScoringService(ScoringModel.load(args.model), store, rules)
+    try:
+        asyncio.run(HTTPServer(service).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""The analysis as a stage graph, run by :mod:`customer_segmentation.dag`.
+
+::
+
+    raw -> clean -> aggregates -> totals, country_revenue, product_revenue, monthly_revenue
+                               -> cohorts
+                 -> rfm -> segments -> clv -> report (+ totals, revenue tables, cohorts)
+                                    -> cube (+ aggregates)
+                                    -> basket (+ aggregates)
+                                    -> charts (+ monthly_revenue, country_revenue, cohorts)
+
+``raw`` (the ingest cache already makes it cheap) and ``aggregates`` (the
+factorized codes) are kept in memory only; ``cube`` writes the
+(month, country, product, segment) cube directory for ad-hoc rollups,
+``basket`` one CSV of product pairs per segment, and every other stage is
+persisted in the Parquet stage cache. The EDA tables come straight from
+``aggregates`` - the same exact tables as the cube's single-dimension
+cuboids - so they do not depend on segmentation.
+Factorizing and the RFM branch only share ``clean``, so they run
+concurrently. Editing a segment rule file re-keys ``segments`` and what
+follows it, nothing above and not the EDA tables.
+"""
+import os
+from functools import partial
+
+import pandas as pd
+
+from customer_segmentation import aggregates, pipeline, segments
+from customer_segmentation.dag import DAG, Stage
+from customer_segmentation.export import DEFAULT_MAX_EXCEL_ROWS
+from customer_segmentation.ingest import file_sha256
+
+
+def load_raw(source):
+    from customer_segmentation.ingest import load_transactions
+    return load_transactions(source, verbose=False)
+
+
+def clean(raw):
+    return pipeline.clean_transactions(raw, release=True)[0]
+
+
+def fused_aggregates(df_clean):
+    return aggregates.FusedAggregates(df_clean)
+
+
+def build_cube(fused, segmented, path):
+    from customer_segmentation.cube import Cube
+    Cube.build(fused, segmented['rfm']).save(path)
+    return [path]
+
+
+def eda_table(fused, table):
+    """A Section 3 table (exact, segment-independent)."""
+    return getattr(fused, table)()
+
+
+def basket_pairs(fused, segmented, out_dir, min_support):
+    from customer_segmentation.basket import Baskets, save_pairs
+    baskets = Baskets(fused)
+    tables = {'All': baskets.pairs(min_support),
+              **baskets.segment_pairs(segmented['rfm'], min_support)}
+    return save_pairs(tables, out_dir)
+
+
+def cohorts(fused):
+    from customer_segmentation.cohorts import cohort_tables
+    return cohort_tables(fused)
+
+
+def rfm_scores(df_clean, rfm_jobs=1):
+    analysis_date = pipeline.analysis_date_for(df_clean)
+    if rfm_jobs > 1:
+        from customer_segmentation.parallel import parallel_rfm
+        rfm = parallel_rfm(df_clean, analysis_date, jobs=rfm_jobs)
+    else:
+        rfm = pipeline.compute_rfm(df_clean, analysis_date)
+    return {'rfm': pipeline.score_rfm(rfm), 'analysis_date': analysis_date}
+
+
+def segment(scored, rules=None, segmentation='rules', clusters=None):
+    segmented = {'analysis_date': scored['analysis_date']}
+    if segmentation == 'kmeans':
+        from customer_segmentation.clustering import cluster_rfm
+        rfm, model = cluster_rfm(scored['rfm'].copy(), k=clusters, rules=rules)
+        segmented['cluster_model'] = model.to_dict()
+    else:
+        rfm = pipeline.segment_rfm(scored['rfm'].copy(), rules)
+    segmented['segment_counts'], segmented['segment_analysis'] = pipeline.segment_tables(rfm)
+    segmented['rfm'] = rfm
+    return segmented
+
+
+def clv(segmented, horizon=365):
+    if not horizon:
+        return segmented
+    from customer_segmentation.clv import add_clv
+    rfm, model = add_clv(segmented['rfm'].copy(), horizon)
+    return {**segmented, 'rfm': rfm, 'clv_model': model.to_dict()}
+
+
+def render(segmented, monthly_revenue, country_revenue, cohort_tables, charts_dir='charts', jobs=1,
+           scatter_max_points=50_000):
+    from customer_segmentation.artifacts import ArtifactCache
+    from customer_segmentation.charts import CHART_TASKS, render_charts
+
+    render_charts({
+        'segment_counts': segmented['segment_counts'],
+        'segment_analysis': segmented['segment_analysis'],
+        'rfm': segmented['rfm'],
+        'monthly_revenue': monthly_revenue,
+        'country_revenue': country_revenue,
+        'cohort_retention': cohort_tables['cohort_retention'],
+    }, out_dir=charts_dir, jobs=jobs, scatter_max_points=scatter_max_points,
+       cache=ArtifactCache(os.path.join(charts_dir, '.artifact_manifest.json'), verbose=False),
+       verbose=False)
+    return [os.path.join(charts_dir, filename) for filename, *_ in CHART_TASKS]
+
+
+def report(segmented, totals, country_revenue, monthly_revenue, cohort_tables, out_dir='outputs',
+           charts_dir='charts', max_excel_rows=DEFAULT_MAX_EXCEL_ROWS):
+    """Sections 7-9 (findings, recommendations, Excel report, per-customer
+    exports) through the same :class:`Analysis` methods the CLI uses."""
+    from customer_segmentation.analysis import Analysis
+    from customer_segmentation.instrument import StageRecorder
+
+    analysis = Analysis(out_dir=out_dir, charts_dir=charts_dir, max_excel_rows=max_excel_rows,
+                        recorder=StageRecorder(verbose=False))
+    analysis.rfm = segmented['rfm']
+    analysis.segment_counts = segmented['segment_counts']
+    analysis.segment_analysis = segmented['segment_analysis']
+    analysis.analysis_date = pd.Timestamp(segmented['analysis_date'])
+    if 'cluster_model' in segmented:
+        from customer_segmentation.clustering import ClusterModel
+        analysis.cluster_model = ClusterModel.from_dict(segmented['cluster_model'])
+    if 'clv_model' in segmented:
+        from customer_segmentation.clv import CLVModel
+        analysis.clv_model = CLVModel.from_dict(segmented['clv_model'])
+    analysis.eda = {**totals, 'country_revenue': country_revenue,
+                    'monthly_revenue': monthly_revenue}
+    analysis.cohorts = cohort_tables
+    analysis.findings()
+    analysis.recommendations()
+    analysis.export_report()
+    analysis.export_customers()
+    return [os.path.join(out_dir, name) for name in (
+        'Customer_Segmentation_Report.xlsx', 'rfm_customer_segmentation.csv',
+        'rfm_customer_segmentation.parquet', 'rfm_customer_segmentation.csv.gz',
+        'scoring_model.json', 'profiles')]
+
+
+def build_dag(source='data/or.xlsx', out_dir='outputs', charts_dir='charts', rules_path=None,
+              cache_dir=None, workers=2, rfm_jobs=1, jobs=1, scatter_max_points=50_000,
+              segmentation='rules', clusters=None, clv_horizon=365, basket_min_support=0.01,
+              max_excel_rows=DEFAULT_MAX_EXCEL_ROWS, recorder=None):
+    """The analysis :class:`~customer_segmentation.dag.DAG` for ``source``."""
+    rules = segments.load_rules(rules_path) if rules_path else segments.DEFAULT_SEGMENT_RULES
+    stages = [
+        Stage('raw', partial(load_raw, source), persist=False,
+              params={'sha256': file_sha256(source)}),
+        Stage('clean', clean, ['raw'], code=[pipeline.clean_transactions]),
+        Stage('aggregates', fused_aggregates, ['clean'], persist=False, code=[aggregates]),
+        Stage('rfm', partial(rfm_scores, rfm_jobs=rfm_jobs), ['clean'],
+              code=[pipeline.analysis_date_for, pipeline.compute_rfm, pipeline.score_rfm]),
+        Stage('segments', partial(segment, rules=rules, segmentation=segmentation,
+                                  clusters=clusters), ['rfm'],
+              params={'rules': rules.rules, 'default': rules.default,
+                      'segmentation': segmentation, 'clusters': clusters},
+              code=[pipeline.segment_rfm, pipeline.segment_tables, segments,
+                    'customer_segmentation.clustering']),
+        Stage('cube', partial(build_cube, path=os.path.join(out_dir, 'cube')),
+              ['aggregates', 'segments'], kind='files', params={'out_dir': out_dir},
+              code=['customer_segmentation.cube']),
+        *[Stage(table, partial(eda_table, table=table), ['aggregates'], code=[aggregates])
+          for table in ('totals', 'country_revenue', 'product_revenue', 'monthly_revenue')],
+        *([Stage('basket', partial(basket_pairs, out_dir=os.path.join(out_dir, 'basket'),
+                                   min_support=basket_min_support),
+                 ['aggregates', 'segments'], kind='files',
+                 params={'out_dir': out_dir, 'min_support': basket_min_support},
+                 code=['customer_segmentation.basket'])] if basket_min_support else []),
+        Stage('cohorts', cohorts, ['aggregates'], code=['customer_segmentation.cohorts']),
+        Stage('clv', partial(clv, horizon=clv_horizon), ['segments'],
+              params={'horizon': clv_horizon}, code=['customer_segmentation.clv']),
+        Stage('charts', partial(render, charts_dir=charts_dir, jobs=jobs,
+                                scatter_max_points=scatter_max_points),
+              ['segments', 'monthly_revenue', 'country_revenue', 'cohorts'], kind='files',
+              params={'charts_dir': charts_dir, 'scatter_max_points': scatter_max_points},
+              code=['customer_segmentation.charts']),
+        Stage('report', partial(report, out_dir=out_dir, charts_dir=charts_dir,
+                                max_excel_rows=max_excel_rows),
+              ['clv', 'totals', 'country_revenue', 'monthly_revenue', 'cohorts'], kind='files',
+              params={'out_dir': out_dir, 'max_excel_rows': max_excel_rows},
+              code=['customer_segmentation.analysis', 'customer_segmentation.export',
+                    'customer_segmentation.profiles', 'customer_segmentation.scoring']),
+    ]
+    return DAG(stages, cache_dir or os.path.join(out_dir, '.stage_cache'), workers=workers,
+               recorder=recorder)
+
+
+def run_dag(targets=None, **options):
+    """Build the DAG, bring ``targets`` (default: every sink) up to date and
+    print which stages ran."""
+    dag = build_dag(**options)
+    dag.run(targets)
+    print("\n🧩 Stages:")
+    print(dag.report().to_string(index=False))
+    if dag.recorder is not None:
+        dag.recorder.close()
+    return dag
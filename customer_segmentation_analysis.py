@@ -1,565 +1,12 @@
-import pandas as pd 
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend for VS Code
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
-import warnings
-warnings.filterwarnings('ignore')
+"""Full customer segmentation & RFM analysis (Sections 1-9).
 
-plt.rcParams['figure.figsize'] =(12,6)
-sns.set_palette('Set2')
+Kept as the historical entry point; it is the ``report`` command of the
+package CLI. For partial runs use ``python -m customer_segmentation rfm``,
+``segment``, ``charts`` or ``report`` directly.
+"""
+import sys
 
-print("="*70)
-print("PROJECT 2: CUSTOMER SEGMENTATION & TFM ANALYSIS")
-print("="*70)
-print("LIBRARIES IMPORTED SUCCESSFULLY!")
+from customer_segmentation.cli import main
 
-print("━" * 70)
-print("  SECTION 1: DATA LOADING & EXPLORATION")
-print("━" * 70)
-
-df = pd.read_excel('data/or.xlsx')
-
-print(f"\n📦 Dataset loaded!")
-
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 1: DATA LOADING & EXPLORATION
-# ══════════════════════════════════════════════════════════════════
-print(f"   Shape: {df.shape[0]:,} rows × {df.shape[1]} columns")
-print(f"   Date range: {df['InvoiceDate'].min().date()} to {df['InvoiceDate'].max().date()}")
-print(f"   Unique customers: {df['CustomerID'].nunique():,}")
-
-print("\n📋 First 5 rows:")
-print(df.head().to_string())
-
-print("\n🔍 Column Info:")
-print(df.info())
-
-print("\n📊 Statistical Summary:")
-print(df.describe().to_string())
-
-print("\n🔎 Missing Values:")
-missing = pd.DataFrame({
-    'Missing Count': df.isnull().sum(),
-    'Missing %': (df.isnull().sum() / len(df) * 100).round(2)
-})
-print(missing[missing['Missing Count'] > 0].to_string())
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 2: DATA CLEANING
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 2: DATA CLEANING")
-print("━" * 70)
-
-print(f"\nBefore cleaning: {len(df):,} rows")
-
-df_clean = df.dropna(subset=['CustomerID']).copy()
-print(f'after removing missing CustomerID {len(df_clean):,}rows')
-
-df_clean = df_clean[~df_clean['InvoiceNo'].astype(str).str.startswith('C')]
-print(f'after removing cancellations : {len(df_clean):,}rows')
-
-df_clean = df_clean[(df_clean['Quantity']>0)&(df_clean['UnitPrice']>0)]
-print(f'After removing negative values: {len(df_clean):,}rows')
-
-df_clean['TotalAmount'] = df_clean['Quantity'] * df_clean['UnitPrice']
-
-df_clean['CustomerID'] = df_clean['CustomerID'].astype(int)
-
-
-print(f'cleaning completed! ')
-print(f'final dataset :{len(df_clean):,}rows')
-print(f'customers : {df_clean['CustomerID'].nunique():,}')
-print(f'total revenue : ${df_clean['TotalAmount'].sum():,.2f}')
-
-
-print(f" missing values after cleaning: {df_clean.isnull().sum().sum()}")
-
-
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 3: EXPLORATORY DATA ANALYSIS (EDA)
-# ══════════════════════════════════════════════════════════════════
-
-print("\n" + "━" * 70)
-print("  SECTION 3: EXPLORATORY DATA ANALYSIS")
-print("━" * 70)
-
-total_revenue = df_clean['TotalAmount'].sum()
-total_orders = df_clean['InvoiceNo'].nunique()
-total_customers = df_clean['CustomerID'].nunique()
-avg_order_value = df_clean.groupby('InvoiceNo')['TotalAmount'].sum().mean()
-
-print(f"Total Revenue: ${total_revenue:,.2f}")
-print(f"Total Orders: {total_orders:,}")
-print(f"Total Customers: {total_customers:,}")
-print(f"Average Order Value: ${avg_order_value:,.2f}")
-
-
-#top 10 countries by revenue
-print(f' top 10 countries by revenue :')
-country_revenue = df_clean.groupby('Country').agg(
-    revenue = ('TotalAmount','sum'),
-    orders = ('InvoiceNo','nunique'),
-    customers = ('CustomerID','nunique')
-).sort_values('revenue',ascending = False)
-country_revenue['revenue_share_%'] = (country_revenue['revenue']/ total_revenue * 100).round(2)
-print(country_revenue.head(10).to_string())
-
-print(f'top 10 Product by Revenue :')
-product_revenue = df_clean.groupby(['StockCode','Description']).agg(
-    revenue = ('TotalAmount','sum'),
-    quantity_Sold = ('Quantity','sum'),
-    time_ordered = ('InvoiceNo','nunique')
-).sort_values('revenue',ascending = False).reset_index()
-print(product_revenue.head(10).to_string(index=False))
-
-
-
-# Monthly revenue trend
-df_clean['YearMonth'] = df_clean['InvoiceDate'].dt.to_period('M')
-monthly_revenue = df_clean.groupby('YearMonth').agg(
-    revenue = ('TotalAmount', 'sum'),
-    orders = ('InvoiceNo', 'nunique'),
-    customers = ('CustomerID', 'nunique')
-).reset_index()
-monthly_revenue['YearMonth'] = monthly_revenue['YearMonth'].astype(str)
-
-print("\n📊 Monthly Revenue Trend:")
-print(monthly_revenue.to_string(index=False))
-
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 4: RFM ANALYSIS - THE CORE
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 4: RFM ANALYSIS")
-print("━" * 70)
-
-# Set analysis date as 1 day after the last transaction
-ANALYSIS_DATE = df_clean['InvoiceDate'].max() + pd.Timedelta(days=1)
-print(f"\n📅 Analysis Date: {ANALYSIS_DATE.date()}")
-print(f"   (This is the 'today' for RFM calculation)\n")
-
-# Calculate RFM metrics per customer
-rfm = df_clean.groupby('CustomerID').agg({
-    'InvoiceDate': lambda x: (ANALYSIS_DATE - x.max()).days,  # Recency
-    'InvoiceNo': 'nunique',                                    # Frequency
-    'TotalAmount': 'sum'                                       # Monetary
-}).reset_index()
-
-rfm.columns = ['CustomerID', 'Recency', 'Frequency', 'Monetary']
-
-print(f"✓ RFM calculated for {len(rfm):,} customers")
-print("\n📊 RFM Statistics:")
-print(rfm.describe().to_string())
-
-print("\n📋 Sample RFM Data (First 10 customers):")
-print(rfm.head(10).to_string(index=False))
-
-# Create RFM scores (1-5 scale, 5 is best)
-print("\n🔧 Creating RFM Scores...")
-rfm['R_Score'] = pd.qcut(rfm['Recency'], q=5, labels=[5,4,3,2,1], duplicates='drop')
-rfm['F_Score'] = pd.qcut(
-    rfm['Frequency'],
-    q=5,
-    duplicates='drop'
-)
-
-rfm['F_Score'] = rfm['F_Score'].cat.codes + 1
-rfm['M_Score'] = pd.qcut(rfm['Monetary'], q=5, labels=[1,2,3,4,5], duplicates='drop')
-
-# Convert to int
-rfm['R_Score'] = rfm['R_Score'].astype(int)
-rfm['F_Score'] = rfm['F_Score'].astype(int)
-rfm['M_Score'] = rfm['M_Score'].astype(int)
-
-# Create RFM Score string
-rfm['RFM_Score'] = rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str) + rfm['M_Score'].astype(str)
-
-# Overall RFM Score (average)
-rfm['RFM_Score_Avg'] = rfm[['R_Score', 'F_Score', 'M_Score']].mean(axis=1).round(2)
-
-print("✓ RFM Scores calculated!")
-print("\n📋 Sample RFM Scores (First 10):")
-print(rfm[['CustomerID', 'Recency', 'Frequency', 'Monetary', 'R_Score', 'F_Score', 'M_Score', 'RFM_Score']].head(10).to_string(index=False))
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 5: CUSTOMER SEGMENTATION
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 5: CUSTOMER SEGMENTATION")
-print("━" * 70)
-
-def segment_customer(row):
-    r, f, m = row['R_Score'], row['F_Score'], row['M_Score']
-    
-    if r >= 4 and f >= 4 and m >= 4:
-        return 'Champions'
-    elif r >= 3 and f >= 3 and m >= 3:
-        return 'Loyal Customers'
-    elif r >= 4 and f >= 2 and m >= 2:
-        return 'Potential Loyalists'
-    elif r >= 4 and f <= 2:
-        return 'New Customers'
-    elif r <= 2 and f >= 3 and m >= 3:
-        return 'At Risk'
-    elif r <= 3 and f <= 3 and m <= 3:
-        return 'Need Attention'
-    elif r <= 2 and f <= 2:
-        return 'Hibernating'
-    elif r == 1:
-        return 'Lost'
-    else:
-        return 'Others'
-
-rfm['Segment'] = rfm.apply(segment_customer, axis=1)
-print("✓ Customers segmented!")
-
-# Segment distribution
-print("\n📊 Customer Segment Distribution:")
-segment_counts = rfm['Segment'].value_counts().reset_index()
-segment_counts.columns = ['Segment', 'Customer_Count']
-segment_counts['Percentage'] = (segment_counts['Customer_Count'] / len(rfm) * 100).round(2)
-print(segment_counts.to_string(index=False))
-
-# Detailed segment analysis
-print("\n📊 Detailed Segment Analysis:")
-segment_analysis = rfm.groupby('Segment').agg({
-    'CustomerID': 'count',
-    'Recency': 'mean',
-    'Frequency': 'mean',
-    'Monetary': 'mean',
-    'RFM_Score_Avg': 'mean'
-}).round(2).reset_index()
-
-segment_analysis.columns = ['Segment', 'Customer_Count', 'Avg_Recency',
-                            'Avg_Frequency', 'Avg_Monetary', 'Avg_RFM_Score']
-
-# Calculate total revenue per segment
-segment_revenue = rfm.groupby('Segment')['Monetary'].sum().reset_index()
-segment_revenue.columns = ['Segment', 'Total_Revenue']
-
-segment_analysis = segment_analysis.merge(segment_revenue, on='Segment')
-segment_analysis['Revenue_Share_%'] = (segment_analysis['Total_Revenue'] / rfm['Monetary'].sum() * 100).round(2)
-segment_analysis = segment_analysis.sort_values('Total_Revenue', ascending=False)
-
-print(segment_analysis.to_string(index=False))
-
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 6: VISUALIZATIONS
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 6: CREATING VISUALIZATIONS")
-print("━" * 70)
-
-import os
-os.makedirs('charts', exist_ok=True)
-
-# Chart 1: Segment Distribution
-print("\n📊 Chart 1: Segment Distribution...")
-fig, axes = plt.subplots(1, 2, figsize=(14, 6))
-
-colors = sns.color_palette('Set2', len(segment_counts))
-axes[0].pie(segment_counts['Customer_Count'], labels=segment_counts['Segment'],
-            autopct='%1.1f%%', colors=colors, startangle=90)
-axes[0].set_title('Customer Distribution by Segment', fontsize=14, fontweight='bold')
-
-axes[1].barh(segment_counts['Segment'], segment_counts['Customer_Count'], color=colors)
-axes[1].set_xlabel('Number of Customers')
-axes[1].set_title('Customer Count by Segment', fontsize=14, fontweight='bold')
-axes[1].grid(axis='x', alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('charts/chart1_segment_distribution.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart1_segment_distribution.png")
-
-# Chart 2: Revenue by Segment
-print("📊 Chart 2: Revenue by Segment...")
-fig, ax = plt.subplots(figsize=(12, 6))
-
-segment_rev_sorted = segment_analysis.sort_values('Total_Revenue', ascending=True)
-colors_rev = sns.color_palette('RdYlGn', len(segment_rev_sorted))
-
-bars = ax.barh(segment_rev_sorted['Segment'], segment_rev_sorted['Total_Revenue'], color=colors_rev)
-ax.set_xlabel('Total Revenue (£)', fontsize=12)
-ax.set_title('Total Revenue by Customer Segment', fontsize=14, fontweight='bold')
-ax.grid(axis='x', alpha=0.3)
-
-for bar, val, pct in zip(bars, segment_rev_sorted['Total_Revenue'], segment_rev_sorted['Revenue_Share_%']):
-    ax.text(bar.get_width() + 5000, bar.get_y() + bar.get_height()/2,
-            f'£{val:,.0f} ({pct}%)', va='center', fontsize=9)
-
-plt.tight_layout()
-plt.savefig('charts/chart2_revenue_by_segment.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart2_revenue_by_segment.png")
-
-# Chart 3: RFM Scatter Plots
-print("📊 Chart 3: RFM Scatter Plots...")
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-
-for segment in rfm['Segment'].unique():
-    seg_data = rfm[rfm['Segment'] == segment]
-    axes[0].scatter(seg_data['Recency'], seg_data['Monetary'],
-                   alpha=0.6, s=50, label=segment)
-axes[0].set_xlabel('Recency (days)', fontsize=11)
-axes[0].set_ylabel('Monetary (£)', fontsize=11)
-axes[0].set_title('Recency vs Monetary', fontsize=13, fontweight='bold')
-axes[0].legend(bbox_to_anchor=(1, 1), fontsize=8)
-axes[0].grid(alpha=0.3)
-
-for segment in rfm['Segment'].unique():
-    seg_data = rfm[rfm['Segment'] == segment]
-    axes[1].scatter(seg_data['Frequency'], seg_data['Monetary'],
-                   alpha=0.6, s=50, label=segment)
-axes[1].set_xlabel('Frequency (orders)', fontsize=11)
-axes[1].set_ylabel('Monetary (£)', fontsize=11)
-axes[1].set_title('Frequency vs Monetary', fontsize=13, fontweight='bold')
-axes[1].grid(alpha=0.3)
-
-for segment in rfm['Segment'].unique():
-    seg_data = rfm[rfm['Segment'] == segment]
-    axes[2].scatter(seg_data['Recency'], seg_data['Frequency'],
-                   alpha=0.6, s=50, label=segment)
-axes[2].set_xlabel('Recency (days)', fontsize=11)
-axes[2].set_ylabel('Frequency (orders)', fontsize=11)
-axes[2].set_title('Recency vs Frequency', fontsize=13, fontweight='bold')
-axes[2].grid(alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('charts/chart3_rfm_scatter.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart3_rfm_scatter.png")
-
-# Chart 4: Monthly Revenue Trend
-print("📊 Chart 4: Monthly Revenue Trend...")
-fig, ax = plt.subplots(figsize=(12, 6))
-
-ax.plot(monthly_revenue['YearMonth'], monthly_revenue['revenue'],
-        marker='o', linewidth=2.5, markersize=8, color='#2ecc71')
-ax.fill_between(range(len(monthly_revenue)), monthly_revenue['revenue'], alpha=0.3, color='#2ecc71')
-ax.set_xlabel('Month', fontsize=12)
-ax.set_ylabel('Revenue (£)', fontsize=12)
-ax.set_title('Monthly Revenue Trend', fontsize=14, fontweight='bold')
-ax.tick_params(axis='x', rotation=45)
-ax.grid(alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('charts/chart4_monthly_trend.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart4_monthly_trend.png")
-
-# Chart 5: Top 10 Countries
-print("📊 Chart 5: Top Countries...")
-fig, ax = plt.subplots(figsize=(12, 6))
-
-top10_countries = country_revenue.head(10).sort_values('revenue')
-colors_country = sns.color_palette('viridis', len(top10_countries))
-
-bars = ax.barh(top10_countries.index, top10_countries['revenue'], color=colors_country)
-ax.set_xlabel('Revenue (£)', fontsize=12)
-ax.set_title('Top 10 Countries by Revenue', fontsize=14, fontweight='bold')
-ax.grid(axis='x', alpha=0.3)
-
-for bar, val in zip(bars, top10_countries['revenue']):
-    ax.text(bar.get_width() + 10000, bar.get_y() + bar.get_height()/2,
-            f'£{val:,.0f}', va='center', fontsize=9)
-
-plt.tight_layout()
-plt.savefig('charts/chart5_top_countries.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart5_top_countries.png")
-
-# Chart 6: Segment Heatmap
-print("📊 Chart 6: Segment Heatmap...")
-heatmap_data = segment_analysis[['Segment', 'Avg_Recency', 'Avg_Frequency', 'Avg_Monetary']].set_index('Segment')
-
-# Normalize for better visualization
-from sklearn.preprocessing import MinMaxScaler
-scaler = MinMaxScaler()
-heatmap_normalized = pd.DataFrame(
-    scaler.fit_transform(heatmap_data),
-    columns=heatmap_data.columns,
-    index=heatmap_data.index
-)
-
-fig, ax = plt.subplots(figsize=(10, 6))
-sns.heatmap(heatmap_normalized.T, annot=False, cmap='RdYlGn', linewidths=0.5, ax=ax,
-            cbar_kws={'label': 'Normalized Score'})
-ax.set_title('Customer Segment Comparison (Normalized RFM)', fontsize=14, fontweight='bold')
-ax.set_ylabel('RFM Metric', fontsize=12)
-ax.set_xlabel('Customer Segment', fontsize=12)
-
-plt.tight_layout()
-plt.savefig('charts/chart6_segment_heatmap.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("   ✓ Saved: chart6_segment_heatmap.png")
-# ══════════════════════════════════════════════════════════════════
-# SECTION 7: KEY FINDINGS & INSIGHTS
-# ══════════════════════════════════════════════════════════════════
-
-print("\n" + "━" * 70)
-print("  SECTION 7: KEY FINDINGS & INSIGHTS")
-print("━" * 70)
-
-top_segment = segment_analysis.iloc[0]['Segment']
-top_segment_rev = segment_analysis.iloc[0]['Total_Revenue']
-top_segment_pct = segment_analysis.iloc[0]['Revenue_Share_%']
-champions_count = rfm[rfm['Segment'] == 'Champions'].shape[0]
-at_risk_count = rfm[rfm['Segment'] == 'At Risk'].shape[0]
-lost_count = rfm[rfm['Segment'] == 'Lost'].shape[0]
-top_country = country_revenue.index[0]
-uk_share = country_revenue.iloc[0]['revenue_share_%']
-
-print(f"""
-╔══════════════════════════════════════════════════════════════════╗
-║                   KEY BUSINESS FINDINGS                         ║
-╠══════════════════════════════════════════════════════════════════╣
-║                                                                  ║
-║  FINDING 1: CUSTOMER BASE                                       ║
-║  • {total_customers:,} customers analyzed across 38 countries            ║
-║  • Total revenue: £{total_revenue:,.0f}                           ║
-║  • Avg customer lifetime value: £{(total_revenue/total_customers):,.2f}           ║
-║                                                                  ║
-║  FINDING 2: MOST VALUABLE SEGMENT                               ║
-║  • {top_segment} drives {top_segment_pct}% of total revenue           ║
-║  • Revenue: £{top_segment_rev:,.0f}                                   ║
-║  • This is your GOLD - protect at all costs!                    ║
-║                                                                  ║
-║  FINDING 3: CHAMPIONS (HIGH-VALUE CUSTOMERS)                    ║
-║  • {champions_count:,} customers in Champions segment                    ║
-║  • These are your best customers - reward them!                 ║
-║  • Early access, VIP treatment, referral incentives             ║
-║                                                                  ║
-║  FINDING 4: AT RISK CUSTOMERS (URGENT!)                         ║
-║  • {at_risk_count:,} customers at risk of churning                       ║
-║  • Used to be good customers, haven't purchased recently        ║
-║  • Immediate win-back campaigns needed                          ║
-║                                                                  ║
-║  FINDING 5: LOST CUSTOMERS                                      ║
-║  • {lost_count:,} customers already lost                                 ║
-║  • Deep reactivation campaigns with strong incentives           ║
-║  • Survey them to understand why they left                      ║
-║                                                                  ║
-║  FINDING 6: GEOGRAPHIC CONCENTRATION                            ║
-║  • {top_country} dominates with {uk_share}% revenue share                ║
-║  • High concentration = risk if UK market declines              ║
-║  • Opportunity: Expand in other 37 countries                    ║
-║                                                                  ║
-╚══════════════════════════════════════════════════════════════════╝""")
-# ══════════════════════════════════════════════════════════════════
-# SECTION 8: MARKETING RECOMMENDATIONS
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 8: MARKETING RECOMMENDATIONS BY SEGMENT")
-print("━" * 70)
-
-recommendations = pd.DataFrame({
-    'Segment': [
-        'Champions',
-        'Loyal Customers',
-        'Potential Loyalists',
-        'New Customers',
-        'At Risk',
-        'Need Attention',
-        'Hibernating',
-        'Lost'
-    ],
-    'Marketing Action': [
-        '🏆 Reward! Early access, VIP treatment, referral incentives',
-        '💎 Upsell higher-value products, loyalty programs',
-        '🌱 Free shipping, membership programs, recommendations',
-        '🎁 Onboarding series, welcome discount for 2nd purchase',
-        '⚠️ Win them back! Limited-time offers, "We miss you" emails',
-        '📢 Re-engagement campaigns, special promotions',
-        '😴 Deep discounts, reactivation campaigns',
-        '🔄 Last attempt - big incentives, survey why they left'
-    ],
-    'Priority': [1, 2, 3, 4, 2, 3, 4, 5]
-})
-
-print(recommendations.to_string(index=False))
-
-# ══════════════════════════════════════════════════════════════════
-# SECTION 9: EXPORT RESULTS
-# ══════════════════════════════════════════════════════════════════
-print("\n" + "━" * 70)
-print("  SECTION 9: EXPORTING RESULTS TO EXCEL")
-print("━" * 70)
-
-os.makedirs('outputs', exist_ok=True)
-
-findings_df = pd.DataFrame({
-    'Finding': [
-        'Total Customers Analyzed',
-        'Total Revenue Generated',
-        'Most Valuable Segment',
-        'Champions Customers',
-        'At Risk Customers',
-        'Lost Customers',
-        'Top Country',
-        'Avg Customer Lifetime Value'
-    ],
-    'Insight': [
-        f'{total_customers:,} customers across 38 countries',
-        f'£{total_revenue:,.0f} over 1 year period',
-        f'{top_segment} - £{top_segment_rev:,.0f} ({top_segment_pct}% of revenue)',
-        f'{champions_count:,} customers - highest value, retain at all costs!',
-        f'{at_risk_count:,} customers - need immediate attention',
-        f'{lost_count:,} customers - win-back campaigns needed',
-        f'{top_country} dominates with {uk_share}% revenue share',
-        f'£{(total_revenue / total_customers):,.2f} per customer'
-    ]
-})
-
-with pd.ExcelWriter('outputs/Customer_Segmentation_Report.xlsx', engine='openpyxl') as writer:
-    rfm.to_excel(writer, sheet_name='RFM_Analysis', index=False)
-    segment_analysis.to_excel(writer, sheet_name='Segment_Summary', index=False)
-    segment_counts.to_excel(writer, sheet_name='Segment_Distribution', index=False)
-    country_revenue.to_excel(writer, sheet_name='Country_Analysis')
-    monthly_revenue.to_excel(writer, sheet_name='Monthly_Trend', index=False)
-    findings_df.to_excel(writer, sheet_name='Key_Findings', index=False)
-    recommendations.to_excel(writer, sheet_name='Recommendations', index=False)
-
-rfm.to_csv('outputs/rfm_customer_segmentation.csv', index=False)
-
-print("✓ Excel report saved: outputs/Customer_Segmentation_Report.xlsx")
-print("   Sheets: RFM_Analysis, Segment_Summary, Segment_Distribution,")
-print("           Country_Analysis, Monthly_Trend, Key_Findings, Recommendations")
-print("✓ CSV saved: outputs/rfm_customer_segmentation.csv")
-
-print("\n" + "=" * 70)
-print("  ✅ PROJECT 2: ANALYSIS COMPLETE!")
-print("=" * 70)
-print(f"""
-📁 OUTPUT FILES:
-   data/Online_Retail.xlsx                    ← Original dataset
-   outputs/Customer_Segmentation_Report.xlsx  ← Full Excel report (7 sheets)
-   outputs/rfm_customer_segmentation.csv      ← RFM scores per customer
-   charts/chart1_segment_distribution.png     ← Customer segments
-   charts/chart2_revenue_by_segment.png       ← Revenue contribution
-   charts/chart3_rfm_scatter.png              ← RFM relationships
-   charts/chart4_monthly_trend.png            ← Monthly revenue trend
-   charts/chart5_top_countries.png            ← Geographic analysis
-   charts/chart6_segment_heatmap.png          ← Segment comparison
-
-📊 PROJECT STATS:
-   {len(df_clean):,} transactions analyzed
-   {total_customers:,} customers segmented
-   8 customer segments identified
-   6 professional charts created
-   7-sheet Excel report generated
-   
-🎯 BUSINESS IMPACT:
-   • Identified {champions_count:,} Champions customers to protect
-   • {at_risk_count:,} At Risk customers need immediate campaigns
-   • Top segment drives {top_segment_pct}% of revenue
-   • Clear marketing playbook for each of 8 segments
-""")
+if __name__ == '__main__':
+    main(['report', *sys.argv[1:]])